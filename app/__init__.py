@@ -1,11 +1,67 @@
+import logging
 from flask import Flask
 from config import Config
 
+def configure_logging(level):
+    """Send the app's log records to stderr at the configured level"""
+    logger = logging.getLogger('app')
+    logger.setLevel(level)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s'))
+        logger.addHandler(handler)
+
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
+    configure_logging(app.config['LOG_LEVEL'])
+    
+    from app.services.project_service import configure_repository
+    configure_repository(app.config.get('PROJECT_DB_PATH'))
+    
+    from app.services.report_jobs import configure_report_jobs
+    configure_report_jobs(
+        max_workers=app.config['REPORT_WORKERS'],
+        portfolio_workers=app.config['REPORT_PORTFOLIO_WORKERS'],
+        queue_limit=app.config['REPORT_QUEUE_LIMIT'],
+        reports_dir=app.config['REPORTS_DIR'],
+        cache_max_files=app.config['REPORT_CACHE_MAX_FILES'],
+        cache_max_bytes=app.config['REPORT_CACHE_MAX_BYTES'],
+        jobs_max_files=app.config['REPORT_JOBS_MAX_FILES']
+    )
+    
+    from app.services.weather_service import configure_weather
+    configure_weather(
+        provider=app.config['WEATHER_PROVIDER'],
+        api_key=app.config['WEATHER_API_KEY'],
+        ttl=app.config['WEATHER_CACHE_TTL'],
+        stale_ttl=app.config['WEATHER_STALE_TTL'],
+        timeout=app.config['WEATHER_TIMEOUT'],
+        pool_size=app.config['WEATHER_POOL_SIZE'],
+        grid_size=app.config['WEATHER_GRID_SIZE']
+    )
+    
+    # Keep every project site's forecast warm in memory when asked to
+    prefetch = app.config['WEATHER_PREFETCH_ENABLED'] and app.config['WEATHER_PREFETCH_INTERVAL'] > 0
+    if prefetch and not app.config.get('TESTING'):
+        from app.services.project_service import get_project_locations
+        from app.services.weather_service import start_weather_prefetcher
+        start_weather_prefetcher(get_project_locations, app.config['WEATHER_PREFETCH_INTERVAL'])
+    
     from app.routes import main
     app.register_blueprint(main)
     
+    if app.config['METRICS_ENABLED']:
+        from app.utils.metrics import init_metrics
+        init_metrics(app)
+    
+    if app.config['PROFILE_ENABLED']:
+        from app.utils.profiling import init_profiling
+        init_profiling(app)
+    
+    if app.config['WARM_IMPORTS']:
+        from app.utils.warmup import init_warmup
+        init_warmup(app)
+    
     return app
\ No newline at end of file
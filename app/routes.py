@@ -1,16 +1,26 @@
-from flask import Blueprint, render_template, request, jsonify, session, url_for, send_from_directory, send_file
-from app.services.chat_service import process_message
-from app.services.auth_service import get_user_by_id, get_all_users
-from app.services.project_service import get_all_projects, get_project_by_id
-from data.projects import project_data
+from flask import Blueprint, render_template, request, jsonify, session, url_for, send_from_directory, current_app, Response, stream_with_context
+from app.services.chat_service import process_message, process_messages, iter_message
+from app.services.auth_service import (
+    get_user_by_id, get_all_users, get_user_projects, get_accessible_projects, user_has_project_access
+)
+from app.services.project_service import get_project_by_id
+from app.services.listing_service import get_project_listing, load_projects, parse_fields, parse_filters, project_etag
+from app.utils.json_utils import dumps
+from app.services.report_jobs import submit_portfolio_report_job, get_report_job, ReportQueueFull
+from app.services.action_service import (
+    ActionError, WRITE_ACTIONS, parse_action, run_action, stream_action, report_action, report_job_result,
+    check_chart_request, chart_action, weather_action, add_note_action, view_notes_action
+)
 from data.users import user_data
+import hmac
 import os
-from datetime import datetime
 import json
-import requests
+import logging
 
 main = Blueprint('main', __name__)
 
+logger = logging.getLogger(__name__)
+
 @main.route('/')
 def index():
     return render_template('index.html')
@@ -29,13 +39,16 @@ def chat():
     
     current_user = get_user_by_id(current_user_id)
     
-    print(f"Setting up chat with user: {current_user_id}, access: {current_user['project_access']}")
+    project_ids = get_user_projects(current_user_id)
+    
+    logger.debug('chat.page user=%s projects=%d', current_user_id, len(project_ids))
     
     return render_template(
         'chat.html', 
         users=users, 
         current_user=current_user,
-        current_user_id=current_user_id
+        current_user_id=current_user_id,
+        project_ids=project_ids
     )
 
 @main.route('/api/switch_user', methods=['POST'])
@@ -49,40 +62,101 @@ def switch_user():
     else:
         return jsonify({'status': 'error', 'message': 'Invalid user ID'})
 
+def conditional_json(body, etag):
+    """JSON response carrying an ETag, or a 304 if the client has that version"""
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    # Let browsers keep the body but revalidate it on every use
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
 @main.route('/api/projects')
 def get_projects():
     user_id = session.get('user_id')
-    print(f"Fetching projects for user: {user_id}")
     
     if not user_id:
-        print("No user_id in session")
+        logger.debug('projects.list no user in session')
         return jsonify([])
     
+    # ?fields=id,name,status or ?fields=summary keeps the payload small
+    fields = parse_fields(request.args.get('fields'))
+    
+    try:
+        filters = parse_filters(request.args)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    # Pages are only cut when a limit is given; the cursor is the last id of the previous page
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, min(limit, current_app.config['PROJECTS_MAX_PAGE_SIZE']))
+    cursor = request.args.get('cursor') or None
+    
+    # Serialized once per user and reused until their access or a project changes
+    etag, body, next_cursor = get_project_listing(user_id, fields, filters, after=cursor, limit=limit)
+    response = conditional_json(body, etag)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+@main.route('/api/projects/<project_id>')
+def get_project(project_id):
+    if not user_has_project_access(session.get('user_id'), project_id):
+        return jsonify({'status': 'error', 'message': 'Access denied'}), 403
+    
+    fields = parse_fields(request.args.get('fields'))
+    
+    # Answer revalidations before loading or serializing the project
+    etag = project_etag(project_id, fields)
+    if request.if_none_match.contains(etag):
+        return conditional_json(b'', etag)
+    
+    projects = load_projects([project_id], fields)
+    
+    if project_id not in projects:
+        return jsonify({'status': 'error', 'message': 'Project not found'}), 404
+    
+    return conditional_json(dumps(projects[project_id]), etag)
+
+@main.route('/api/portfolio')
+def get_portfolio():
+    user_id = session.get('user_id')
     user = get_user_by_id(user_id)
-    print(f"User data: {user}")
     
-    accessible_projects = {}
+    if not user:
+        return jsonify({'status': 'error', 'message': 'No user selected'})
     
-    for project_id in user['project_access']:
-        if project_id in project_data:
-            accessible_projects[project_id] = project_data[project_id]
+    from app.services.portfolio_service import portfolio_summary
     
-    print(f"Returning projects: {list(accessible_projects.keys())}")
-    return jsonify(accessible_projects)
+    return jsonify({
+        'status': 'success',
+        'portfolio': portfolio_summary(get_user_projects(user_id))
+    })
 
 @main.route('/api/select_project', methods=['POST'])
 def select_project():
     data = request.get_json()
     project_id = data.get('project_id')
     
-    user_id = session.get('user_id')
-    user = get_user_by_id(user_id)
-    
-    if not user or project_id not in user['project_access']:
+    if not user_has_project_access(session.get('user_id'), project_id):
         return jsonify({'status': 'error', 'message': 'Access denied'})
     
+    try:
+        fields = parse_fields(request.args.get('fields') or data.get('fields'))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
     session['project_id'] = project_id
-    return jsonify({'status': 'success', 'project': get_project_by_id(project_id)})
+    
+    # Skip the project body when the client already has this version
+    etag = project_etag(project_id, fields)
+    if request.if_none_match.contains(etag):
+        response = jsonify({'status': 'success', 'project_id': project_id, 'not_modified': True})
+    else:
+        project = load_projects([project_id], fields).get(project_id)
+        response = jsonify({'status': 'success', 'project': project})
+    response.set_etag(etag)
+    return response
 
 @main.route('/api/send_message', methods=['POST'])
 def send_message():
@@ -91,45 +165,179 @@ def send_message():
     
     project_id = session.get('project_id')
     
-    response = process_message(message_text, project_id)
+    response = process_message(message_text, project_id, user_id=session.get('user_id'))
+    
+    return jsonify(chat_reply(response, project_id, session.get('user_id'), fuse=data.get('fuse')))
+
+def chat_reply(response, project_id, user_id, fuse=False):
+    """Response body for a chat reply, running its action when fused"""
+    # Run the action here and return its result in the same response
+    action = parse_action(response) if fuse else None
+    if action:
+        try:
+            result = run_action(action[0], action[1], project_id, user_id=user_id)
+        except ReportQueueFull as e:
+            result = {'status': 'error', 'message': str(e)}
+        return {
+            'status': 'success',
+            'message': response.split(':', 1)[0],
+            'action': action[0],
+            'result': result
+        }
     
     if response == 'SHOW_PROJECT_SELECTOR':
-        return jsonify({
+        return {
             'status': 'success',
             'message': 'Please select a project from the list below.',
             'action': 'show_project_selector'
-        })
+        }
     elif response == 'GENERATE_REPORT':
-        return jsonify({
+        return {
             'status': 'success',
             'message': 'GENERATE_REPORT'
-        })
+        }
     elif response == 'SHOW_BUDGET_CHART':
-        return jsonify({
+        return {
             'status': 'success',
             'message': 'SHOW_BUDGET_CHART'
-        })
+        }
     elif response == 'CHECK_WEATHER':
-        return jsonify({
+        return {
             'status': 'success',
             'message': 'CHECK_WEATHER'
-        })
+        }
     elif response.startswith('ADD_NOTE:'):
         note_text = response.replace('ADD_NOTE:', '').strip()
-        return jsonify({
+        return {
             'status': 'success',
             'message': 'ADD_NOTE',
             'note': note_text
-        })
+        }
     elif response == 'VIEW_NOTES':
-        return jsonify({
+        return {
             'status': 'success',
             'message': 'VIEW_NOTES'
-        })
+        }
     
-    return jsonify({
+    return {
         'status': 'success',
         'message': response
+    }
+
+@main.route('/api/send_messages', methods=['POST'])
+def send_messages():
+    data = request.get_json()
+    items = data.get('messages')
+    
+    user_id = session.get('user_id')
+    user = get_user_by_id(user_id)
+    
+    if not user:
+        return jsonify({'status': 'error', 'message': 'No user selected'})
+    
+    if not isinstance(items, list):
+        return jsonify({'status': 'error', 'message': 'messages must be a list'}), 400
+    
+    if len(items) > current_app.config['SEND_MESSAGES_MAX_BATCH']:
+        return jsonify({
+            'status': 'error',
+            'message': f"At most {current_app.config['SEND_MESSAGES_MAX_BATCH']} messages per batch"
+        }), 413
+    
+    default_project_id = session.get('project_id')
+    results = [None] * len(items)
+    parsed = []
+    
+    # Items are {"message", "project_id"} objects or [message, project_id] pairs
+    for index, item in enumerate(items):
+        if isinstance(item, dict):
+            message_text, project_id = item.get('message'), item.get('project_id', default_project_id)
+        elif isinstance(item, list) and len(item) == 2:
+            message_text, project_id = item
+        else:
+            message_text, project_id = None, None
+        
+        if not isinstance(message_text, str) or not message_text.strip():
+            results[index] = {'status': 'error', 'message': 'Message text is required'}
+        elif project_id is not None and not isinstance(project_id, str):
+            results[index] = {'status': 'error', 'message': 'Invalid project_id'}
+        else:
+            parsed.append((index, message_text, project_id))
+    
+    # One bulk access check for every project named in the batch
+    accessible = set(get_accessible_projects(user_id, {project_id for _, _, project_id in parsed if project_id}))
+    pairs = []
+    positions = []
+    for index, message_text, project_id in parsed:
+        if project_id and project_id not in accessible:
+            results[index] = {'status': 'error', 'message': 'Access denied'}
+        else:
+            pairs.append((message_text, project_id))
+            positions.append(index)
+    
+    for index, (message_text, project_id), reply in zip(positions, pairs, process_messages(pairs, user_id=user_id)):
+        if isinstance(reply, Exception):
+            results[index] = {'status': 'error', 'message': f'Error processing message: {str(reply)}'}
+            continue
+        # A failing action only fails its own item
+        try:
+            results[index] = chat_reply(reply, project_id, user_id, fuse=data.get('fuse'))
+        except Exception as e:
+            logger.exception('send_messages.action_failed project=%s', project_id)
+            results[index] = {'status': 'error', 'message': f'Error processing message: {str(e)}'}
+    
+    return jsonify({'status': 'success', 'results': results})
+
+def sse_event(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@main.route('/api/stream_message', methods=['GET', 'POST'])
+def stream_message():
+    if request.method == 'POST':
+        message_text = (request.get_json(silent=True) or {}).get('message', '')
+    else:
+        message_text = request.args.get('message', '')
+    project_id = session.get('project_id')
+    user_id = session.get('user_id')
+    # EventSource can only GET, so reports and notes need a POST
+    allow_writes = request.method == 'POST'
+    
+    @stream_with_context
+    def generate():
+        try:
+            for chunk in iter_message(message_text, project_id, user_id=user_id):
+                if chunk == 'SHOW_PROJECT_SELECTOR':
+                    yield sse_event('reply', {
+                        'text': 'Please select a project from the list below.',
+                        'action': 'show_project_selector'
+                    })
+                    continue
+                
+                action = parse_action(chunk)
+                if action is None:
+                    yield sse_event('reply', {'text': chunk})
+                    continue
+                
+                if action[0] in WRITE_ACTIONS and not allow_writes:
+                    yield sse_event('error', {
+                        'message': 'Reports and notes can only be started with a POST request.',
+                        'action': action[0]
+                    })
+                    continue
+                
+                # Long-running actions report progress, then their result
+                for event, data in stream_action(action[0], action[1], project_id, user_id=user_id):
+                    yield sse_event(event, data)
+        except ReportQueueFull as e:
+            yield sse_event('error', {'message': str(e)})
+        except Exception as e:
+            yield sse_event('error', {'message': f'Error processing message: {str(e)}'})
+        yield sse_event('done', {})
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
     })
 
 @main.route('/api/generate_report', methods=['POST'])
@@ -140,41 +348,56 @@ def generate_report():
     if not project_id:
         return jsonify({'status': 'error', 'message': 'No project selected'})
     
-    try:
-        from app.utils.report_generator import generate_project_report
-        project = get_project_by_id(project_id)
-        
-        if not project:
-            return jsonify({'status': 'error', 'message': 'Project not found'})
-        
-        print(f"Generating report for project: {project['name']}")
-        
+    project = get_project_by_id(project_id)
+    
+    if not project:
+        return jsonify({'status': 'error', 'message': 'Project not found'})
+    
+    # Queue the report in the background when the client can poll for it
+    if data.get('async') and current_app.config['REPORT_ASYNC']:
         try:
-            report_path = generate_project_report(project)
-            report_filename = os.path.basename(report_path)
-            
-            print(f"Report generated successfully at: {report_path}")
-            
-            # Create a download URL
-            download_url = url_for('main.download_report', filename=report_filename)
-            
-            return jsonify({
-                'status': 'success', 
-                'message': f'Report for {project["name"]} generated successfully',
-                'download_url': download_url
-            })
-        except Exception as e:
-            print(f"Error generating report: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return jsonify({'status': 'error', 'message': f'Error generating report: {str(e)}'})
-    except ImportError as e:
-        return jsonify({'status': 'error', 'message': f'Required library not installed: {str(e)}'})
+            return jsonify(report_action(project_id, project, use_async=True)), 202
+        except ReportQueueFull as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 429
+    
+    return jsonify(report_action(project_id, project))
+
+@main.route('/api/generate_portfolio_report', methods=['POST'])
+def generate_portfolio_report():
+    user_id = session.get('user_id')
+    user = get_user_by_id(user_id)
+    
+    if not user:
+        return jsonify({'status': 'error', 'message': 'No user selected'})
+    
+    project_ids = get_user_projects(user_id)
+    
+    # Large portfolios always render in the background
+    try:
+        job = submit_portfolio_report_job(project_ids)
+    except ReportQueueFull as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 429
+    
+    return jsonify({
+        'status': 'success',
+        'message': f"Portfolio report for {len(project_ids)} projects queued",
+        'job_id': job['id'],
+        'job_status': job['status'],
+        'status_url': url_for('main.report_job_status', job_id=job['id'])
+    }), 202
+
+@main.route('/api/report_jobs/<job_id>')
+def report_job_status(job_id):
+    job = get_report_job(job_id)
+    
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Report job not found'}), 404
+    
+    return jsonify(report_job_result(job))
 
 @main.route('/download_report/<filename>')
 def download_report(filename):
-    # Using absolute path to the reports directory
-    reports_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'reports')
+    reports_dir = current_app.config['REPORTS_DIR']
     # Make sure the directory exists
     if not os.path.exists(reports_dir):
         os.makedirs(reports_dir)
@@ -182,29 +405,28 @@ def download_report(filename):
 
 @main.route('/api/generate_budget_chart', methods=['POST'])
 def generate_budget_chart():
+    return generate_chart('budget')
+
+@main.route('/api/chart/<chart_type>', methods=['POST'])
+def generate_chart(chart_type):
     data = request.get_json()
     project_id = data.get('project_id') or session.get('project_id')
+    chart_format = data.get('format', 'png')
     
     if not project_id:
         return jsonify({'status': 'error', 'message': 'No project selected'})
     
-    from app.utils.chart_generator import generate_budget_chart
+    try:
+        check_chart_request(chart_type, chart_format)
+    except ActionError as e:
+        return jsonify({'status': 'error', 'message': e.message}), e.status_code
+    
     project = get_project_by_id(project_id)
     
     if not project:
         return jsonify({'status': 'error', 'message': 'Project not found'})
     
-    try:
-        chart_data = generate_budget_chart(project)
-        
-        return jsonify({
-            'status': 'success',
-            'message': f'Budget chart for {project["name"]} generated successfully',
-            'image_data': chart_data['image_base64'],
-            'chart_url': url_for('static', filename=f'charts/{chart_data["filename"]}')
-        })
-    except Exception as e:
-        return jsonify({'status': 'error', 'message': f'Error generating chart: {str(e)}'})
+    return jsonify(chart_action(chart_type, project, chart_format))
 
 @main.route('/api/get_weather', methods=['POST'])
 def get_weather():
@@ -216,79 +438,10 @@ def get_weather():
     
     project = get_project_by_id(project_id)
     
-    # For demo purposes, we'll use a fixed location based on project id
-    # In a real app, you would store location data with each project
-    locations = {
-        'P001': {'city': 'New York', 'lat': 40.7128, 'lon': -74.0060},
-        'P002': {'city': 'Chicago', 'lat': 41.8781, 'lon': -87.6298},
-        'P003': {'city': 'Los Angeles', 'lat': 34.0522, 'lon': -118.2437},
-        'P004': {'city': 'Seattle', 'lat': 47.6062, 'lon': -122.3321},
-        'P005': {'city': 'Miami', 'lat': 25.7617, 'lon': -80.1918}
-    }
-    
-    location = locations.get(project_id, {'city': 'New York', 'lat': 40.7128, 'lon': -74.0060})
+    if not project:
+        return jsonify({'status': 'error', 'message': 'Project not found'})
     
-    try:
-        # Use a mock response for demo purposes
-        # In production, you would use an actual API like:
-        # api_key = os.environ.get('WEATHER_API_KEY')
-        # url = f"https://api.openweathermap.org/data/2.5/forecast?lat={location['lat']}&lon={location['lon']}&appid={api_key}&units=imperial"
-        # response = requests.get(url)
-        # weather_data = response.json()
-        
-        # Mock data
-        weather_data = {
-            'city': {'name': location['city']},
-            'list': [
-                {
-                    'dt_txt': (datetime.now()).strftime('%Y-%m-%d'),
-                    'main': {'temp': 72, 'humidity': 65},
-                    'weather': [{'description': 'Partly cloudy', 'icon': '02d'}],
-                    'wind': {'speed': 8}
-                },
-                {
-                    'dt_txt': (datetime.now()).strftime('%Y-%m-%d'),
-                    'main': {'temp': 75, 'humidity': 60},
-                    'weather': [{'description': 'Sunny', 'icon': '01d'}],
-                    'wind': {'speed': 5}
-                },
-                {
-                    'dt_txt': (datetime.now()).strftime('%Y-%m-%d'),
-                    'main': {'temp': 68, 'humidity': 70},
-                    'weather': [{'description': 'Light rain', 'icon': '10d'}],
-                    'wind': {'speed': 10}
-                }
-            ]
-        }
-        
-        forecast_html = f"""
-        <div class="weather-forecast">
-            <h3>Weather Forecast for {location['city']}</h3>
-            <div class="forecast-days">
-        """
-        
-        for day in weather_data['list'][:3]:  # Show 3 days
-            forecast_html += f"""
-            <div class="forecast-day">
-                <div class="date">{day['dt_txt']}</div>
-                <div class="temp">{day['main']['temp']}°F</div>
-                <div class="description">{day['weather'][0]['description']}</div>
-                <div class="details">Humidity: {day['main']['humidity']}% | Wind: {day['wind']['speed']} mph</div>
-            </div>
-            """
-        
-        forecast_html += """
-            </div>
-        </div>
-        """
-        
-        return jsonify({
-            'status': 'success',
-            'message': f'Weather forecast for {project["name"]} ({location["city"]})',
-            'html': forecast_html
-        })
-    except Exception as e:
-        return jsonify({'status': 'error', 'message': f'Error retrieving weather: {str(e)}'})
+    return jsonify(weather_action(project))
 
 @main.route('/api/notes', methods=['GET', 'POST'])
 def handle_notes():
@@ -297,56 +450,26 @@ def handle_notes():
     if not project_id:
         return jsonify({'status': 'error', 'message': 'No project selected'})
     
-    notes_dir = 'data/notes'
-    if not os.path.exists(notes_dir):
-        os.makedirs(notes_dir)
-    
-    notes_file = f'{notes_dir}/{project_id}_notes.json'
-    
     if request.method == 'GET':
-        # Retrieve notes
-        if os.path.exists(notes_file):
-            with open(notes_file, 'r') as f:
-                notes = json.load(f)
-        else:
-            notes = []
-            
-        return jsonify({
-            'status': 'success',
-            'notes': notes
-        })
+        # Retrieve the latest page of notes
+        limit = request.args.get('limit', type=int)
+        before = request.args.get('before', type=int)
+        return jsonify(view_notes_action(project_id, limit=limit, before=before))
     
     elif request.method == 'POST':
         # Add a new note
         data = request.get_json()
-        note_text = data.get('note')
-        
-        if not note_text:
-            return jsonify({'status': 'error', 'message': 'Note text is required'})
-        
-        # Load existing notes
-        if os.path.exists(notes_file):
-            with open(notes_file, 'r') as f:
-                notes = json.load(f)
-        else:
-            notes = []
-        
-        # Add new note
-        new_note = {
-            'id': len(notes) + 1,
-            'text': note_text,
-            'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'user': session.get('user_id', 'unknown')
-        }
-        
-        notes.append(new_note)
-        
-        # Save notes
-        with open(notes_file, 'w') as f:
-            json.dump(notes, f)
-        
-        return jsonify({
-            'status': 'success',
-            'message': 'Note added successfully',
-            'note': new_note
-        })
\ No newline at end of file
+        return jsonify(add_note_action(project_id, data.get('note'), session.get('user_id')))
+
+@main.route('/metrics')
+def metrics():
+    if not current_app.config['METRICS_ENABLED']:
+        return jsonify({'status': 'error', 'message': 'Metrics are disabled'}), 404
+    
+    # Check for the scrape token, if one is configured
+    token = current_app.config['METRICS_TOKEN']
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+    
+    from app.utils.metrics import render
+    return Response(render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,247 @@
+import logging
+import os
+
+from flask import current_app, url_for
+
+from app.services.notes_service import add_note, get_notes
+from app.services.project_service import get_project_by_id
+from app.services.report_jobs import submit_report_job
+from app.services.weather_service import get_weather_service, WeatherUnavailable, DEFAULT_LOCATION
+
+# Chat actions
+#
+# Reports, charts, weather and notes are the chat features that do more than
+# answer from project data. Each one is implemented here once and returns a
+# JSON-ready result, so the feature endpoints and the streaming chat endpoint
+# share the same code. Functions use url_for and current_app and must run
+# inside a request.
+
+CHART_TITLES = {
+    'budget': 'Budget',
+    'progress': 'Progress',
+    'timeline': 'Timeline'
+}
+
+CHART_FORMATS = ('png', 'svg', 'data')
+
+# Chat reply sentinels and the action each one stands for
+SENTINEL_ACTIONS = {
+    'GENERATE_REPORT': 'report',
+    'SHOW_BUDGET_CHART': 'chart',
+    'CHECK_WEATHER': 'weather',
+    'VIEW_NOTES': 'view_notes'
+}
+
+# Actions that change state; a GET request must not run them
+WRITE_ACTIONS = ('report', 'add_note')
+
+logger = logging.getLogger(__name__)
+
+class ActionError(Exception):
+    """Raised for requests an action cannot serve, with an HTTP status"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+def parse_action(response):
+    """Split a chat reply into (action, args), or None for a plain reply"""
+    if response.startswith('ADD_NOTE:'):
+        return 'add_note', {'note': response.replace('ADD_NOTE:', '').strip()}
+    action = SENTINEL_ACTIONS.get(response)
+    return (action, {}) if action else None
+
+def report_action(project_id, project, use_async=False):
+    """Queue a report job or render the report now"""
+    if use_async:
+        # ReportQueueFull is left to the caller
+        job = submit_report_job(project_id, project)
+        return {
+            'status': 'success',
+            'message': f'Report for {project["name"]} queued',
+            'job_id': job['id'],
+            'job_status': job['status'],
+            'status_url': url_for('main.report_job_status', job_id=job['id'])
+        }
+
+    try:
+        from app.utils.report_generator import generate_project_report
+    except ImportError as e:
+        return {'status': 'error', 'message': f'Required library not installed: {str(e)}'}
+
+    logger.debug('report.generate project=%s', project['name'])
+
+    try:
+        report_path = generate_project_report(
+            project,
+            output_dir=current_app.config['REPORTS_DIR'],
+            cache_max_files=current_app.config['REPORT_CACHE_MAX_FILES'],
+            cache_max_bytes=current_app.config['REPORT_CACHE_MAX_BYTES']
+        )
+        report_filename = os.path.basename(report_path)
+
+        logger.debug('report.done path=%s', report_path)
+
+        # Create a download URL
+        download_url = url_for('main.download_report', filename=report_filename)
+
+        return {
+            'status': 'success',
+            'message': f'Report for {project["name"]} generated successfully',
+            'download_url': download_url
+        }
+    except Exception as e:
+        logger.exception('report.failed project=%s', project['name'])
+        return {'status': 'error', 'message': f'Error generating report: {str(e)}'}
+
+def report_job_result(job):
+    """Client view of a report job"""
+    result = {
+        'status': 'success',
+        'job_id': job['id'],
+        'job_status': job['status']
+    }
+    if job['status'] == 'done':
+        result['download_url'] = url_for('main.download_report', filename=job['filename'])
+    elif job['status'] == 'error':
+        result['message'] = f"Error generating report: {job['error']}"
+    return result
+
+def check_chart_request(chart_type, chart_format):
+    """Reject unknown chart types and formats"""
+    if chart_type not in CHART_TITLES:
+        raise ActionError(f'Unknown chart type: {chart_type}', 404)
+
+    if chart_format not in CHART_FORMATS:
+        raise ActionError(f'Unknown chart format: {chart_format}', 400)
+
+def chart_action(chart_type, project, chart_format='png'):
+    """Render a chart, or return its numeric series for the data format"""
+    check_chart_request(chart_type, chart_format)
+
+    from app.utils.chart_generator import chart_data, render_chart
+
+    result = {
+        'status': 'success',
+        'message': f'{CHART_TITLES[chart_type]} chart for {project["name"]} generated successfully'
+    }
+
+    try:
+        # Numeric series for client-side rendering; nothing is drawn or saved
+        if chart_format == 'data':
+            result['chart'] = chart_data(chart_type, project)
+            return result
+
+        chart = render_chart(chart_type, project, fmt=chart_format)
+
+        if chart_format == 'svg':
+            result['svg'] = chart['svg']
+        else:
+            result['image_data'] = chart['image_base64']
+            result['chart_url'] = url_for('static', filename=chart['filename'])
+
+        return result
+    except Exception as e:
+        return {'status': 'error', 'message': f'Error generating chart: {str(e)}'}
+
+def weather_action(project):
+    """Forecast for the project site as an HTML fragment"""
+    location = project.get('location') or DEFAULT_LOCATION
+
+    try:
+        weather_data = get_weather_service().get_forecast(location)
+
+        forecast_html = f"""
+        <div class="weather-forecast">
+            <h3>Weather Forecast for {location['city']}</h3>
+            <div class="forecast-days">
+        """
+
+        for day in weather_data['list'][:3]:  # Show 3 days
+            forecast_html += f"""
+            <div class="forecast-day">
+                <div class="date">{day['dt_txt']}</div>
+                <div class="temp">{day['main']['temp']}°F</div>
+                <div class="description">{day['weather'][0]['description']}</div>
+                <div class="details">Humidity: {day['main']['humidity']}% | Wind: {day['wind']['speed']} mph</div>
+            </div>
+            """
+
+        forecast_html += """
+            </div>
+        </div>
+        """
+
+        return {
+            'status': 'success',
+            'message': f'Weather forecast for {project["name"]} ({location["city"]})',
+            'html': forecast_html
+        }
+    except WeatherUnavailable as e:
+        return {'status': 'error', 'message': str(e)}
+    except Exception as e:
+        return {'status': 'error', 'message': f'Error retrieving weather: {str(e)}'}
+
+def add_note_action(project_id, note_text, user_id):
+    """Add a note to a project"""
+    if not note_text:
+        return {'status': 'error', 'message': 'Note text is required'}
+
+    new_note = add_note(project_id, note_text, user_id or 'unknown', notes_dir=current_app.config['NOTES_DIR'])
+
+    return {
+        'status': 'success',
+        'message': 'Note added successfully',
+        'note': new_note
+    }
+
+def view_notes_action(project_id, limit=None, before=None):
+    """Latest page of a project's notes"""
+    limit = limit or current_app.config['NOTES_PAGE_SIZE']
+    limit = max(1, min(limit, current_app.config['NOTES_MAX_PAGE_SIZE']))
+
+    notes, next_before = get_notes(project_id, limit, before=before, notes_dir=current_app.config['NOTES_DIR'])
+
+    return {
+        'status': 'success',
+        'notes': notes,
+        'next_before': next_before
+    }
+
+def run_action(action, args, project_id, user_id=None):
+    """Run a chat action for the active project and return its result"""
+    if action == 'add_note':
+        return add_note_action(project_id, args.get('note'), user_id)
+    if action == 'view_notes':
+        return view_notes_action(project_id)
+
+    project = get_project_by_id(project_id)
+
+    if not project:
+        return {'status': 'error', 'message': 'Project not found'}
+
+    if action == 'report':
+        return report_action(project_id, project, use_async=current_app.config['REPORT_ASYNC'])
+    if action == 'chart':
+        return chart_action(args.get('chart_type', 'budget'), project, args.get('format', 'data'))
+    if action == 'weather':
+        return weather_action(project)
+
+    raise ActionError(f'Unknown action: {action}', 400)
+
+def stream_action(action, args, project_id, user_id=None):
+    """Run a chat action, yielding (event, data) pairs as it progresses
+
+    Queued reports are not waited for: the job id and status URL are sent
+    and the client polls the job like any other report.
+    """
+    yield 'progress', {'action': action, 'stage': 'started'}
+
+    result = run_action(action, args, project_id, user_id=user_id)
+
+    if action == 'report' and result.get('job_id'):
+        yield 'progress', {'action': action, 'stage': result['job_status'], 'job_id': result['job_id'],
+                           'status_url': result['status_url']}
+
+    yield 'result', dict(result, action=action)
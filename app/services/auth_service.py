@@ -1,4 +1,21 @@
-from data.users import user_data
+import threading
+
+from data.users import user_data, role_project_access
+
+# Project access
+#
+# A user can see the projects listed on their record plus every project
+# granted to their role. Both are expanded once per user into a tuple (for
+# listing, in grant order) and a frozenset (for constant-time checks), and
+# rebuilt only when that user's access or their role's grants change.
+
+_lock = threading.Lock()
+
+# user_id -> (ordered project ids, frozenset of the same ids)
+_access_index = {}
+
+# Bumped whenever a user's project access changes
+_access_versions = {}
 
 def get_user_by_id(user_id):
     """Get user by ID"""
@@ -8,12 +25,54 @@ def get_all_users():
     """Get all users"""
     return user_data
 
+def _expand_access(user):
+    """Explicit projects followed by role grants, without duplicates"""
+    project_ids = list(user['project_access'])
+    project_ids.extend(role_project_access.get(user.get('role'), []))
+    ordered = tuple(dict.fromkeys(project_ids))
+    return ordered, frozenset(ordered)
+
+def _get_access(user_id):
+    with _lock:
+        access = _access_index.get(user_id)
+        if access is None:
+            user = get_user_by_id(user_id)
+            if not user:
+                return (), frozenset()
+            access = _access_index[user_id] = _expand_access(user)
+        return access
+
 def user_has_project_access(user_id, project_id):
     """Check if user has access to project"""
-    user = get_user_by_id(user_id)
-    return user and project_id in user['project_access']
+    return project_id in _get_access(user_id)[1]
 
 def get_user_projects(user_id):
     """Get projects accessible to user"""
-    user = get_user_by_id(user_id)
-    return user['project_access'] if user else []
\ No newline at end of file
+    return _get_access(user_id)[0]
+
+def get_accessible_projects(user_id, project_ids):
+    """The subset of project_ids the user can access, in the given order"""
+    accessible = _get_access(user_id)[1]
+    return [project_id for project_id in project_ids if project_id in accessible]
+
+def set_user_project_access(user_id, project_ids):
+    """Replace the projects a user can access"""
+    user_data[user_id]['project_access'] = list(project_ids)
+    mark_access_changed(user_id)
+
+def set_role_project_access(role, project_ids):
+    """Replace the projects granted to everyone with a role"""
+    role_project_access[role] = list(project_ids)
+    for user_id, user in user_data.items():
+        if user.get('role') == role:
+            mark_access_changed(user_id)
+
+def mark_access_changed(user_id):
+    """Call after a user's project access changes"""
+    with _lock:
+        _access_index.pop(user_id, None)
+        _access_versions[user_id] = _access_versions.get(user_id, 0) + 1
+
+def get_access_version(user_id):
+    """Version stamp of a user's project access"""
+    return _access_versions.get(user_id, 0)
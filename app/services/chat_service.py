@@ -1,109 +1,122 @@
-from app.services.project_service import get_project_by_id
-from data.projects import project_data
-import re
+import logging
+import time
 
-def process_message(message, active_project_id):
+from app.services.auth_service import get_user_projects
+from app.services.project_service import get_project_by_id, get_project_names, get_data_version
+from app.utils.nlp_utils import route_message, extract_project_reference, suggest_projects
+from app.utils.metrics import INTENT_LATENCY
+from app.utils.profiling import tag_profile
+
+logger = logging.getLogger(__name__)
+
+def process_message(message, active_project_id, user_id=None):
     """Process incoming messages and determine appropriate response"""
-    lower_msg = message.lower()
-    
-    # Debug output
-    print(f"Processing message: '{message}', active project: {active_project_id}")
-    
+    start = time.perf_counter()
+    intent, args = route_message(message)
+    logger.debug('chat.message intent=%s project=%s message=%r', intent, active_project_id, message)
+    tag_profile(intent=intent)
+    
+    try:
+        return respond(message, intent, args, active_project_id, user_id=user_id)
+    finally:
+        INTENT_LATENCY.observe(time.perf_counter() - start, intent)
+
+def respond(message, intent, args, active_project_id, user_id=None, project=None):
+    """Answer a routed message, using project if it is already loaded"""
     # Check for project selection
-    if ('select' in lower_msg or 'choose' in lower_msg) and 'project' in lower_msg:
-        print("Project selection detected")
+    if intent == 'select_project':
         return 'SHOW_PROJECT_SELECTOR'
     
     # Check for report generation
-    report_pattern = re.compile(r'(generate|create|make|produce).*report', re.IGNORECASE)
-    if report_pattern.search(lower_msg):
+    if intent == 'generate_report':
         if not active_project_id:
             return "Please select a project first before generating a report."
         return 'GENERATE_REPORT'
     
     # Check for chart/visualization request
-    chart_pattern = re.compile(r'(show|display|create|generate|visualize).*?(chart|graph|budget.*?chart|visualization)', re.IGNORECASE)
-    if chart_pattern.search(lower_msg):
+    if intent == 'show_chart':
         if not active_project_id:
             return "Please select a project first before generating charts."
         return 'SHOW_BUDGET_CHART'
     
     # Check for weather request
-    weather_pattern = re.compile(r'(check|show|get|what.*?is|how.*?is).*?(weather|forecast|temperature|rain|precipitation)', re.IGNORECASE)
-    if weather_pattern.search(lower_msg):
+    if intent == 'check_weather':
         if not active_project_id:
             return "Please select a project first before checking weather."
         return 'CHECK_WEATHER'
     
     # Check for add note request
-    add_note_pattern = re.compile(r'(add|create|make|write).*?note', re.IGNORECASE)
-    if add_note_pattern.search(lower_msg):
+    if intent == 'add_note':
         if not active_project_id:
             return "Please select a project first before adding notes."
         
-        # Try to extract the note content
-        note_content_pattern = re.compile(r'(saying|that says|with content|with text|:)\s*[""]?(.*?)[""]?$', re.IGNORECASE)
-        note_match = note_content_pattern.search(lower_msg)
-        
-        if note_match:
-            note_text = note_match.group(2).strip()
-            return f"ADD_NOTE:{note_text}"
+        if args['note'] is not None:
+            return f"ADD_NOTE:{args['note']}"
         else:
             return "What would you like the note to say?"
     
     # Check for view notes request
-    view_notes_pattern = re.compile(r'(view|show|get|read|list).*?notes', re.IGNORECASE)
-    if view_notes_pattern.search(lower_msg):
+    if intent == 'view_notes':
         if not active_project_id:
             return "Please select a project first before viewing notes."
         return 'VIEW_NOTES'
     
+    # Check for portfolio-wide questions across the user's projects, or a
+    # portfolio figure asked for while no project is selected
+    metric = args.get('metric') if intent == 'portfolio' else None
+    if metric is None and not active_project_id:
+        metric = args.get('portfolio_metric')
+    if metric:
+        if not user_id:
+            return "Please select a user first."
+        return portfolio_response(metric, get_user_projects(user_id))
+    
     # Check for specific project mention when no project is selected
     if not active_project_id:
-        for proj_id, project in project_data.items():
-            if project['name'].lower() in lower_msg:
-                return f"I found the {project['name']}. Please select it first by typing 'select project'."
+        # Read the version first so the names are never older than it
+        version = get_data_version()
+        project_names = get_project_names()
+        proj_id = extract_project_reference(message, project_names, fuzzy=False, version=version)
+        if proj_id:
+            project = project_names[proj_id]
+            return f"I found the {project['name']}. Please select it first by typing 'select project'."
+        
+        # Offer close matches for misspelled project names
+        suggestions = suggest_projects(message, project_names, version=version)
+        if suggestions:
+            names = [project_names[proj_id]['name'] for proj_id, _ in suggestions]
+            return f"Did you mean {' or '.join(names)}? Please select it first by typing 'select project'."
         
         return "Please select a project first by typing 'select project'."
     
-    project = get_project_by_id(active_project_id)
+    if project is None:
+        project = get_project_by_id(active_project_id)
     
     # Check for project status
-    if 'status' in lower_msg:
+    if intent == 'status':
         return f"Project \"{project['name']}\" is currently {project['status']} with {project['completion']}% completion. The timeline is {project['timeline']}."
     
     # Check for budget inquiries
-    if any(word in lower_msg for word in ['budget', 'cost', 'money', 'financial', 'spend', 'spending']):
+    if intent == 'budget':
         budget = project['budget']
         return f"Budget for {project['name']}: Allocated: ${budget['allocated']:,}, Spent: ${budget['spent']:,}, Remaining: ${budget['remaining']:,}"
     
     # Check for issue reports
-    if any(word in lower_msg for word in ['issue', 'problem', 'trouble', 'challenge', 'difficulty']):
-        issues = project['issues']
-        if not issues:
-            return f"No issues reported for project {project['name']}."
-        else:
-            return f"Issues for {project['name']}:\n" + "\n".join([
-                f"- {issue['description']} ({issue['status']}) - Reported on {issue['date']}"
-                for issue in issues
-            ])
+    if intent == 'issue':
+        return "\n".join(issue_lines(project))
     
     # Check for milestone inquiries
-    if any(word in lower_msg for word in ['milestone', 'progress', 'phase', 'stage', 'timeline', 'schedule']):
-        milestones = project['milestones']
-        return f"Milestones for {project['name']}:\n" + "\n".join([
-            f"- {milestone['name']}: {milestone['status']} (Target: {milestone['date']})"
-            for milestone in milestones
-        ])
+    if intent == 'milestone':
+        return "\n".join(milestone_lines(project))
     
     # Check for resource inquiries
-    if any(word in lower_msg for word in ['resource', 'worker', 'staff', 'people', 'team', 'equipment', 'tool', 'machine']):
+    if intent == 'resource':
         resources = project['resources']
         equipment_str = ', '.join(resources['equipment']) if resources['equipment'] else 'None'
         return f"Resources for {project['name']}:\n- Workers: {resources['workers']}\n- Equipment: {equipment_str}"
     
     # Help message
-    if any(word in lower_msg for word in ['help', 'guide', 'assist', 'instruction', 'command']):
+    if intent == 'help':
         return """You can ask about:
 - Project Status: "What's the status of this project?"
 - Budget Information: "Show me the budget details"
@@ -117,9 +130,98 @@ Additional features:
 - Check weather: "What's the weather forecast for the site?"
 - Add notes: "Add a note saying [your note text]"
 - View notes: "Show me all notes"
+- Portfolio overview: "Which projects are over budget?"
 
 First, select a project by typing 'select project'.
 """
     
     # Default response
-    return "I'm not sure how to answer that. Try asking about project status, budget, issues, milestones, or resources."
\ No newline at end of file
+    return "I'm not sure how to answer that. Try asking about project status, budget, issues, milestones, or resources."
+
+def process_messages(items, user_id=None):
+    """Process many (message, project_id) pairs at once
+    
+    Every message is routed first, then the items are answered project by
+    project so each project is loaded once. Replies come back in input
+    order; an item that fails has its exception in place of a reply.
+    """
+    start = time.perf_counter()
+    routed = [route_message(message) for message, _ in items]
+    # Routing is done for the whole batch; share its cost across the items
+    route_share = (time.perf_counter() - start) / len(items) if items else 0
+    
+    groups = {}
+    for index, (_, project_id) in enumerate(items):
+        groups.setdefault(project_id, []).append(index)
+    
+    replies = [None] * len(items)
+    for project_id, indexes in groups.items():
+        project = get_project_by_id(project_id) if project_id else None
+        for index in indexes:
+            intent, args = routed[index]
+            start = time.perf_counter()
+            try:
+                replies[index] = respond(items[index][0], intent, args, project_id, user_id=user_id, project=project)
+            except Exception as e:
+                replies[index] = e
+            INTENT_LATENCY.observe(route_share + time.perf_counter() - start, intent)
+    return replies
+
+def issue_lines(project):
+    """Lines of the issue list reply"""
+    issues = project['issues']
+    if not issues:
+        yield f"No issues reported for project {project['name']}."
+        return
+    yield f"Issues for {project['name']}:"
+    for issue in issues:
+        yield f"- {issue['description']} ({issue['status']}) - Reported on {issue['date']}"
+
+def milestone_lines(project):
+    """Lines of the milestone list reply"""
+    yield f"Milestones for {project['name']}:"
+    for milestone in project['milestones']:
+        yield f"- {milestone['name']}: {milestone['status']} (Target: {milestone['date']})"
+
+# Replies that are long lists and worth streaming line by line
+LIST_REPLIES = {
+    'issue': issue_lines,
+    'milestone': milestone_lines
+}
+
+def iter_message(message, active_project_id, user_id=None):
+    """Yield the reply to a message in chunks
+    
+    Issue and milestone lists are yielded a line at a time as they are
+    formatted; every other reply is a single chunk from process_message.
+    """
+    intent, _ = route_message(message)
+    if intent in LIST_REPLIES and active_project_id:
+        tag_profile(intent=intent)
+        project = get_project_by_id(active_project_id)
+        if project:
+            yield from LIST_REPLIES[intent](project)
+            return
+    yield process_message(message, active_project_id, user_id=user_id)
+
+def portfolio_response(metric, project_ids=None):
+    """Answer a portfolio-wide question"""
+    from app.services.portfolio_service import portfolio_summary
+    summary = portfolio_summary(project_ids)
+    
+    if metric == 'over_budget':
+        if not summary['over_budget']:
+            return f"None of your {summary['project_count']} projects are over budget."
+        return "Projects over budget:\n" + "\n".join([
+            f"- {project['name']}: ${project['over_by']:,} over (Spent ${project['spent']:,} of ${project['allocated']:,})"
+            for project in summary['over_budget']
+        ])
+    
+    if metric == 'quarter_spend':
+        return (f"Estimated spend for {summary['quarter']} across {summary['project_count']} projects: "
+                f"${summary['estimated_quarter_spend']:,.0f}, assuming each project spends at a steady rate. "
+                f"Total spent to date: ${summary['total_spent']:,}.")
+    
+    return (f"Portfolio of {summary['project_count']} projects: Allocated: ${summary['total_allocated']:,}, "
+            f"Spent: ${summary['total_spent']:,} ({summary['percentage_spent']}%), "
+            f"Remaining: ${summary['total_remaining']:,}. Average completion is {summary['average_completion']}%.")
@@ -0,0 +1,166 @@
+from datetime import date, datetime, timedelta
+
+from app.services.auth_service import get_user_projects, get_access_version
+from app.services.project_repository import SUMMARY_KEYS
+from app.services.project_service import (
+    get_project_by_id, get_project_summaries, get_data_version, get_project_version, add_change_listener,
+    find_project_ids
+)
+from app.utils.cache import LRUCache, stable_hash
+from app.utils.json_utils import dumps
+
+# Project listings
+#
+# The project list a user sees only changes when their access or a project
+# changes, so the serialized JSON is kept per user and field selection
+# together with a strong ETag built from those version stamps. Repeat
+# requests either reuse the cached body or, when the client already has it,
+# get a 304. Lists that only need summary fields never load issues,
+# milestones or budgets. Filtered and paginated listings select ids through
+# the repository's secondary indexes before any project is loaded.
+
+# Fields of the compact summary representation
+SUMMARY_FIELDS = ('id',) + SUMMARY_KEYS
+
+# (user_id, fields, filters, cursor, limit) -> (etag, JSON body, next cursor)
+_listings = LRUCache(maxsize=256)
+
+# Listings are checked against the version stamps; clearing just frees memory
+add_change_listener(lambda project_ids: _listings.clear())
+
+def parse_fields(value):
+    """Turn a ?fields= value into a tuple of field names, or None for everything
+
+    value is a comma-separated string or, from a JSON body, a list of names.
+    "summary" selects SUMMARY_FIELDS. Fields a project does not have are
+    left out of its entry. Raises ValueError for anything else.
+    """
+    if not value:
+        return None
+    if value == 'summary':
+        return SUMMARY_FIELDS
+    if isinstance(value, str):
+        value = value.split(',')
+    elif not isinstance(value, (list, tuple)) or not all(isinstance(field, str) for field in value):
+        raise ValueError('fields must be a comma-separated string or a list of names')
+    fields = []
+    for field in value:
+        field = field.strip()
+        if field and field not in fields:
+            fields.append(field)
+    return tuple(fields) or None
+
+def project_fields(project_id, project, fields):
+    """Project restricted to the selected fields"""
+    if fields is None:
+        return project
+    selected = {key: project[key] for key in fields if key in project}
+    if 'id' in fields:
+        selected['id'] = project_id
+    return selected
+
+def _parse_int(args, name, low, high):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a whole number')
+    if not low <= number <= high:
+        raise ValueError(f'{name} must be between {low} and {high}')
+    return number
+
+def _parse_date(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f'{name} must be a date like 2025-06-30')
+
+def parse_filters(args, today=None):
+    """Project filters from query arguments, or None when there are none
+
+    status=In Progress,Planning  completion_min=0  completion_max=50
+    milestone_due_from=2025-06-01  milestone_due_to=2025-06-30
+    milestone_due_days=30 (from today)  has_open_issues=true|false
+    Raises ValueError for malformed values and for milestone_due_days
+    combined with milestone_due_from or milestone_due_to.
+    """
+    filters = {}
+    if args.get('status'):
+        filters['status'] = tuple(sorted({status.strip() for status in args['status'].split(',') if status.strip()}))
+    filters['completion_min'] = _parse_int(args, 'completion_min', 0, 100)
+    filters['completion_max'] = _parse_int(args, 'completion_max', 0, 100)
+    filters['due_from'] = _parse_date(args, 'milestone_due_from')
+    filters['due_to'] = _parse_date(args, 'milestone_due_to')
+
+    due_days = _parse_int(args, 'milestone_due_days', 0, 3650)
+    if due_days is not None:
+        if filters['due_from'] or filters['due_to']:
+            raise ValueError('milestone_due_days cannot be combined with milestone_due_from or milestone_due_to')
+        today = today or date.today()
+        filters['due_from'] = today.strftime('%Y-%m-%d')
+        filters['due_to'] = (today + timedelta(days=due_days)).strftime('%Y-%m-%d')
+
+    has_open_issues = args.get('has_open_issues')
+    if has_open_issues:
+        if has_open_issues.lower() not in ('true', 'false'):
+            raise ValueError('has_open_issues must be true or false')
+        filters['has_open_issues'] = has_open_issues.lower() == 'true'
+
+    filters = {key: value for key, value in filters.items() if value is not None}
+    return filters or None
+
+def make_etag(*parts):
+    """Strong ETag value (unquoted) for a tuple of version stamps"""
+    return stable_hash(parts)[:32]
+
+def listing_etag(user_id, fields=None, filters=None, after=None, limit=None):
+    """ETag of the project listing a user would get now"""
+    return make_etag('listing', user_id, fields, filters, after, limit,
+                     get_access_version(user_id), get_data_version())
+
+def project_etag(project_id, fields=None):
+    """ETag of one project's JSON"""
+    return make_etag('project', project_id, fields, get_project_version(project_id))
+
+def load_projects(project_ids, fields=None):
+    """Projects with only the selected fields, keyed by project ID"""
+    if fields is not None and set(fields) <= set(SUMMARY_FIELDS):
+        # Everything requested is a summary column
+        return {
+            project_id: project_fields(project_id, summary, fields)
+            for project_id, summary in get_project_summaries(project_ids).items()
+        }
+
+    projects = {}
+    for project_id in project_ids:
+        project = get_project_by_id(project_id)
+        if project:
+            projects[project_id] = project_fields(project_id, project, fields)
+    return projects
+
+def get_project_listing(user_id, fields=None, filters=None, after=None, limit=None):
+    """ETag, serialized JSON and next-page cursor of the projects a user can access
+
+    Without filters or a limit every accessible project is listed and the
+    cursor is None.
+    """
+    etag = listing_etag(user_id, fields, filters, after, limit)
+    key = (user_id, fields, tuple(sorted(filters.items())) if filters else None, after, limit)
+    cached = _listings.get(key)
+    if cached is not None and cached[0] == etag:
+        return cached
+
+    if filters or limit or after is not None:
+        project_ids, next_cursor = find_project_ids(filters, after=after, limit=limit,
+                                                    project_ids=get_user_projects(user_id))
+    else:
+        project_ids, next_cursor = get_user_projects(user_id), None
+
+    listing = (etag, dumps(load_projects(project_ids, fields)), next_cursor)
+    _listings.set(key, listing)
+    return listing
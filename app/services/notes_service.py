@@ -0,0 +1,181 @@
+import json
+import os
+import re
+import struct
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+# Notes storage
+#
+# Each project has an append-only log of JSON lines plus a small index of
+# fixed-width (id, offset) records. Ids are dense and start at 1, so the index
+# record for note N lives at (N - 1) * RECORD_SIZE and reading any page of
+# notes only touches the records and lines on that page. A crash between the
+# log and index writes is repaired the next time the store is opened or
+# written: a partial index record is dropped, complete log lines past the
+# last indexed note are indexed and a partial log line is dropped.
+
+RECORD = struct.Struct('<QQ')
+RECORD_SIZE = RECORD.size
+
+DEFAULT_NOTES_DIR = 'data/notes'
+
+_PROJECT_ID = re.compile(r'^[A-Za-z0-9_-]+$')
+
+# Fallback for platforms without fcntl; only serializes threads in one process
+_thread_lock = threading.Lock()
+
+# Index paths this process has already checked for crash damage
+_recovered = set()
+
+def _paths(project_id, notes_dir):
+    """Return the log, index and legacy file paths for a project"""
+    if not _PROJECT_ID.match(project_id):
+        raise ValueError(f'Invalid project id: {project_id!r}')
+    base = os.path.join(notes_dir, f'{project_id}_notes')
+    return f'{base}.jsonl', f'{base}.idx', f'{base}.json'
+
+@contextmanager
+def _locked(index_path):
+    """Hold an exclusive lock on a project's index file"""
+    with open(index_path, 'ab') as index_file:
+        if fcntl is not None:
+            fcntl.flock(index_file, fcntl.LOCK_EX)
+            try:
+                yield index_file
+            finally:
+                fcntl.flock(index_file, fcntl.LOCK_UN)
+        else:
+            with _thread_lock:
+                yield index_file
+
+def _count_records(index_path):
+    """Number of complete records in an index file"""
+    try:
+        return os.path.getsize(index_path) // RECORD_SIZE
+    except FileNotFoundError:
+        return 0
+
+def _append(log_file, index_file, note):
+    """Append one note to the log and then to the index"""
+    log_file.seek(0, os.SEEK_END)
+    offset = log_file.tell()
+    log_file.write((json.dumps(note) + '\n').encode('utf-8'))
+    log_file.flush()
+    # The index is written last so readers never see an offset to a partial line
+    index_file.write(RECORD.pack(note['id'], offset))
+    index_file.flush()
+
+def _recover(log_path, index_path, index_file):
+    """Bring the index back in line with the log after a crash; caller holds the lock"""
+    size = os.path.getsize(index_path)
+    if size % RECORD_SIZE:
+        index_file.truncate(size - size % RECORD_SIZE)
+    count = size // RECORD_SIZE
+    if not os.path.exists(log_path):
+        return
+
+    with open(log_path, 'r+b') as log_file:
+        # The log should end right after the last indexed line
+        end = 0
+        if count:
+            with open(index_path, 'rb') as f:
+                f.seek((count - 1) * RECORD_SIZE)
+                _, offset = RECORD.unpack(f.read(RECORD_SIZE))
+            log_file.seek(offset)
+            end = offset + len(log_file.readline())
+        log_file.seek(end)
+        tail = log_file.read()
+        if not tail:
+            return
+
+        # Index complete lines written before the crash, then drop the rest
+        for line in tail.split(b'\n')[:-1]:
+            try:
+                note = json.loads(line)
+            except ValueError:
+                break
+            if note.get('id') != count + 1:
+                break
+            index_file.write(RECORD.pack(note['id'], end))
+            count += 1
+            end += len(line) + 1
+        index_file.flush()
+        log_file.truncate(end)
+
+def _migrate_legacy(log_path, index_path, legacy_path, index_file):
+    """Import a legacy whole-file JSON notes list; caller holds the lock"""
+    if not os.path.exists(legacy_path) or _count_records(index_path):
+        return
+    with open(legacy_path, 'r') as f:
+        legacy_notes = json.load(f)
+    with open(log_path, 'ab') as log_file:
+        # Legacy ids were len(notes) + 1 and could repeat, so renumber them
+        for number, note in enumerate(legacy_notes, start=1):
+            _append(log_file, index_file, dict(note, id=number))
+    os.replace(legacy_path, f'{legacy_path}.migrated')
+
+def _ensure_store(project_id, notes_dir):
+    """Create the notes directory and migrate legacy notes if needed"""
+    log_path, index_path, legacy_path = _paths(project_id, notes_dir)
+    if not os.path.exists(notes_dir):
+        os.makedirs(notes_dir, exist_ok=True)
+    if os.path.exists(legacy_path) or (index_path not in _recovered and os.path.exists(log_path)):
+        with _locked(index_path) as index_file:
+            _migrate_legacy(log_path, index_path, legacy_path, index_file)
+            _recover(log_path, index_path, index_file)
+        _recovered.add(index_path)
+    return log_path, index_path
+
+def add_note(project_id, text, user, notes_dir=DEFAULT_NOTES_DIR):
+    """Append a note to a project and return it"""
+    log_path, index_path = _ensure_store(project_id, notes_dir)
+
+    with _locked(index_path) as index_file:
+        # Another process may have crashed mid-write since this one opened the store
+        _recover(log_path, index_path, index_file)
+        with open(log_path, 'ab') as log_file:
+            note = {
+                'id': _count_records(index_path) + 1,
+                'text': text,
+                'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'user': user
+            }
+            _append(log_file, index_file, note)
+
+    return note
+
+def get_notes(project_id, limit, before=None, notes_dir=DEFAULT_NOTES_DIR):
+    """Get the latest notes of a project, oldest first
+
+    Returns (notes, next_before) where next_before is the cursor for the
+    previous page, or None when there are no older notes.
+    """
+    log_path, index_path = _ensure_store(project_id, notes_dir)
+
+    end = _count_records(index_path)
+    if before is not None:
+        end = max(min(end, before - 1), 0)
+    start = max(end - limit, 0)
+
+    if end == start:
+        return [], None
+
+    with open(index_path, 'rb') as index_file:
+        index_file.seek(start * RECORD_SIZE)
+        records = index_file.read((end - start) * RECORD_SIZE)
+
+    notes = []
+    with open(log_path, 'rb') as log_file:
+        for _, offset in RECORD.iter_unpack(records):
+            log_file.seek(offset)
+            notes.append(json.loads(log_file.readline()))
+
+    next_before = notes[0]['id'] if start > 0 else None
+    return notes, next_before
@@ -0,0 +1,204 @@
+import threading
+from datetime import date
+
+import numpy as np
+
+from app.services.project_service import get_all_projects, get_project_by_id, get_repository, add_change_listener
+from app.utils.date_utils import parse_timeline
+
+# Portfolio analytics
+#
+# Budgets, completion and dates for every project are kept in NumPy columns so
+# portfolio-wide questions are answered with array operations rather than a
+# Python loop over nested project dicts. The columns are built once and only
+# the rows of changed projects are refreshed. Writes made by other processes
+# are only visible through the repository version, so a frame built at an
+# older version is rebuilt.
+
+STATUSES = ['Planning', 'In Progress', 'Completed']
+
+class PortfolioFrame:
+    """Columnar view of project budgets, completion and dates"""
+
+    def __init__(self, projects):
+        self.ids = list(projects)
+        self.names = [project['name'] for project in projects.values()]
+        self.positions = {project_id: row for row, project_id in enumerate(self.ids)}
+        self.statuses = list(STATUSES)
+
+        size = len(self.ids)
+        self.allocated = np.zeros(size, dtype=np.int64)
+        self.spent = np.zeros(size, dtype=np.int64)
+        self.remaining = np.zeros(size, dtype=np.int64)
+        self.completion = np.zeros(size, dtype=np.float64)
+        self.status = np.zeros(size, dtype=np.int16)
+        self.start = np.full(size, np.datetime64('NaT'), dtype='datetime64[D]')
+        self.end = np.full(size, np.datetime64('NaT'), dtype='datetime64[D]')
+        self.next_milestone = np.full(size, np.datetime64('NaT'), dtype='datetime64[D]')
+
+        for row, project in enumerate(projects.values()):
+            self._fill_row(row, project)
+
+    def _status_code(self, status):
+        if status not in self.statuses:
+            self.statuses.append(status)
+        return self.statuses.index(status)
+
+    def _fill_row(self, row, project):
+        budget = project['budget']
+        self.names[row] = project['name']
+        self.allocated[row] = budget['allocated']
+        self.spent[row] = budget['spent']
+        self.remaining[row] = budget['remaining']
+        self.completion[row] = project['completion']
+        self.status[row] = self._status_code(project['status'])
+
+        start, end = parse_timeline(project.get('timeline'))
+        self.start[row] = np.datetime64(start) if start else np.datetime64('NaT')
+        self.end[row] = np.datetime64(end) if end else np.datetime64('NaT')
+
+        pending = [m['date'] for m in project['milestones'] if m['status'] != 'Completed']
+        self.next_milestone[row] = np.datetime64(min(pending)) if pending else np.datetime64('NaT')
+
+    def update(self, project_id, project):
+        """Refresh one project's row, appending or dropping it as needed"""
+        row = self.positions.get(project_id)
+        if project is None:
+            if row is not None:
+                self._delete_row(row)
+            return
+        if row is None:
+            row = self._append_row(project_id)
+        self._fill_row(row, project)
+
+    def _append_row(self, project_id):
+        self.positions[project_id] = len(self.ids)
+        self.ids.append(project_id)
+        self.names.append('')
+        for column in ('allocated', 'spent', 'remaining', 'completion', 'status'):
+            setattr(self, column, np.append(getattr(self, column), 0))
+        for column in ('start', 'end', 'next_milestone'):
+            setattr(self, column, np.append(getattr(self, column), np.datetime64('NaT')))
+        return len(self.ids) - 1
+
+    def _delete_row(self, row):
+        del self.ids[row]
+        del self.names[row]
+        for column in ('allocated', 'spent', 'remaining', 'completion', 'status', 'start', 'end', 'next_milestone'):
+            setattr(self, column, np.delete(getattr(self, column), row))
+        self.positions = {project_id: position for position, project_id in enumerate(self.ids)}
+
+    def rows(self, project_ids=None):
+        """Row numbers for a set of project ids, or every row"""
+        if project_ids is None:
+            return np.arange(len(self.ids))
+        return np.array([self.positions[p] for p in project_ids if p in self.positions], dtype=np.int64)
+
+    def summary(self, project_ids=None, today=None):
+        """Aggregate budget, completion and schedule figures"""
+        today = today or date.today()
+        rows = self.rows(project_ids)
+
+        allocated = self.allocated[rows]
+        spent = self.spent[rows]
+        completion = self.completion[rows]
+        status = self.status[rows]
+        total_allocated = int(allocated.sum())
+        total_spent = int(spent.sum())
+
+        over = rows[spent > allocated]
+        over_budget = [
+            {
+                'id': self.ids[row],
+                'name': self.names[row],
+                'allocated': int(self.allocated[row]),
+                'spent': int(self.spent[row]),
+                'over_by': int(self.spent[row] - self.allocated[row])
+            }
+            for row in over[np.argsort(self.allocated[over] - self.spent[over], kind='stable')]
+        ]
+
+        quarter_start, quarter_spend = self._quarter_spend(rows, today)
+        today_d = np.datetime64(today, 'D')
+        next_milestone = self.next_milestone[rows]
+        has_milestone = ~np.isnat(next_milestone)
+
+        return {
+            'project_count': int(rows.size),
+            'total_allocated': total_allocated,
+            'total_spent': total_spent,
+            'total_remaining': int(self.remaining[rows].sum()),
+            'percentage_spent': round(total_spent / total_allocated * 100, 1) if total_allocated else 0.0,
+            'average_completion': round(float(completion.mean()), 1) if rows.size else 0.0,
+            'status_counts': {
+                self.statuses[code]: int(count)
+                for code, count in enumerate(np.bincount(status, minlength=len(self.statuses)))
+                if count
+            },
+            'over_budget': over_budget,
+            'quarter': f'Q{(quarter_start.month - 1) // 3 + 1} {quarter_start.year}',
+            'estimated_quarter_spend': quarter_spend,
+            'overdue_milestones': int((next_milestone[has_milestone] < today_d).sum()),
+            'milestones_due_30_days': int(((next_milestone[has_milestone] >= today_d) &
+                                           (next_milestone[has_milestone] <= today_d + 30)).sum())
+        }
+
+    def _quarter_spend(self, rows, today):
+        """Estimate spend in the current quarter assuming a steady burn rate
+
+        Only totals are recorded, so each project's spend is spread evenly over
+        the elapsed part of its timeline.
+        """
+        quarter_start = date(today.year, 3 * ((today.month - 1) // 3) + 1, 1)
+        today_d = np.datetime64(today, 'D')
+        start = self.start[rows]
+        end = self.end[rows]
+        valid = ~(np.isnat(start) | np.isnat(end))
+
+        elapsed_end = np.minimum(end[valid] + 1, today_d + 1)
+        elapsed_days = (elapsed_end - start[valid]).astype(np.int64)
+        overlap_days = (elapsed_end - np.maximum(start[valid], np.datetime64(quarter_start, 'D'))).astype(np.int64)
+
+        active = elapsed_days > 0
+        rate = self.spent[rows][valid][active] / elapsed_days[active]
+        spend = float((rate * np.clip(overlap_days[active], 0, None)).sum())
+        return quarter_start, round(spend, 2)
+
+_lock = threading.RLock()
+_frame = None
+_frame_version = None
+_dirty = set()
+
+def _on_projects_changed(project_ids):
+    global _frame, _frame_version
+    with _lock:
+        if project_ids is None:
+            _frame = None
+            _dirty.clear()
+        else:
+            _dirty.update(project_ids)
+            # A save from this process moves the version by one; anything more
+            # means another process wrote too and the frame is rebuilt
+            if _frame_version is not None and get_repository().version() == _frame_version + 1:
+                _frame_version += 1
+
+add_change_listener(_on_projects_changed)
+
+def get_portfolio_frame():
+    """Get the portfolio frame, applying any pending project changes"""
+    global _frame, _frame_version
+    with _lock:
+        version = get_repository().version()
+        if _frame is None or version != _frame_version:
+            _frame = PortfolioFrame(get_all_projects())
+            _frame_version = version
+            _dirty.clear()
+        while _dirty:
+            project_id = _dirty.pop()
+            _frame.update(project_id, get_project_by_id(project_id))
+        return _frame
+
+def portfolio_summary(project_ids=None, today=None):
+    """Portfolio-wide figures for the given projects, or all projects"""
+    with _lock:
+        return get_portfolio_frame().summary(project_ids, today=today)
@@ -0,0 +1,422 @@
+import json
+import os
+import sqlite3
+import threading
+from bisect import bisect_left, bisect_right
+
+from app.utils.date_utils import parse_timeline
+
+# Project repositories
+#
+# project_service talks to one repository object. DictProjectRepository wraps
+# the in-memory mock data; SQLiteProjectRepository keeps the portfolio in a
+# SQLite file so each worker only loads the projects it is asked about.
+
+# Keys stored in their own columns; anything else goes to the extra column
+CORE_KEYS = {'name', 'status', 'completion', 'timeline', 'budget', 'issues', 'resources', 'milestones'}
+
+# Keys of the compact summary used by project lists; all are columns
+SUMMARY_KEYS = ('name', 'status', 'completion', 'timeline')
+
+# Sorts after any project id in range lookups
+MAX_ID = '\U0010ffff'
+
+# Project filters understood by iter_project_ids:
+#   status           tuple of statuses to include
+#   completion_min   lowest completion percentage
+#   completion_max   highest completion percentage
+#   due_from, due_to date range (YYYY-MM-DD) of an unfinished milestone
+#   has_open_issues  True or False to require or exclude unresolved issues
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    completion INTEGER NOT NULL,
+    timeline TEXT,
+    start_date TEXT,
+    end_date TEXT,
+    allocated INTEGER NOT NULL,
+    spent INTEGER NOT NULL,
+    remaining INTEGER NOT NULL,
+    workers INTEGER NOT NULL,
+    equipment TEXT NOT NULL,
+    extra TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS issues (
+    project_id TEXT NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    description TEXT NOT NULL,
+    status TEXT NOT NULL,
+    date TEXT NOT NULL,
+    PRIMARY KEY (project_id, position)
+);
+CREATE TABLE IF NOT EXISTS milestones (
+    project_id TEXT NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    date TEXT NOT NULL,
+    PRIMARY KEY (project_id, position)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_projects_status ON projects(status);
+CREATE INDEX IF NOT EXISTS idx_projects_completion ON projects(completion);
+CREATE INDEX IF NOT EXISTS idx_projects_start_date ON projects(start_date);
+CREATE INDEX IF NOT EXISTS idx_projects_end_date ON projects(end_date);
+CREATE INDEX IF NOT EXISTS idx_issues_status ON issues(status, project_id);
+CREATE INDEX IF NOT EXISTS idx_milestones_date ON milestones(date, project_id);
+CREATE INDEX IF NOT EXISTS idx_milestones_status ON milestones(status, project_id);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+'''
+
+def is_open_issue(issue):
+    return issue['status'] != 'Resolved'
+
+def is_unfinished_milestone(milestone):
+    return milestone['status'] != 'Completed'
+
+class ProjectFilterIndex:
+    """Secondary indexes over in-memory projects for filtered listings"""
+
+    def __init__(self, projects):
+        self.ids = sorted(projects)
+        self.by_status = {}
+        # Sorted (completion, project_id) and (date, project_id) pairs for range lookups
+        self.by_completion = []
+        self.by_due_date = []
+        self.open_issues = set()
+
+        for project_id, project in projects.items():
+            self.by_status.setdefault(project['status'], set()).add(project_id)
+            self.by_completion.append((project['completion'], project_id))
+            for milestone in project['milestones']:
+                if is_unfinished_milestone(milestone):
+                    self.by_due_date.append((milestone['date'], project_id))
+            if any(is_open_issue(issue) for issue in project['issues']):
+                self.open_issues.add(project_id)
+        self.by_completion.sort()
+        self.by_due_date.sort()
+
+    @staticmethod
+    def _range(pairs, low, high):
+        start = 0 if low is None else bisect_left(pairs, (low, ''))
+        end = len(pairs) if high is None else bisect_right(pairs, (high, MAX_ID))
+        return {project_id for _, project_id in pairs[start:end]}
+
+    def matching_ids(self, filters):
+        """Sorted ids of the projects that pass every filter"""
+        candidates = None
+
+        def narrow(ids):
+            nonlocal candidates
+            candidates = set(ids) if candidates is None else candidates & ids
+
+        if filters.get('status'):
+            narrow(set().union(*(self.by_status.get(status, set()) for status in filters['status'])))
+        if filters.get('completion_min') is not None or filters.get('completion_max') is not None:
+            narrow(self._range(self.by_completion, filters.get('completion_min'), filters.get('completion_max')))
+        if filters.get('due_from') or filters.get('due_to'):
+            narrow(self._range(self.by_due_date, filters.get('due_from'), filters.get('due_to')))
+        if filters.get('has_open_issues') is True:
+            narrow(self.open_issues)
+
+        ids = self.ids if candidates is None else sorted(candidates)
+        if filters.get('has_open_issues') is False:
+            ids = [project_id for project_id in ids if project_id not in self.open_issues]
+        return ids
+
+class DictProjectRepository:
+    """Repository over an in-memory dict of projects"""
+
+    def __init__(self, project_data):
+        self.project_data = project_data
+        self._version = 0
+        self._filter_index = None
+
+    def version(self):
+        """Counter bumped by every save"""
+        return self._version
+
+    def invalidate(self):
+        """Drop indexes after project_data was changed in place"""
+        self._filter_index = None
+
+    def iter_project_ids(self, filters, after=None):
+        """Ids of projects matching filters in id order, starting after a cursor"""
+        if self._filter_index is None:
+            self._filter_index = ProjectFilterIndex(self.project_data)
+        ids = self._filter_index.matching_ids(filters)
+        start = bisect_right(ids, after) if after is not None else 0
+        yield from ids[start:]
+
+    def get(self, project_id):
+        return self.project_data.get(project_id)
+
+    def get_all(self):
+        return self.project_data
+
+    def get_names(self):
+        # Project dicts already carry name and aliases
+        return self.project_data
+
+    def get_summaries(self, project_ids):
+        summaries = {}
+        for project_id in project_ids:
+            project = self.project_data.get(project_id)
+            if project:
+                summaries[project_id] = {key: project[key] for key in SUMMARY_KEYS}
+        return summaries
+
+    def get_locations(self):
+        return {
+            project_id: project['location']
+            for project_id, project in self.project_data.items()
+            if project.get('location')
+        }
+
+    def get_milestones(self, project_id):
+        project = self.get(project_id)
+        return project['milestones'] if project else []
+
+    def get_issues(self, project_id):
+        project = self.get(project_id)
+        return project['issues'] if project else []
+
+    def get_budget(self, project_id):
+        project = self.get(project_id)
+        return project['budget'] if project else None
+
+    def save(self, project_id, project):
+        self.project_data[project_id] = project
+        self._version += 1
+        self._filter_index = None
+
+class SQLiteProjectRepository:
+    """Repository backed by a SQLite database file"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._names = None
+        self._names_version = None
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        # SQLite connections cannot be shared between threads
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA foreign_keys = ON')
+            connection.execute('PRAGMA journal_mode = WAL')
+            self._local.connection = connection
+        return connection
+
+    def version(self):
+        """Counter bumped by every write, visible to all processes"""
+        row = self._connection().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row['value']
+
+    def get(self, project_id):
+        connection = self._connection()
+        row = connection.execute('SELECT * FROM projects WHERE id = ?', (project_id,)).fetchone()
+        if row is None:
+            return None
+        return self._build_project(row, self.get_issues(project_id), self.get_milestones(project_id))
+
+    def get_all(self):
+        """Materialize every project; prefer get() or the targeted getters"""
+        connection = self._connection()
+        issues = {}
+        for row in connection.execute('SELECT * FROM issues ORDER BY project_id, position'):
+            issues.setdefault(row['project_id'], []).append(self._build_issue(row))
+        milestones = {}
+        for row in connection.execute('SELECT * FROM milestones ORDER BY project_id, position'):
+            milestones.setdefault(row['project_id'], []).append(self._build_milestone(row))
+        return {
+            row['id']: self._build_project(row, issues.get(row['id'], []), milestones.get(row['id'], []))
+            for row in connection.execute('SELECT * FROM projects ORDER BY id')
+        }
+
+    def invalidate(self):
+        """Drop cached lookups"""
+        self._names = None
+
+    def iter_project_ids(self, filters, after=None):
+        """Ids of projects matching filters in id order, starting after a cursor
+
+        Each filter maps onto an indexed column or an indexed subquery.
+        """
+        clauses = []
+        params = []
+        if filters.get('status'):
+            clauses.append(f"status IN ({', '.join('?' * len(filters['status']))})")
+            params.extend(filters['status'])
+        if filters.get('completion_min') is not None:
+            clauses.append('completion >= ?')
+            params.append(filters['completion_min'])
+        if filters.get('completion_max') is not None:
+            clauses.append('completion <= ?')
+            params.append(filters['completion_max'])
+        if filters.get('due_from') or filters.get('due_to'):
+            clauses.append("id IN (SELECT project_id FROM milestones WHERE date BETWEEN ? AND ? "
+                           "AND status != 'Completed')")
+            params.extend([filters.get('due_from') or '', filters.get('due_to') or MAX_ID])
+        if filters.get('has_open_issues') is not None:
+            exists = "EXISTS (SELECT 1 FROM issues WHERE issues.project_id = projects.id AND status != 'Resolved')"
+            clauses.append(exists if filters['has_open_issues'] else f'NOT {exists}')
+        if after is not None:
+            clauses.append('id > ?')
+            params.append(after)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        # Rows are read in batches so callers can stop after a page; the
+        # cursor is closed even when the generator is abandoned
+        cursor = self._connection().execute(f'SELECT id FROM projects {where} ORDER BY id', params)
+        try:
+            while True:
+                rows = cursor.fetchmany(200)
+                if not rows:
+                    return
+                for row in rows:
+                    yield row['id']
+        finally:
+            cursor.close()
+
+    def get_names(self):
+        """Name and aliases of every project, cached until the data changes"""
+        version = self.version()
+        if self._names is None or self._names_version != version:
+            names = {}
+            for row in self._connection().execute('SELECT id, name, extra FROM projects ORDER BY id'):
+                aliases = json.loads(row['extra']).get('aliases', [])
+                names[row['id']] = {'name': row['name'], 'aliases': aliases}
+            self._names, self._names_version = names, version
+        return self._names
+
+    def get_summaries(self, project_ids):
+        """Summary columns of many projects without loading issues or milestones"""
+        project_ids = list(project_ids)
+        rows = {}
+        connection = self._connection()
+        # Stay well under SQLite's limit on bound parameters
+        for start in range(0, len(project_ids), 500):
+            chunk = project_ids[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            for row in connection.execute(
+                    f'SELECT id, {", ".join(SUMMARY_KEYS)} FROM projects WHERE id IN ({placeholders})', chunk):
+                rows[row['id']] = {key: row[key] for key in SUMMARY_KEYS}
+        # Keep the order the ids were asked for
+        return {project_id: rows[project_id] for project_id in project_ids if project_id in rows}
+
+    def get_locations(self):
+        """Site location of every project that has one"""
+        locations = {}
+        for row in self._connection().execute('SELECT id, extra FROM projects ORDER BY id'):
+            location = json.loads(row['extra']).get('location')
+            if location:
+                locations[row['id']] = location
+        return locations
+
+    def get_milestones(self, project_id):
+        rows = self._connection().execute(
+            'SELECT * FROM milestones WHERE project_id = ? ORDER BY position', (project_id,))
+        return [self._build_milestone(row) for row in rows]
+
+    def get_issues(self, project_id):
+        rows = self._connection().execute(
+            'SELECT * FROM issues WHERE project_id = ? ORDER BY position', (project_id,))
+        return [self._build_issue(row) for row in rows]
+
+    def get_budget(self, project_id):
+        row = self._connection().execute(
+            'SELECT allocated, spent, remaining FROM projects WHERE id = ?', (project_id,)).fetchone()
+        return dict(row) if row else None
+
+    def save(self, project_id, project):
+        self.save_many({project_id: project})
+
+    def save_many(self, projects):
+        """Insert or replace projects in a single transaction"""
+        with self._connection() as connection:
+            for project_id, project in projects.items():
+                self._write_project(connection, project_id, project)
+            connection.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def _write_project(self, connection, project_id, project):
+        start_date, end_date = parse_timeline(project.get('timeline'))
+        budget = project['budget']
+        resources = project['resources']
+        extra = {key: value for key, value in project.items() if key not in CORE_KEYS}
+
+        connection.execute('DELETE FROM projects WHERE id = ?', (project_id,))
+        connection.execute(
+            'INSERT INTO projects (id, name, status, completion, timeline, start_date, end_date, '
+            'allocated, spent, remaining, workers, equipment, extra) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (project_id, project['name'], project['status'], project['completion'], project.get('timeline'),
+             start_date, end_date, budget['allocated'], budget['spent'], budget['remaining'],
+             resources['workers'], json.dumps(resources['equipment']), json.dumps(extra)))
+        connection.executemany(
+            'INSERT INTO issues (project_id, position, id, description, status, date) VALUES (?, ?, ?, ?, ?, ?)',
+            [(project_id, position, issue['id'], issue['description'], issue['status'], issue['date'])
+             for position, issue in enumerate(project['issues'])])
+        connection.executemany(
+            'INSERT INTO milestones (project_id, position, name, status, date) VALUES (?, ?, ?, ?, ?)',
+            [(project_id, position, milestone['name'], milestone['status'], milestone['date'])
+             for position, milestone in enumerate(project['milestones'])])
+
+    @staticmethod
+    def _build_issue(row):
+        return {'id': row['id'], 'description': row['description'], 'status': row['status'], 'date': row['date']}
+
+    @staticmethod
+    def _build_milestone(row):
+        return {'name': row['name'], 'status': row['status'], 'date': row['date']}
+
+    @staticmethod
+    def _build_project(row, issues, milestones):
+        """Rebuild the nested project dict used throughout the app"""
+        project = {
+            'name': row['name'],
+            'status': row['status'],
+            'completion': row['completion'],
+            'timeline': row['timeline'],
+            'budget': {
+                'allocated': row['allocated'],
+                'spent': row['spent'],
+                'remaining': row['remaining']
+            },
+            'issues': issues,
+            'resources': {
+                'workers': row['workers'],
+                'equipment': json.loads(row['equipment'])
+            },
+            'milestones': milestones
+        }
+        project.update(json.loads(row['extra']))
+        return project
+
+def load_project_data(db_path, project_data):
+    """Import a dict of projects into a SQLite database"""
+    directory = os.path.dirname(db_path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    repository = SQLiteProjectRepository(db_path)
+    repository.save_many(project_data)
+    return repository
+
+if __name__ == '__main__':
+    # Usage: python -m app.services.project_repository data/projects.db
+    import sys
+    from data.projects import project_data
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'data/projects.db'
+    load_project_data(db_path, project_data)
+    print(f"Loaded {len(project_data)} projects into {db_path}")
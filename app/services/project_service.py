@@ -1,27 +1,79 @@
+from app.services.project_repository import DictProjectRepository, SQLiteProjectRepository
+from app.utils.project_index import invalidate_project_index
 from data.projects import project_data
 
+_repository = DictProjectRepository(project_data)
+
+def configure_repository(db_path=None):
+    """Use a SQLite database for project data, or the in-memory dict if no path"""
+    global _repository
+    if db_path:
+        _repository = SQLiteProjectRepository(db_path)
+    else:
+        _repository = DictProjectRepository(project_data)
+    mark_projects_changed()
+    return _repository
+
+def get_repository():
+    """Get the active project repository"""
+    return _repository
+
 def get_all_projects():
     """Get all projects"""
-    return project_data
+    return _repository.get_all()
+
+def get_project_names():
+    """Get the name and aliases of every project, keyed by project ID"""
+    return _repository.get_names()
+
+def get_project_locations():
+    """Get the site location of every project, keyed by project ID"""
+    return _repository.get_locations()
+
+def get_project_summaries(project_ids):
+    """Get name, status, completion and timeline of several projects, keyed by project ID"""
+    return _repository.get_summaries(project_ids)
+
+def find_project_ids(filters=None, after=None, limit=None, project_ids=None):
+    """Ids of projects matching filters, in id order, one page at a time
+    
+    Only ids in project_ids are returned when it is given. Returns the ids
+    and the cursor for the next page, or None on the last page.
+    """
+    allowed = set(project_ids) if project_ids is not None else None
+    ids = []
+    matching = _repository.iter_project_ids(filters or {}, after=after)
+    try:
+        for project_id in matching:
+            if allowed is None or project_id in allowed:
+                ids.append(project_id)
+                if limit and len(ids) > limit:
+                    return ids[:limit], ids[limit - 1]
+    finally:
+        # Release the repository's cursor when stopping after a page
+        matching.close()
+    return ids, None
 
 def get_project_by_id(project_id):
     """Get project by ID"""
-    return project_data.get(project_id)
+    return _repository.get(project_id)
 
 def get_project_milestones(project_id):
     """Get project milestones"""
-    project = get_project_by_id(project_id)
-    return project['milestones'] if project else []
+    return _repository.get_milestones(project_id)
 
 def get_project_issues(project_id):
     """Get project issues"""
-    project = get_project_by_id(project_id)
-    return project['issues'] if project else []
+    return _repository.get_issues(project_id)
 
 def get_project_budget(project_id):
     """Get project budget"""
-    project = get_project_by_id(project_id)
-    return project['budget'] if project else None
+    return _repository.get_budget(project_id)
+
+def save_project(project_id, project):
+    """Create or replace a project"""
+    _repository.save(project_id, project)
+    mark_projects_changed([project_id])
 
 def calculate_budget_metrics(project_id):
     """Calculate budget metrics"""
@@ -33,4 +85,43 @@ def calculate_budget_metrics(project_id):
         'percentage_spent': (budget['spent'] / budget['allocated']) * 100,
         'percentage_remaining': (budget['remaining'] / budget['allocated']) * 100,
         'is_over_budget': budget['spent'] > budget['allocated']
-    }
\ No newline at end of file
+    }
+
+_change_listeners = []
+
+# Bumped on every change, and per project for targeted changes. Together with
+# the repository's own version they stamp project data for HTTP caching.
+_data_version = 0
+_epoch = 0
+_project_versions = {}
+
+def add_change_listener(listener):
+    """Register listener(project_ids) to be told when project data changes
+    
+    project_ids is the list of changed projects, or None when any project
+    may have changed.
+    """
+    _change_listeners.append(listener)
+
+def mark_projects_changed(project_ids=None):
+    """Call after project data changes so derived indexes are rebuilt"""
+    global _data_version, _epoch
+    _data_version += 1
+    if project_ids is None:
+        _epoch += 1
+    else:
+        for project_id in project_ids:
+            _project_versions[project_id] = _project_versions.get(project_id, 0) + 1
+    _repository.invalidate()
+    invalidate_project_index()
+    for listener in _change_listeners:
+        listener(project_ids)
+
+def get_data_version():
+    """Version stamp of all project data; changes whenever any project does"""
+    return f'{_data_version}.{_repository.version()}'
+
+def get_project_version(project_id):
+    """Version stamp of one project"""
+    # Writes from other processes are only visible through the repository version
+    return f'{_epoch}.{_project_versions.get(project_id, 0)}.{_repository.version()}'
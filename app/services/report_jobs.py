@@ -0,0 +1,232 @@
+import json
+import logging
+import os
+import re
+import threading
+import uuid
+from datetime import datetime
+
+from app.utils.cache import prune_directory
+from app.utils.metrics import REPORT_RENDERS, REPORT_FAILURES
+
+# Background report jobs
+#
+# PDF rendering runs in a small process pool so it never blocks a web worker.
+# Job state is kept in small JSON files next to the reports, so any worker
+# process can answer a status request for a job submitted to another one.
+# Portfolio reports are coordinated by a thread in the submitting process that
+# feeds chunks of projects to a separate pool, so a large portfolio never holds
+# up single-project reports. Metrics for pooled jobs are
+# recorded by the submitting process when the job finishes. Only the most
+# recent job state files are kept. A pool whose worker process died is
+# replaced on the next submit.
+
+logger = logging.getLogger(__name__)
+
+_JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+_lock = threading.Lock()
+# Pool name -> executor, created on first use
+_executors = {}
+_pending = 0
+_settings = {
+    'max_workers': 2,
+    'portfolio_workers': 1,
+    'queue_limit': 8,
+    'reports_dir': 'reports',
+    'cache_max_files': 200,
+    'cache_max_bytes': 200 * 1024 * 1024,
+    'jobs_max_files': 500,
+}
+
+class ReportQueueFull(Exception):
+    """Raised when too many report jobs are already waiting"""
+
+def configure_report_jobs(max_workers=2, queue_limit=8, reports_dir='reports', **limits):
+    """Set pool sizes, queue depth, output directory, report cache and job file limits"""
+    _settings.update(max_workers=max_workers, queue_limit=queue_limit, reports_dir=reports_dir, **limits)
+
+def _jobs_dir(reports_dir):
+    return os.path.join(reports_dir, 'jobs')
+
+def _write_job(reports_dir, job):
+    """Atomically write a job state file"""
+    jobs_dir = _jobs_dir(reports_dir)
+    os.makedirs(jobs_dir, exist_ok=True)
+    path = os.path.join(jobs_dir, f"{job['id']}.json")
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(job, f)
+    os.replace(tmp_path, path)
+
+def _run_report_job(job, project, reports_dir, cache_limits):
+    """Render a report inside a pool process and record the outcome"""
+    from app.utils.report_generator import generate_project_report, cached_report_path
+
+    job = dict(job, status='running', started=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    _write_job(reports_dir, job)
+    try:
+        job['cached'] = os.path.exists(cached_report_path(project, reports_dir))
+        report_path = generate_project_report(project, output_dir=reports_dir, **cache_limits)
+        job.update(status='done', filename=os.path.basename(report_path))
+    except Exception as e:
+        job.update(status='error', error=str(e))
+    job['finished'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    _write_job(reports_dir, job)
+    return job
+
+def _get_executor(pool='report'):
+    # Also called from portfolio coordinator threads
+    with _lock:
+        executor = _executors.get(pool)
+        if executor is None:
+            from app.utils.process_pool import new_process_pool
+            size = _settings['portfolio_workers'] if pool == 'portfolio' else _settings['max_workers']
+            executor = _executors[pool] = new_process_pool(size)
+        return executor
+
+def _record_job(kind, job):
+    if job is None or job['status'] == 'error':
+        REPORT_FAILURES.inc(kind)
+    else:
+        REPORT_RENDERS.inc(kind, 'hit' if job.get('cached') else 'miss')
+
+def _discard_executor(executor):
+    """Forget a broken pool so the next submit starts a new one"""
+    with _lock:
+        for pool, current in list(_executors.items()):
+            if current is executor:
+                del _executors[pool]
+    executor.shutdown(wait=False)
+
+def _submit(fn, *args):
+    """Submit to the pool, replacing it once if a worker process died"""
+    from concurrent.futures.process import BrokenProcessPool
+    executor = _get_executor()
+    try:
+        return executor.submit(fn, *args)
+    except BrokenProcessPool:
+        logger.warning('report_jobs.pool_broken restarting')
+        _discard_executor(executor)
+        return _get_executor().submit(fn, *args)
+
+def _prune_jobs(reports_dir):
+    prune_directory(_jobs_dir(reports_dir), suffix='.json', max_files=_settings['jobs_max_files'])
+
+def _job_finished(future):
+    global _pending
+    with _lock:
+        _pending -= 1
+    if future is not None:
+        _record_job('project', None if future.cancelled() or future.exception() else future.result())
+
+def _reserve_slot():
+    global _pending
+    with _lock:
+        if _pending >= _settings['queue_limit']:
+            raise ReportQueueFull('Too many reports are being generated, please try again shortly.')
+        _pending += 1
+
+def submit_report_job(project_id, project):
+    """Queue a report for rendering and return the new job"""
+    global _pending
+    reports_dir = _settings['reports_dir']
+
+    _reserve_slot()
+
+    job = {
+        'id': uuid.uuid4().hex,
+        'project_id': project_id,
+        'status': 'queued',
+        'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    try:
+        # The queued state must exist before a pool process can mark it running
+        _write_job(reports_dir, job)
+        cache_limits = {
+            'cache_max_files': _settings['cache_max_files'],
+            'cache_max_bytes': _settings['cache_max_bytes']
+        }
+        future = _submit(_run_report_job, job, project, reports_dir, cache_limits)
+    except Exception:
+        with _lock:
+            _pending -= 1
+        raise
+    future.add_done_callback(_job_finished)
+    _prune_jobs(reports_dir)
+    return job
+
+def _run_portfolio_job(job, project_ids, reports_dir, cache_max_files):
+    """Feed projects to the pool chunk by chunk and record the outcome"""
+    from concurrent.futures.process import BrokenProcessPool
+    from app.services.project_service import get_project_by_id
+    from app.utils.report_generator import generate_portfolio_report
+
+    job = dict(job, status='running', started=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    _write_job(reports_dir, job)
+    executor = _get_executor('portfolio')
+    try:
+        # Projects are loaded one at a time as chunks are handed out
+        def load_projects():
+            for project_id in project_ids:
+                project = get_project_by_id(project_id)
+                if project:
+                    yield project_id, project
+
+        report_path = generate_portfolio_report(load_projects(), output_dir=reports_dir, executor=executor,
+                                                max_workers=_settings['portfolio_workers'],
+                                                cache_max_files=cache_max_files)
+        job.update(status='done', filename=os.path.basename(report_path))
+    except BrokenProcessPool as e:
+        _discard_executor(executor)
+        job.update(status='error', error=str(e))
+    except Exception as e:
+        job.update(status='error', error=str(e))
+    job['finished'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    _write_job(reports_dir, job)
+    _record_job('portfolio', job)
+    _job_finished(None)
+    return job
+
+def submit_portfolio_report_job(project_ids):
+    """Queue a report covering several projects and return the new job"""
+    global _pending
+    reports_dir = _settings['reports_dir']
+
+    _reserve_slot()
+
+    job = {
+        'id': uuid.uuid4().hex,
+        'project_ids': list(project_ids),
+        'status': 'queued',
+        'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    try:
+        _write_job(reports_dir, job)
+        threading.Thread(
+            target=_run_portfolio_job,
+            args=(job, job['project_ids'], reports_dir, _settings['cache_max_files']),
+            name=f"portfolio-report-{job['id'][:8]}",
+            daemon=True
+        ).start()
+    except Exception:
+        with _lock:
+            _pending -= 1
+        raise
+    _prune_jobs(reports_dir)
+    return job
+
+def get_report_job(job_id):
+    """Get the state of a report job, or None if it does not exist"""
+    if not _JOB_ID.match(job_id):
+        return None
+    path = os.path.join(_jobs_dir(_settings['reports_dir']), f'{job_id}.json')
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def pending_report_jobs():
+    """Number of jobs submitted by this process that have not finished"""
+    return _pending
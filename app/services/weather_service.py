@@ -0,0 +1,256 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+from app.utils.metrics import register_collector
+
+# Weather forecasts
+#
+# Forecasts come from a pluggable provider and are cached per location. A
+# forecast is served from memory while fresh; once it expires it is still
+# served while a single background refresh runs, and concurrent requests for a
+# location that is not cached share one upstream call. A background
+# prefetcher keeps every project site warm so chat requests never wait on the
+# upstream API.
+
+OPENWEATHERMAP_URL = 'https://api.openweathermap.org/data/2.5/forecast'
+
+logger = logging.getLogger(__name__)
+
+# Used for projects without a stored site location
+DEFAULT_LOCATION = {'city': 'New York', 'lat': 40.7128, 'lon': -74.0060}
+
+# Size in degrees of the grid cells that share one forecast (about 11 km)
+GRID_SIZE = 0.1
+
+class WeatherUnavailable(Exception):
+    """Raised when no forecast can be fetched or served from cache"""
+
+class StubWeatherProvider:
+    """Offline provider returning a fixed forecast"""
+
+    def fetch(self, location):
+        today = datetime.now().strftime('%Y-%m-%d')
+        return {
+            'city': {'name': location['city']},
+            'list': [
+                {
+                    'dt_txt': today,
+                    'main': {'temp': 72, 'humidity': 65},
+                    'weather': [{'description': 'Partly cloudy', 'icon': '02d'}],
+                    'wind': {'speed': 8}
+                },
+                {
+                    'dt_txt': today,
+                    'main': {'temp': 75, 'humidity': 60},
+                    'weather': [{'description': 'Sunny', 'icon': '01d'}],
+                    'wind': {'speed': 5}
+                },
+                {
+                    'dt_txt': today,
+                    'main': {'temp': 68, 'humidity': 70},
+                    'weather': [{'description': 'Light rain', 'icon': '10d'}],
+                    'wind': {'speed': 10}
+                }
+            ]
+        }
+
+class OpenWeatherMapProvider:
+    """OpenWeatherMap forecast API over a pooled HTTP session"""
+
+    def __init__(self, api_key, timeout=3.0, pool_size=10):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._session = None
+        self._lock = threading.Lock()
+
+    def _get_session(self):
+        # requests is only imported once weather is actually fetched
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                self._session = session
+            return self._session
+
+    def fetch(self, location):
+        response = self._get_session().get(OPENWEATHERMAP_URL, params={
+            'lat': location['lat'],
+            'lon': location['lon'],
+            'appid': self.api_key,
+            'units': 'imperial'
+        }, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+def location_key(location, grid_size=GRID_SIZE):
+    """Grid cell of a location; sites in the same cell share a forecast"""
+    return (round(location['lat'] / grid_size), round(location['lon'] / grid_size))
+
+class WeatherService:
+    """Cached, coalescing front end to a weather provider"""
+
+    def __init__(self, provider, ttl=3600, stale_ttl=6 * 3600, grid_size=GRID_SIZE):
+        self.provider = provider
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.grid_size = grid_size
+        self.hits = 0
+        self.misses = 0
+        self.upstream_calls = 0
+        # key -> (forecast, fetched_at)
+        self._entries = {}
+        # key -> Future for the fetch in progress
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get_forecast(self, location):
+        """Get a forecast, from cache when possible"""
+        key = location_key(location, self.grid_size)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[1] < self.ttl:
+                self.hits += 1
+                return entry[0]
+
+            stale = entry if entry and now - entry[1] < self.stale_ttl else None
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+            if stale:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if stale:
+            # Serve the expired forecast and refresh it in the background
+            if owner:
+                threading.Thread(target=self._refresh, args=(key, location, future), daemon=True).start()
+            return stale[0]
+
+        if owner:
+            self._refresh(key, location, future)
+
+        try:
+            return future.result()
+        except Exception as e:
+            raise WeatherUnavailable(f'Weather for {location["city"]} is unavailable: {e}') from e
+
+    def refresh(self, location):
+        """Fetch a location now, unless a fetch is already running"""
+        key = location_key(location, self.grid_size)
+        with self._lock:
+            if key in self._inflight:
+                return False
+            future = self._inflight[key] = Future()
+        self._refresh(key, location, future)
+        return future.exception() is None
+
+    def _refresh(self, key, location, future):
+        """Fetch from the provider and resolve everyone waiting on future"""
+        with self._lock:
+            self.upstream_calls += 1
+        try:
+            forecast = self.provider.fetch(location)
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            self._entries[key] = (forecast, time.monotonic())
+            self._inflight.pop(key, None)
+        future.set_result(forecast)
+
+    def prefetch(self, locations):
+        """Refresh forecasts for many sites with one fetch per grid cell
+
+        Returns the number of upstream fetches that succeeded.
+        """
+        cells = {}
+        for location in locations:
+            cells.setdefault(location_key(location, self.grid_size), location)
+
+        refreshed = 0
+        for location in cells.values():
+            if self.refresh(location):
+                refreshed += 1
+        return refreshed
+
+class WeatherPrefetcher:
+    """Daemon thread that periodically prefetches every project site
+
+    The service is looked up on every run, so it follows configure_weather().
+    """
+
+    def __init__(self, get_service, get_locations, interval):
+        self.get_service = get_service
+        self.get_locations = get_locations
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='weather-prefetch', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self):
+        """Prefetch every site once with the active service"""
+        return self.get_service().prefetch(self.get_locations().values())
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.warning('weather.prefetch_failed error=%s', e)
+            self._stop.wait(self.interval)
+
+_service = WeatherService(StubWeatherProvider())
+_prefetcher = None
+
+def _collect_weather_metrics():
+    yield 'weather_cache_hits_total', 'counter', 'Forecasts served from the cache', _service.hits
+    yield 'weather_cache_misses_total', 'counter', 'Forecasts that had to wait for the provider', _service.misses
+    yield 'weather_upstream_calls_total', 'counter', 'Requests made to the weather provider', _service.upstream_calls
+
+register_collector(_collect_weather_metrics)
+
+def configure_weather(provider='stub', api_key=None, ttl=3600, stale_ttl=6 * 3600, timeout=3.0, pool_size=10,
+                      grid_size=GRID_SIZE):
+    """Choose the weather provider and cache lifetimes"""
+    global _service
+    if provider == 'openweathermap':
+        weather_provider = OpenWeatherMapProvider(api_key, timeout=timeout, pool_size=pool_size)
+    elif provider == 'stub':
+        weather_provider = StubWeatherProvider()
+    else:
+        raise ValueError(f'Unknown weather provider: {provider}')
+    _service = WeatherService(weather_provider, ttl=ttl, stale_ttl=stale_ttl, grid_size=grid_size)
+    return _service
+
+def get_weather_service():
+    """Get the active weather service"""
+    return _service
+
+def start_weather_prefetcher(get_locations, interval):
+    """Start prefetching forecasts for every project site, once per process"""
+    global _prefetcher
+    if _prefetcher is None:
+        _prefetcher = WeatherPrefetcher(get_weather_service, get_locations, interval).start()
+    return _prefetcher
@@ -7,6 +7,8 @@ document.addEventListener('DOMContentLoaded', function() {
     const projectSummary = document.getElementById('project-summary');
     
     let currentProjectId = null;
+    // Projects already downloaded, with the ETag of each
+    const projectCache = {};
 
     // Initialize project buttons if available
     initializeProjectButtons();
@@ -51,12 +53,15 @@ document.addEventListener('DOMContentLoaded', function() {
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ message }),
+            // Ask the server to run report, chart, weather and notes actions in the same request
+            body: JSON.stringify({ message, fuse: true }),
         })
         .then(response => response.json())
         .then(data => {
             if (data.status === 'success') {
-                if (data.message === 'GENERATE_REPORT') {
+                if (data.result) {
+                    showActionResult(data.action, data.result);
+                } else if (data.message === 'GENERATE_REPORT') {
                     generateReport();
                     addMessage('bot', 'Generating report, please wait...');
                 } else if (data.message === 'SHOW_BUDGET_CHART') {
@@ -87,6 +92,26 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Show the result of an action the server already ran
+    function showActionResult(action, result) {
+        if (result.status !== 'success') {
+            addMessage('bot', `Error: ${result.message}`);
+        } else if (action === 'report') {
+            if (result.job_id) {
+                addMessage('bot', 'Generating report, please wait...');
+            }
+            showReport(result);
+        } else if (action === 'chart') {
+            showChart(result);
+        } else if (action === 'weather') {
+            showWeather(result);
+        } else if (action === 'add_note') {
+            showNoteAdded(result);
+        } else if (action === 'view_notes') {
+            showNotes(result);
+        }
+    }
+
     function showProjectSelector() {
         const projectSelector = document.getElementById('project-selector');
         if (projectSelector) {
@@ -137,7 +162,8 @@ document.addEventListener('DOMContentLoaded', function() {
     
     function loadProjectData() {
         console.log('Loading project data...');
-        fetch('/api/projects')
+        // The selector buttons only show name and status
+        fetch('/api/projects?fields=name,status')
         .then(response => {
             console.log('Response status:', response.status);
             return response.json();
@@ -171,16 +197,29 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     function selectProject(projectId) {
+        const headers = {
+            'Content-Type': 'application/json',
+        };
+        // Only download the project again if it changed since we last saw it
+        const cached = projectCache[projectId];
+        if (cached) {
+            headers['If-None-Match'] = cached.etag;
+        }
+        
         fetch('/api/select_project', {
             method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ project_id: projectId }),
+            headers,
+            // The summary panel only needs the summary fields
+            body: JSON.stringify({ project_id: projectId, fields: 'summary' }),
         })
-        .then(response => response.json())
-        .then(data => {
+        .then(response => response.json().then(data => ({ data, etag: response.headers.get('ETag') })))
+        .then(({ data, etag }) => {
             if (data.status === 'success') {
+                if (data.not_modified) {
+                    data.project = cached.project;
+                } else if (etag) {
+                    projectCache[projectId] = { etag, project: data.project };
+                }
                 currentProjectId = projectId;
                 document.getElementById('project-selector').style.display = 'none';
                 updateProjectSummary(data.project);
@@ -218,13 +257,40 @@ document.addEventListener('DOMContentLoaded', function() {
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({}),
+            body: JSON.stringify({ async: true }),
         })
         .then(response => response.json())
         .then(data => {
             if (data.status === 'success') {
-                const message = `${data.message}. <a href="${data.download_url}" target="_blank" class="download-link">Download Report</a>`;
+                showReport(data);
+            } else {
+                addMessage('bot', `Error: ${data.message}`);
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            addMessage('bot', 'Sorry, there was an error generating the report.');
+        });
+    }
+
+    function showReport(data) {
+        if (data.job_id) {
+            pollReportJob(data.status_url);
+        } else {
+            const message = `${data.message}. <a href="${data.download_url}" target="_blank" class="download-link">Download Report</a>`;
+            addFormattedMessage('bot', message);
+        }
+    }
+
+    function pollReportJob(statusUrl) {
+        fetch(statusUrl)
+        .then(response => response.json())
+        .then(data => {
+            if (data.job_status === 'done') {
+                const message = `Report generated successfully. <a href="${data.download_url}" target="_blank" class="download-link">Download Report</a>`;
                 addFormattedMessage('bot', message);
+            } else if (data.job_status === 'queued' || data.job_status === 'running') {
+                setTimeout(() => pollReportJob(statusUrl), 1000);
             } else {
                 addMessage('bot', `Error: ${data.message}`);
             }
@@ -242,18 +308,12 @@ document.addEventListener('DOMContentLoaded', function() {
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({}),
+            body: JSON.stringify({ format: 'data' }),
         })
         .then(response => response.json())
         .then(data => {
             if (data.status === 'success') {
-                const message = `
-                    <div>
-                        <p>${data.message}</p>
-                        <img src="data:image/png;base64,${data.image_data}" alt="Budget Chart" class="chart-image">
-                    </div>
-                `;
-                addFormattedMessage('bot', message);
+                showChart(data);
             } else {
                 addMessage('bot', `Error: ${data.message}`);
             }
@@ -264,6 +324,39 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    function showChart(data) {
+        const message = `
+            <div>
+                <p>${data.message}</p>
+                ${renderBarChart(data.chart)}
+            </div>
+        `;
+        addFormattedMessage('bot', message);
+    }
+
+    // Render chart series from the data mode as simple horizontal bars
+    function renderBarChart(chart) {
+        const maxValue = Math.max(...chart.values, 1);
+        const isMoney = chart.type === 'budget';
+        let html = `<div class="chart-bars"><h3>${chart.project}</h3>`;
+        
+        chart.labels.forEach((label, i) => {
+            const value = chart.values[i];
+            const width = Math.round((value / maxValue) * 100);
+            const text = isMoney ? `$${value.toLocaleString()}` : `${value}%`;
+            html += `
+                <div class="chart-row">
+                    <span class="chart-label">${label}</span>
+                    <div class="chart-track"><div class="chart-bar chart-bar-${i}" style="width: ${width}%"></div></div>
+                    <span class="chart-value">${text}</span>
+                </div>
+            `;
+        });
+        
+        html += `</div>`;
+        return html;
+    }
+
     // Feature 3: Check Weather
     function checkWeather() {
         fetch('/api/get_weather', {
@@ -276,13 +369,7 @@ document.addEventListener('DOMContentLoaded', function() {
         .then(response => response.json())
         .then(data => {
             if (data.status === 'success') {
-                const message = `
-                    <div>
-                        <p>${data.message}</p>
-                        ${data.html}
-                    </div>
-                `;
-                addFormattedMessage('bot', message);
+                showWeather(data);
             } else {
                 addMessage('bot', `Error: ${data.message}`);
             }
@@ -293,6 +380,16 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    function showWeather(data) {
+        const message = `
+            <div>
+                <p>${data.message}</p>
+                ${data.html}
+            </div>
+        `;
+        addFormattedMessage('bot', message);
+    }
+
     // Feature 4: Add Note
     function addNote(noteText) {
         fetch('/api/notes', {
@@ -305,7 +402,7 @@ document.addEventListener('DOMContentLoaded', function() {
         .then(response => response.json())
         .then(data => {
             if (data.status === 'success') {
-                addMessage('bot', `Note added successfully: "${data.note.text}"`);
+                showNoteAdded(data);
             } else {
                 addMessage('bot', `Error: ${data.message}`);
             }
@@ -316,6 +413,10 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    function showNoteAdded(data) {
+        addMessage('bot', `Note added successfully: "${data.note.text}"`);
+    }
+
     // Feature 5: View Notes
     function viewNotes() {
         fetch('/api/notes', {
@@ -327,26 +428,7 @@ document.addEventListener('DOMContentLoaded', function() {
         .then(response => response.json())
         .then(data => {
             if (data.status === 'success') {
-                if (data.notes.length === 0) {
-                    addMessage('bot', 'No notes found for this project.');
-                } else {
-                    let notesHtml = `<div class="notes-container"><h3>Project Notes</h3><ul class="notes-list">`;
-                    
-                    data.notes.forEach(note => {
-                        notesHtml += `
-                            <li class="note-item">
-                                <div class="note-header">
-                                    <span class="note-date">${note.date}</span>
-                                    <span class="note-user">By: ${note.user}</span>
-                                </div>
-                                <div class="note-text">${note.text}</div>
-                            </li>
-                        `;
-                    });
-                    
-                    notesHtml += `</ul></div>`;
-                    addFormattedMessage('bot', notesHtml);
-                }
+                showNotes(data);
             } else {
                 addMessage('bot', `Error: ${data.message}`);
             }
@@ -356,4 +438,28 @@ document.addEventListener('DOMContentLoaded', function() {
             addMessage('bot', 'Sorry, there was an error retrieving the notes.');
         });
     }
-});
\ No newline at end of file
+
+    function showNotes(data) {
+        if (data.notes.length === 0) {
+            addMessage('bot', 'No notes found for this project.');
+            return;
+        }
+        
+        let notesHtml = `<div class="notes-container"><h3>Project Notes</h3><ul class="notes-list">`;
+        
+        data.notes.forEach(note => {
+            notesHtml += `
+                <li class="note-item">
+                    <div class="note-header">
+                        <span class="note-date">${note.date}</span>
+                        <span class="note-user">By: ${note.user}</span>
+                    </div>
+                    <div class="note-text">${note.text}</div>
+                </li>
+            `;
+        });
+        
+        notesHtml += `</ul></div>`;
+        addFormattedMessage('bot', notesHtml);
+    }
+});
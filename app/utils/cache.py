@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Caching helpers shared by the report and chart generators
+
+def stable_hash(obj):
+    """SHA-256 of a JSON-serializable object, independent of dict ordering"""
+    payload = json.dumps(obj, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def touch(path):
+    """Mark a cached file as recently used"""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+def prune_directory(directory, prefix='', suffix='', max_files=None, max_bytes=None):
+    """Delete the least recently used matching files until within limits
+
+    Files are ranked by modification time, which cache hits refresh with
+    touch(). Returns the number of files removed.
+    """
+    entries = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.startswith(prefix) and entry.name.endswith(suffix):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+    except FileNotFoundError:
+        return 0
+
+    entries.sort()
+    total_bytes = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in entries:
+        too_many = max_files is not None and len(entries) - removed > max_files
+        too_big = max_bytes is not None and total_bytes > max_bytes
+        if not (too_many or too_big):
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        removed += 1
+        total_bytes -= size
+    return removed
+
+class LRUCache:
+    """Thread-safe least recently used cache with hit and miss counters"""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -1,94 +1,119 @@
-import matplotlib.pyplot as plt
-import numpy as np
 import os
-from datetime import datetime
 import io
+import threading
 import base64
+import datetime as dt
+from app.utils.cache import LRUCache, stable_hash, prune_directory
+from app.utils.metrics import CHART_RENDERS, CHART_CACHE_HITS
 
-def generate_budget_chart(project):
-    """Generate a budget chart for a project"""
-    
-    # Create charts directory if it doesn't exist
-    if not os.path.exists('app/static/charts'):
-        os.makedirs('app/static/charts')
-    
-    # Prepare data
+# Charts are drawn on their own Figure and Agg canvas rather than through the
+# global pyplot state, so concurrent requests cannot draw into each other's
+# figures. Each chart is rasterized once and the PNG bytes are reused for both
+# the base64 payload and the file under app/static/charts. matplotlib and
+# NumPy are imported on first render so the data mode stays lightweight.
+
+CHARTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'static', 'charts')
+CHARTS_MAX_FILES = 200
+
+# Rendered charts keyed by (chart type, project hash, size, format)
+chart_cache = LRUCache(maxsize=128)
+
+STATUS_COLORS = {
+    'Completed': '#66cc66',  # Green
+    'In Progress': '#ffcc66',  # Orange
+}
+NOT_STARTED_COLOR = '#ff9999'  # Red
+
+def _status_progress(status):
+    """Completion percentage shown for a milestone status"""
+    if status == 'Completed':
+        return 100
+    elif status == 'In Progress':
+        return 50  # Assuming 50% for in-progress
+    return 0
+
+def budget_chart_data(project):
+    """Numeric series behind the budget chart"""
     budget = project['budget']
+    return {
+        'type': 'budget',
+        'project': project['name'],
+        'labels': ['Allocated', 'Spent', 'Remaining'],
+        'values': [budget['allocated'], budget['spent'], budget['remaining']]
+    }
+
+def progress_chart_data(project):
+    """Numeric series behind the milestone progress chart"""
+    milestones = project['milestones']
+    return {
+        'type': 'progress',
+        'project': project['name'],
+        'labels': [m['name'] for m in milestones],
+        'values': [_status_progress(m['status']) for m in milestones],
+        'status': [m['status'] for m in milestones]
+    }
+
+def timeline_chart_data(project):
+    """Start and target dates behind the timeline chart"""
+    milestones = project['milestones']
+    starts = []
+    for milestone in milestones:
+        # Mock a start date 30 days before the target
+        # In a real app, you would have actual start and end dates
+        target_date = dt.datetime.strptime(milestone['date'], '%Y-%m-%d')
+        starts.append((target_date - dt.timedelta(days=30)).strftime('%Y-%m-%d'))
+    return {
+        'type': 'timeline',
+        'project': project['name'],
+        'labels': [m['name'] for m in milestones],
+        'start': starts,
+        'end': [m['date'] for m in milestones],
+        'status': [m['status'] for m in milestones]
+    }
+
+def _draw_budget(fig, data):
+    """Draw the budget pie and bar charts"""
+    import numpy as np
+
+    # Prepare data
+    allocated, spent, remaining = data['values']
     labels = ['Spent', 'Remaining']
-    sizes = [budget['spent'], budget['remaining']]
+    sizes = [spent, remaining]
     colors = ['#ff9999','#66b3ff']
-    
-    # Create figure and axes
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
-    
+
+    # Create axes
+    ax1, ax2 = fig.subplots(1, 2)
+
     # Pie chart
     ax1.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
     ax1.axis('equal')
-    ax1.set_title(f'Budget Allocation for {project["name"]}')
-    
+    ax1.set_title(f'Budget Allocation for {data["project"]}')
+
     # Bar chart
-    categories = ['Allocated', 'Spent', 'Remaining']
-    values = [budget['allocated'], budget['spent'], budget['remaining']]
-    
+    categories = data['labels']
+    values = data['values']
+
     x = np.arange(len(categories))
     ax2.bar(x, values, color=['#9999ff', '#ff9999', '#66b3ff'])
     ax2.set_xticks(x)
     ax2.set_xticklabels(categories)
     ax2.set_title(f'Budget Breakdown (in $)')
     ax2.set_ylabel('Amount ($)')
-    
+
     # Add values on top of bars
     for i, v in enumerate(values):
         ax2.text(i, v + 0.05 * max(values), f'${v:,}', ha='center')
-    
-    plt.tight_layout()
-    
-    # Save to memory
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png')
-    buffer.seek(0)
-    image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    
-    # Create a filename and save to disk as well
-    filename = f'charts/{project["name"].replace(" ", "_")}_budget_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png'
-    
-    # Save to disk
-    plt.savefig(f'app/static/{filename}')
-    plt.close()
-    
-    return {
-        'image_base64': image_base64,
-        'filename': filename
-    }
 
-def generate_progress_chart(project):
-    """Generate a progress chart for a project"""
-    
-    # Create charts directory if it doesn't exist
-    if not os.path.exists('app/static/charts'):
-        os.makedirs('app/static/charts')
-    
-    # Prepare milestone data
-    milestones = project['milestones']
-    names = [m['name'] for m in milestones]
-    
-    # Calculate progress for each milestone
-    progress = []
-    colors = []
-    for m in milestones:
-        if m['status'] == 'Completed':
-            progress.append(100)
-            colors.append('#66cc66')  # Green
-        elif m['status'] == 'In Progress':
-            progress.append(50)  # Assuming 50% for in-progress
-            colors.append('#ffcc66')  # Orange
-        else:
-            progress.append(0)
-            colors.append('#ff9999')  # Red
-    
-    # Create figure
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
+def _draw_progress(fig, data):
+    """Draw milestone progress bars"""
+    import numpy as np
+
+    names = data['labels']
+    progress = data['values']
+    colors = [STATUS_COLORS.get(status, NOT_STARTED_COLOR) for status in data['status']]
+
+    ax = fig.subplots()
+
     # Create progress bars
     y_pos = np.arange(len(names))
     ax.barh(y_pos, progress, color=colors)
@@ -96,121 +121,128 @@ def generate_progress_chart(project):
     ax.set_yticklabels(names)
     ax.invert_yaxis()  # Labels read top-to-bottom
     ax.set_xlabel('Completion Percentage')
-    ax.set_title(f'Milestone Progress for {project["name"]}')
-    
+    ax.set_title(f'Milestone Progress for {data["project"]}')
+
     # Add percentage labels
     for i, v in enumerate(progress):
         ax.text(v + 5, i, f'{v}%', va='center')
-    
-    plt.tight_layout()
-    
-    # Save to memory
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png')
-    buffer.seek(0)
-    image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    
-    # Create a filename and save to disk as well
-    filename = f'charts/{project["name"].replace(" ", "_")}_progress_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png'
-    
-    # Save to disk
-    plt.savefig(f'app/static/{filename}')
-    plt.close()
-    
-    return {
-        'image_base64': image_base64,
-        'filename': filename
-    }
 
-def generate_timeline_chart(project):
-    """Generate a timeline chart for a project"""
-    
-    # Create charts directory if it doesn't exist
-    if not os.path.exists('app/static/charts'):
-        os.makedirs('app/static/charts')
-    
-    # Get milestone data
-    milestones = project['milestones']
-    
-    # Convert dates to datetime objects for plotting
-    import datetime as dt
-    
-    milestone_names = []
-    milestone_starts = []
-    milestone_durations = []
-    milestone_colors = []
-    
-    # Mock start dates based on the target completion date
-    # In a real app, you would have actual start and end dates
-    for i, milestone in enumerate(milestones):
-        milestone_names.append(milestone['name'])
-        
-        # Parse the target date
-        target_date = dt.datetime.strptime(milestone['date'], '%Y-%m-%d')
-        
-        # Mock a start date 30 days before the target
-        start_date = target_date - dt.timedelta(days=30)
-        milestone_starts.append(start_date)
-        
-        # Duration is 30 days
-        milestone_durations.append(30)
-        
-        # Color based on status
-        if milestone['status'] == 'Completed':
-            milestone_colors.append('#66cc66')  # Green
-        elif milestone['status'] == 'In Progress':
-            milestone_colors.append('#ffcc66')  # Orange
-        else:
-            milestone_colors.append('#ff9999')  # Red
-    
-    # Create figure
-    fig, ax = plt.subplots(figsize=(12, 6))
-    
+def _draw_timeline(fig, data):
+    """Draw milestones as bars on a date axis"""
+    from matplotlib.dates import DateFormatter
+    from matplotlib.patches import Patch
+
+    milestone_names = data['labels']
+    milestone_starts = [dt.datetime.strptime(start, '%Y-%m-%d') for start in data['start']]
+    milestone_durations = [
+        (dt.datetime.strptime(end, '%Y-%m-%d') - start).days
+        for start, end in zip(milestone_starts, data['end'])
+    ]
+    milestone_colors = [STATUS_COLORS.get(status, NOT_STARTED_COLOR) for status in data['status']]
+
+    ax = fig.subplots()
+
     # Plot each milestone as a horizontal bar
     for i, (name, start, duration, color) in enumerate(zip(milestone_names, milestone_starts, milestone_durations, milestone_colors)):
         ax.barh(i, duration, left=start, color=color, alpha=0.8)
         ax.text(start, i, name, va='center', ha='right', color='black')
-    
+
     # Set y-ticks
     ax.set_yticks(range(len(milestone_names)))
     ax.set_yticklabels([])  # Hide labels since we added them manually
-    
+
     # Format the x-axis to show dates
-    from matplotlib.dates import DateFormatter
-    date_formatter = DateFormatter('%Y-%m-%d')
-    ax.xaxis.set_major_formatter(date_formatter)
+    ax.xaxis.set_major_formatter(DateFormatter('%Y-%m-%d'))
     fig.autofmt_xdate()  # Rotate date labels
-    
+
     # Add title and labels
-    ax.set_title(f'Project Timeline for {project["name"]}')
+    ax.set_title(f'Project Timeline for {data["project"]}')
     ax.set_xlabel('Date')
-    
+
     # Add a legend
-    from matplotlib.patches import Patch
     legend_elements = [
         Patch(facecolor='#66cc66', label='Completed'),
         Patch(facecolor='#ffcc66', label='In Progress'),
         Patch(facecolor='#ff9999', label='Not Started')
     ]
     ax.legend(handles=legend_elements, loc='upper right')
-    
-    plt.tight_layout()
-    
-    # Save to memory
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png')
-    buffer.seek(0)
-    image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    
-    # Create a filename and save to disk as well
-    filename = f'charts/{project["name"].replace(" ", "_")}_timeline_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png'
-    
-    # Save to disk
-    plt.savefig(f'app/static/{filename}')
-    plt.close()
-    
+
+# Data function, drawing function and default size in inches for each chart type
+CHART_TYPES = {
+    'budget': (budget_chart_data, _draw_budget, (12, 5)),
+    'progress': (progress_chart_data, _draw_progress, (10, 6)),
+    'timeline': (timeline_chart_data, _draw_timeline, (12, 6)),
+}
+
+def chart_data(chart_type, project):
+    """Return the compact numeric series behind a chart for client-side rendering"""
+    return CHART_TYPES[chart_type][0](project)
+
+def render_chart(chart_type, project, size=None, fmt='png'):
+    """Render a chart once and return its data
+
+    PNG charts are also saved under static/charts; SVG charts are returned
+    as markup only.
+    """
+    get_data, draw, default_size = CHART_TYPES[chart_type]
+    size = tuple(size or default_size)
+    project_hash = stable_hash(project)
+    key = (chart_type, project_hash, size, fmt)
+
+    cached = chart_cache.get(key)
+    if cached is not None:
+        CHART_CACHE_HITS.inc(chart_type, fmt)
+    else:
+        CHART_RENDERS.inc(chart_type, fmt)
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        fig = Figure(figsize=size)
+        FigureCanvasAgg(fig)
+        draw(fig, get_data(project))
+        fig.tight_layout()
+
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=fmt)
+        if fmt == 'svg':
+            cached = {'svg': buffer.getvalue().decode('utf-8')}
+        else:
+            cached = {
+                'png': buffer.getvalue(),
+                'image_base64': base64.b64encode(buffer.getvalue()).decode('utf-8')
+            }
+        chart_cache.set(key, cached)
+
+    if fmt == 'svg':
+        return {'svg': cached['svg']}
+
+    # The size is part of the name so every rendered size gets its own file
+    filename = (f'charts/{project["name"].replace(" ", "_")}_{chart_type}_{size[0]:g}x{size[1]:g}_'
+                f'{project_hash[:12]}.png')
+    path = os.path.join(CHARTS_DIR, os.path.basename(filename))
+
+    # Save to disk, reusing the rendered bytes
+    if not os.path.exists(path):
+        os.makedirs(CHARTS_DIR, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(cached['png'])
+        os.replace(tmp_path, path)
+        prune_directory(CHARTS_DIR, suffix='.png', max_files=CHARTS_MAX_FILES)
+
     return {
-        'image_base64': image_base64,
+        'image_base64': cached['image_base64'],
         'filename': filename
     }
-    
\ No newline at end of file
+
+def generate_budget_chart(project):
+    """Generate a budget chart for a project"""
+    return render_chart('budget', project)
+
+def generate_progress_chart(project):
+    """Generate a progress chart for a project"""
+    return render_chart('progress', project)
+
+def generate_timeline_chart(project):
+    """Generate a timeline chart for a project"""
+    return render_chart('timeline', project)
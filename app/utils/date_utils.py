@@ -1,3 +1,4 @@
+import calendar
 from datetime import datetime
 
 # Format date to readable string
@@ -29,4 +30,16 @@ def is_past_due(date_string):
 # Get current date as string
 def get_today_string():
     """Get today's date as a formatted string"""
-    return datetime.now().strftime("%Y-%m-%d")
\ No newline at end of file
+    return datetime.now().strftime("%Y-%m-%d")
+
+# Parse a "March 2025 - October 2025" timeline into start and end dates
+def parse_timeline(timeline):
+    """Convert a month range timeline into (start_date, end_date) strings"""
+    try:
+        start_text, end_text = [part.strip() for part in timeline.split('-', 1)]
+        start = datetime.strptime(start_text, "%B %Y")
+        end = datetime.strptime(end_text, "%B %Y")
+    except (AttributeError, ValueError):
+        return None, None
+    last_day = calendar.monthrange(end.year, end.month)[1]
+    return start.strftime("%Y-%m-%d"), end.replace(day=last_day).strftime("%Y-%m-%d")
\ No newline at end of file
@@ -0,0 +1,18 @@
+import json
+
+# JSON encoding for large API responses
+#
+# orjson is used when installed and is several times faster on big listings;
+# otherwise the standard library encoder is used with compact separators.
+# Both sort keys so a given payload always encodes to the same bytes.
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(obj):
+    """Encode obj as compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, separators=(',', ':'), sort_keys=True).encode('utf-8')
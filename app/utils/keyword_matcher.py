@@ -0,0 +1,87 @@
+from collections import deque
+
+# Multi-keyword matcher (Aho-Corasick automaton)
+#
+# All keywords are compiled into one automaton up front, so scanning a message
+# costs a single pass over its characters no matter how many keywords are
+# registered.
+
+class KeywordMatcher:
+    """Find every occurrence of a fixed set of keywords in one pass"""
+
+    def __init__(self, keywords=None):
+        # Each node is a dict of child transitions; node 0 is the root
+        self._goto = [{}]
+        self._fail = [0]
+        # Keywords ending at each node; _output adds those reached through failure links
+        self._keywords = [[]]
+        self._output = [[]]
+        self._built = False
+        for keyword in keywords or []:
+            self.add(keyword)
+
+    def add(self, keyword, value=None):
+        """Register a keyword, optionally with a value returned on match"""
+        if not keyword:
+            return
+        node = 0
+        for char in keyword:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._keywords.append([])
+                self._output.append([])
+                self._goto[node][char] = next_node
+            node = next_node
+        self._keywords[node].append((keyword, keyword if value is None else value))
+        self._built = False
+
+    def build(self):
+        """Compute failure links; called automatically on first search after an add"""
+        # Start from each node's own keywords so rebuilding never repeats outputs
+        self._output = [list(keywords) for keywords in self._keywords]
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                if self._fail[child] == child:
+                    self._fail[child] = 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+        self._built = True
+
+    def iter_matches(self, text):
+        """Yield (start, end, keyword, value) for every match in text"""
+        if not self._built:
+            self.build()
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                for keyword, value in output[node]:
+                    yield index - len(keyword) + 1, index + 1, keyword, value
+
+    def find_all(self, text):
+        """Return all matches in text as a list of (start, end, keyword, value)"""
+        return list(self.iter_matches(text))
+
+    def found_keywords(self, text):
+        """Return the set of keywords that occur anywhere in text"""
+        return {keyword for _, _, keyword, _ in self.iter_matches(text)}
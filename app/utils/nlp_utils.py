@@ -1,56 +1,145 @@
 # Simple NLP functions for the chatbot
+import re
+
+from app.utils.keyword_matcher import KeywordMatcher
+from app.utils.project_index import get_project_name_index
 
 # List of keywords for different query types
-STATUS_KEYWORDS = ['status', 'progress', 'completion', 'done', 'finished']
+SELECT_KEYWORDS = ['select', 'choose', 'pick']
+STATUS_KEYWORDS = ['status', 'completion', 'done', 'finished']
 BUDGET_KEYWORDS = ['budget', 'cost', 'money', 'spend', 'spending', 'expense', 'financial']
 ISSUE_KEYWORDS = ['issue', 'problem', 'trouble', 'challenge', 'difficulty', 'error', 'mistake']
-MILESTONE_KEYWORDS = ['milestone', 'phase', 'stage', 'step', 'timeline', 'schedule']
+MILESTONE_KEYWORDS = ['milestone', 'progress', 'phase', 'stage', 'step', 'timeline', 'schedule']
 RESOURCE_KEYWORDS = ['resource', 'worker', 'staff', 'people', 'team', 'equipment', 'tool', 'machine']
+HELP_KEYWORDS = ['help', 'guide', 'assist', 'instruction', 'command']
 
-def detect_intent(message):
-    """Detect the intent of the user message"""
+# Wording that asks about every project rather than the active one
+PORTFOLIO_SCOPE_KEYWORDS = ['portfolio', 'all projects', 'all my projects', 'which projects',
+                            'across projects', 'across all projects', 'every project']
+
+# Portfolio figures, mapped from the words that ask for them. On their own
+# they only mean the portfolio when no project is active.
+PORTFOLIO_KEYWORDS = {
+    'over budget': 'over_budget',
+    'over-budget': 'over_budget',
+    'overbudget': 'over_budget',
+    'this quarter': 'quarter_spend',
+    'total spend': 'summary',
+}
+
+# Action intents need a verb before the noun, so they keep a regex. The regex
+# only runs when one of the trigger words was seen by the keyword scan.
+ACTION_RULES = [
+    ('generate_report', ['report'],
+     re.compile(r'(generate|create|make|produce).*report')),
+    ('show_chart', ['chart', 'graph', 'visualization'],
+     re.compile(r'(show|display|create|generate|visualize).*?(chart|graph|budget.*?chart|visualization)')),
+    ('check_weather', ['weather', 'forecast', 'temperature', 'rain', 'precipitation'],
+     re.compile(r'(check|show|get|what.*?is|how.*?is).*?(weather|forecast|temperature|rain|precipitation)')),
+    ('add_note', ['note'],
+     re.compile(r'(add|create|make|write).*?note')),
+    ('view_notes', ['notes'],
+     re.compile(r'(view|show|get|read|list).*?notes')),
+]
+
+NOTE_CONTENT_PATTERN = re.compile(r'(saying|that says|with content|with text|:)\s*[""]?(.*?)[""]?$')
+
+# Keyword intents in order of precedence
+KEYWORD_INTENTS = [
+    ('status', STATUS_KEYWORDS),
+    ('budget', BUDGET_KEYWORDS),
+    ('issue', ISSUE_KEYWORDS),
+    ('milestone', MILESTONE_KEYWORDS),
+    ('resource', RESOURCE_KEYWORDS),
+    ('help', HELP_KEYWORDS),
+]
+
+def _build_intent_matcher():
+    """Compile every intent keyword into a single matcher"""
+    matcher = KeywordMatcher()
+    for keyword in SELECT_KEYWORDS:
+        matcher.add(keyword, 'select_verb')
+    matcher.add('project', 'select_noun')
+    for intent, triggers, _ in ACTION_RULES:
+        for keyword in triggers:
+            matcher.add(keyword, intent)
+    for keyword in PORTFOLIO_SCOPE_KEYWORDS:
+        matcher.add(keyword, 'portfolio_scope')
+    for keyword in PORTFOLIO_KEYWORDS:
+        matcher.add(keyword, 'portfolio_metric')
+    for intent, keywords in KEYWORD_INTENTS:
+        for keyword in keywords:
+            matcher.add(keyword, intent)
+    matcher.build()
+    return matcher
+
+INTENT_MATCHER = _build_intent_matcher()
+
+def route_message(message):
+    """Detect the intent of a message and extract its arguments in one scan
+
+    Returns a tuple of (intent, args). Messages that name a portfolio figure
+    without asking about every project keep their project intent and carry
+    the figure as args['portfolio_metric'], for use when no project is active.
+    """
     message = message.lower()
-    
+    matches = INTENT_MATCHER.find_all(message)
+    hits = {value for _, _, _, value in matches}
+
     # Check for project selection intent
-    if ('select' in message or 'choose' in message or 'pick' in message) and 'project' in message:
-        return 'select_project'
-    
-    # Check for status intent
-    if any(keyword in message for keyword in STATUS_KEYWORDS):
-        return 'status'
-    
-    # Check for budget intent
-    if any(keyword in message for keyword in BUDGET_KEYWORDS):
-        return 'budget'
-    
-    # Check for issue intent
-    if any(keyword in message for keyword in ISSUE_KEYWORDS):
-        return 'issue'
-    
-    # Check for milestone intent
-    if any(keyword in message for keyword in MILESTONE_KEYWORDS):
-        return 'milestone'
+    if 'select_verb' in hits and 'select_noun' in hits:
+        return 'select_project', {}
+
+    # Check for action intents (report, chart, weather, notes)
+    for intent, _, pattern in ACTION_RULES:
+        if intent in hits and pattern.search(message):
+            if intent == 'add_note':
+                note_match = NOTE_CONTENT_PATTERN.search(message)
+                note_text = note_match.group(2).strip() if note_match else None
+                return intent, {'note': note_text}
+            return intent, {}
+
+    # The most specific portfolio figure named in the message, if any
+    metrics = {PORTFOLIO_KEYWORDS[keyword] for _, _, keyword, value in matches if value == 'portfolio_metric'}
+    metric = next((metric for metric in ('over_budget', 'quarter_spend', 'summary') if metric in metrics), None)
     
-    # Check for resource intent
-    if any(keyword in message for keyword in RESOURCE_KEYWORDS):
-        return 'resource'
+    # Check for explicitly portfolio-wide questions
+    if 'portfolio_scope' in hits:
+        return 'portfolio', {'metric': metric or 'summary'}
     
-    # Check for help intent
-    if 'help' in message or 'guide' in message or 'assist' in message:
-        return 'help'
+    args = {'portfolio_metric': metric} if metric else {}
     
+    # Check for keyword intents
+    for intent, _ in KEYWORD_INTENTS:
+        if intent in hits:
+            return intent, args
+
     # Default to unknown intent
-    return 'unknown'
+    return 'unknown', args
 
-def extract_project_reference(message, project_data):
+def detect_intent(message):
+    """Detect the intent of the user message"""
+    return route_message(message)[0]
+
+# Minimum fuzzy score to treat a misspelled name as a project reference
+FUZZY_MATCH_SCORE = 0.6
+
+def extract_project_reference(message, project_data, fuzzy=True, version=None):
     """Try to extract a project reference from the message"""
-    message = message.lower()
+    index = get_project_name_index(project_data, version)
+    project_id = index.find_first(message)
     
-    for project_id, project in project_data.items():
-        if project['name'].lower() in message:
-            return project_id
+    # Fall back to typo-tolerant lookup when no name matches exactly
+    if project_id is None and fuzzy:
+        candidates = index.search(message, limit=1, min_score=FUZZY_MATCH_SCORE)
+        if candidates:
+            project_id = candidates[0][0]
     
-    return None
+    return project_id
+
+def suggest_projects(message, project_data, limit=3, version=None):
+    """Return ranked (project_id, score) candidates for a misspelled project name"""
+    return get_project_name_index(project_data, version).search(message, limit=limit)
 
 def clean_message(message):
     """Remove unnecessary words and characters from message"""
@@ -0,0 +1,18 @@
+import multiprocessing
+
+# Worker process pools
+#
+# Pools are created in processes that already run threads (warmup imports,
+# the weather prefetcher, portfolio coordinators). Forking such a process can
+# copy a lock held by another thread into the child, which then deadlocks, so
+# workers are started from a clean forkserver process, or spawned where
+# forkserver is unavailable.
+
+def _start_method():
+    methods = multiprocessing.get_all_start_methods()
+    return 'forkserver' if 'forkserver' in methods else 'spawn'
+
+def new_process_pool(max_workers=None):
+    """Process pool whose workers are not forked from the calling process"""
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(_start_method()))
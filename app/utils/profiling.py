@@ -0,0 +1,116 @@
+import hmac
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from app.utils.cache import prune_directory
+
+# Per-request profiling
+#
+# Off unless PROFILE_ENABLED is set. A request is profiled when it carries the
+# PROFILE_HEADER matching PROFILE_TOKEN or is picked by PROFILE_SAMPLE_RATE;
+# without a token the header is ignored. Only one request per process is
+# profiled at a time, since cProfile cannot run two profilers at once, and
+# requests arriving meanwhile run unprofiled. The whole request runs under
+# cProfile and the stats are written to PROFILE_DIR as
+#
+#   profile_<time>_<endpoint>_<intent>_<project>_<ms>ms_<id>.prof
+#
+# for loading with pstats or snakeviz. The id is returned in the X-Profile-Id
+# response header. Only the newest PROFILE_MAX_FILES profiles are kept.
+
+logger = logging.getLogger(__name__)
+
+_UNSAFE = re.compile(r'[^A-Za-z0-9.-]+')
+
+# Held while a request is being profiled
+_active = threading.Lock()
+
+def _part(value):
+    return _UNSAFE.sub('-', str(value))[:40] if value else '-'
+
+def tag_profile(**labels):
+    """Attach labels such as intent to the current request's profile, if any"""
+    from flask import g, has_request_context
+    if has_request_context() and 'profile' in g:
+        g.profile['labels'].update(labels)
+
+def _wants_profile(config, request):
+    header = request.headers.get(config['PROFILE_HEADER'])
+    if header:
+        token = config['PROFILE_TOKEN']
+        return bool(token) and hmac.compare_digest(header, token)
+    return random.random() < config['PROFILE_SAMPLE_RATE']
+
+def _write_profile(config, profile, endpoint, project_id):
+    profile_dir = config['PROFILE_DIR']
+    os.makedirs(profile_dir, exist_ok=True)
+    elapsed_ms = int((time.perf_counter() - profile['start']) * 1000)
+    filename = '_'.join([
+        'profile',
+        datetime.now().strftime('%Y%m%d-%H%M%S'),
+        _part(endpoint),
+        _part(profile['labels'].get('intent')),
+        _part(project_id),
+        f'{elapsed_ms}ms',
+        profile['id']
+    ]) + '.prof'
+    path = os.path.join(profile_dir, filename)
+
+    # Write under a temporary name so pruning never sees a partial file
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    profile['profiler'].dump_stats(tmp_path)
+    os.replace(tmp_path, path)
+
+    prune_directory(profile_dir, prefix='profile_', suffix='.prof', max_files=config['PROFILE_MAX_FILES'])
+    return path
+
+def init_profiling(app):
+    """Profile selected requests handled by app"""
+    from flask import g, request, session
+
+    @app.before_request
+    def start_profile():
+        if not _wants_profile(app.config, request):
+            return
+        # Check for a request already being profiled
+        if not _active.acquire(blocking=False):
+            logger.debug('profile.skipped busy endpoint=%s', request.endpoint)
+            return
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler outside this app is active
+            _active.release()
+            logger.debug('profile.skipped busy endpoint=%s', request.endpoint)
+            return
+        g.profile = {'id': uuid.uuid4().hex[:12], 'profiler': profiler, 'labels': {}, 'start': time.perf_counter()}
+
+    @app.after_request
+    def add_profile_id(response):
+        if 'profile' in g:
+            response.headers['X-Profile-Id'] = g.profile['id']
+        return response
+
+    # Teardown runs after a streamed body has been sent, so streams are covered
+    @app.teardown_request
+    def stop_profile(exc):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return
+        try:
+            profile['profiler'].disable()
+        finally:
+            _active.release()
+        project_id = (request.view_args or {}).get('project_id') or session.get('project_id')
+        try:
+            _write_profile(app.config, profile, request.endpoint or 'unmatched', project_id)
+        except OSError:
+            logger.exception('profile.write_failed id=%s', profile['id'])
@@ -0,0 +1,182 @@
+import heapq
+import re
+from collections import Counter, defaultdict
+from itertools import chain
+
+from app.utils.keyword_matcher import KeywordMatcher
+
+# Project name recognition
+#
+# Project names and aliases are compiled into one keyword automaton, so finding
+# every project mentioned in a message is a single pass over the message
+# rather than one substring scan per project. A character-trigram inverted
+# index over the same names backs typo-tolerant lookup.
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+# Words too common in project names and messages to identify a project
+GENERIC_WORDS = {'the', 'project', 'projects'}
+
+# Minimum similarity for a fuzzy candidate to be returned
+FUZZY_MIN_SCORE = 0.5
+
+# Most names scored against the message per search, best upper bounds first
+FUZZY_MAX_CANDIDATES = 200
+
+def normalize_name(text):
+    """Lowercase text and collapse punctuation and whitespace to single spaces"""
+    return _NON_WORD.sub(' ', text.lower()).strip()
+
+def project_names(project):
+    """Return the normalized name and aliases of a project"""
+    names = [normalize_name(project['name'])]
+    for alias in project.get('aliases', []):
+        names.append(normalize_name(alias))
+    return [name for name in names if name]
+
+def name_tokens(name):
+    """Split a normalized name into tokens, dropping generic words when possible"""
+    tokens = name.split()
+    distinctive = [token for token in tokens if token not in GENERIC_WORDS]
+    return distinctive or tokens
+
+def trigrams(tokens):
+    """Return the set of word-padded character trigrams for a list of tokens"""
+    grams = set()
+    for token in tokens:
+        padded = f' {token} '
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+def dice(first, second):
+    """Dice coefficient between two trigram sets"""
+    if not first or not second:
+        return 0.0
+    return 2.0 * len(first & second) / (len(first) + len(second))
+
+class ProjectNameIndex:
+    """Find every project mentioned in a message in one pass"""
+
+    def __init__(self, project_data):
+        self._matcher = KeywordMatcher()
+        # Fuzzy entries are (project_id, token count, trigram set)
+        self._entries = []
+        self._gram_counts = []
+        self._postings = defaultdict(list)
+        for project_id, project in project_data.items():
+            for name in project_names(project):
+                self._matcher.add(name, project_id)
+                tokens = name_tokens(name)
+                grams = trigrams(tokens)
+                entry = len(self._entries)
+                self._entries.append((project_id, len(tokens), grams))
+                self._gram_counts.append(len(grams))
+                for gram in grams:
+                    self._postings[gram].append(entry)
+        self._matcher.build()
+
+    def find_all(self, message):
+        """Return ids of projects mentioned in message, in order of appearance"""
+        text = normalize_name(message)
+        found = []
+        # Prefer the longest name when several names start at the same place
+        for _, _, _, project_id in sorted(self._matcher.iter_matches(text),
+                                          key=lambda match: (match[0], match[0] - match[1])):
+            if project_id not in found:
+                found.append(project_id)
+        return found
+
+    def find_first(self, message):
+        """Return the id of the first project mentioned in message, or None"""
+        found = self.find_all(message)
+        return found[0] if found else None
+
+    def search(self, message, limit=3, min_score=FUZZY_MIN_SCORE):
+        """Return up to limit (project_id, score) candidates, best first
+
+        Scores are the Dice similarity between a project name and the closest
+        run of words in the message, so "downtwn office" still finds
+        "Downtown Office Complex".
+        """
+        tokens = normalize_name(message).split()
+        message_grams = trigrams(tokens)
+
+        # Count shared trigrams per name using the inverted index
+        shared = Counter(chain.from_iterable(self._postings.get(gram, ()) for gram in message_grams))
+
+        # Score names in order of their upper bound and stop once no remaining
+        # name can beat the current candidates
+        sizes = self._gram_counts
+        bounds = []
+        for entry, count in shared.items():
+            bound = 2.0 * count / (sizes[entry] + count)
+            if bound >= min_score:
+                bounds.append((bound, entry))
+        bounds = heapq.nlargest(FUZZY_MAX_CANDIDATES, bounds)
+
+        windows = {}
+        scores = {}
+        # Min-heap of the best limit (score, project_id) pairs found so far
+        best = []
+        for bound, entry in bounds:
+            if len(best) >= limit and bound < best[0][0]:
+                break
+            project_id, size, grams = self._entries[entry]
+            score = self._best_window_score(tokens, size, grams, windows)
+            if score < min_score or score <= scores.get(project_id, 0.0):
+                continue
+            if any(item[1] == project_id for item in best):
+                # An alias beat the project's earlier score
+                best = [(score, project_id) if item[1] == project_id else item for item in best]
+                heapq.heapify(best)
+            elif len(best) < limit:
+                heapq.heappush(best, (score, project_id))
+            else:
+                heapq.heappushpop(best, (score, project_id))
+            scores[project_id] = score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(project_id, round(score, 3)) for project_id, score in ranked[:limit]]
+
+    def _best_window_score(self, tokens, size, grams, windows):
+        """Best similarity between a name and any run of message words"""
+        best = 0.0
+        for width in range(max(size - 1, 1), size + 2):
+            for start in range(0, max(len(tokens) - width, 0) + 1):
+                key = (start, width)
+                window_grams = windows.get(key)
+                if window_grams is None:
+                    window = [token for token in tokens[start:start + width] if token not in GENERIC_WORDS]
+                    window_grams = windows[key] = trigrams(window)
+                best = max(best, dice(window_grams, grams))
+        return best
+
+# Indexes are cached by data version, as given by get_data_version(); only
+# the current version is kept. Dicts passed without a version are cached by
+# identity, holding a reference so the id cannot be reused, until the next
+# invalidation
+_indexes = {}
+_unversioned = {}
+
+def invalidate_project_index():
+    """Drop cached indexes so they are rebuilt from the current project data"""
+    _indexes.clear()
+    _unversioned.clear()
+
+def get_project_name_index(project_data, version=None):
+    """Get the name index for project data at a data version, building it if needed"""
+    if version is None:
+        cached = _unversioned.get(id(project_data))
+        if cached is None or cached[0] is not project_data:
+            # Only a handful of dicts are looked up without a version
+            if len(_unversioned) >= 8:
+                _unversioned.clear()
+            cached = _unversioned[id(project_data)] = (project_data, ProjectNameIndex(project_data))
+        return cached[1]
+    index = _indexes.get(version)
+    if index is None:
+        index = ProjectNameIndex(project_data)
+        _indexes.clear()
+        _indexes[version] = index
+    return index
@@ -1,57 +1,127 @@
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from datetime import datetime
 import os
+import threading
+import uuid
+from collections import deque
+from app.utils.cache import stable_hash, touch, prune_directory
+from app.utils.metrics import REPORT_RENDERS
 
-def generate_project_report(project, filename=None):
-    """Generate a PDF report for a project"""
+# Bump when the report layout changes so cached reports are regenerated
+REPORT_TEMPLATE_VERSION = 2
+
+# Limits for cached reports in the output directory
+REPORT_CACHE_MAX_FILES = 200
+REPORT_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Projects rendered per worker task in a portfolio report
+PORTFOLIO_CHUNK_SIZE = 25
+
+# Styles are immutable once built, so every report shares one set
+STYLES = getSampleStyleSheet()
+
+# Header row on a grey band
+HEADER_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+# Label column on a light grey band
+LABEL_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+    ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+def report_cache_key(project):
+    """Stable key for a project's report content and template"""
+    return stable_hash({'template': REPORT_TEMPLATE_VERSION, 'project': project})
+
+def cached_report_path(project, output_dir='reports'):
+    """Path a project's cached report has, whether or not it exists yet"""
+    key = report_cache_key(project)
+    return os.path.join(output_dir, f"Project_Report_{project['name'].replace(' ', '_')}_{key[:16]}.pdf")
+
+def generate_project_report(project, filename=None, output_dir='reports',
+                            cache_max_files=REPORT_CACHE_MAX_FILES, cache_max_bytes=REPORT_CACHE_MAX_BYTES):
+    """Generate a PDF report for a project
     
-    if filename is None:
-        # Create reports directory if it doesn't exist
-        if not os.path.exists('reports'):
-            os.makedirs('reports')
-        filename = f"reports/Project_Report_{project['name'].replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    Without an explicit filename, reports are cached by project content: an
+    unchanged project returns the existing file instead of rendering again.
+    """
     
-    doc = SimpleDocTemplate(filename, pagesize=letter)
-    styles = getSampleStyleSheet()
-    elements = []
+    if filename is not None:
+        build_project_report(project, filename)
+        return filename
+    
+    # Create reports directory if it doesn't exist
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+    
+    filename = cached_report_path(project, output_dir)
+    
+    if os.path.exists(filename):
+        touch(filename)
+        REPORT_RENDERS.inc('project', 'hit')
+        return filename
+    
+    # Build under a temporary name so readers never see a partial PDF
+    tmp_filename = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        build_project_report(project, tmp_filename)
+        os.replace(tmp_filename, filename)
+    finally:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+    
+    prune_directory(output_dir, prefix='Project_Report_', suffix='.pdf',
+                    max_files=cache_max_files, max_bytes=cache_max_bytes)
+    
+    REPORT_RENDERS.inc('project', 'miss')
+    return filename
+
+def _section(title):
+    """Heading and spacing that open a report section"""
+    return [Paragraph(title, STYLES['Heading2']), Spacer(1, 0.1*inch)]
+
+def _footer():
+    footer_text = f"Report generated on {datetime.now().strftime('%Y-%m-%d at %H:%M:%S')}"
+    return [Spacer(1, 0.5*inch), Paragraph(footer_text, STYLES['Normal'])]
+
+def project_flowables(project):
+    """Flowables for one project's report section
+    
+    Issue and milestone tables are LongTables with a repeating header row so
+    long lists split cleanly across pages.
+    """
     
     # Title
-    title_style = styles['Heading1']
-    title = Paragraph(f"Project Report: {project['name']}", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 0.25*inch))
+    yield Paragraph(f"Project Report: {project['name']}", STYLES['Heading1'])
+    yield Spacer(1, 0.25*inch)
     
     # Project overview
-    subtitle_style = styles['Heading2']
-    elements.append(Paragraph("Project Overview", subtitle_style))
-    elements.append(Spacer(1, 0.1*inch))
-    
+    yield from _section("Project Overview")
     overview_data = [
         ["Status", project['status']],
         ["Completion", f"{project['completion']}%"],
         ["Timeline", project['timeline']]
     ]
-    
-    overview_table = Table(overview_data, colWidths=[2*inch, 4*inch])
-    overview_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    elements.append(overview_table)
-    elements.append(Spacer(1, 0.25*inch))
+    yield Table(overview_data, colWidths=[2*inch, 4*inch], style=LABEL_TABLE_STYLE)
+    yield Spacer(1, 0.25*inch)
     
     # Budget information
-    elements.append(Paragraph("Budget Information", subtitle_style))
-    elements.append(Spacer(1, 0.1*inch))
-    
+    yield from _section("Budget Information")
     budget = project['budget']
     budget_data = [
         ["Category", "Amount"],
@@ -59,23 +129,11 @@ def generate_project_report(project, filename=None):
         ["Spent", f"${budget['spent']:,}"],
         ["Remaining", f"${budget['remaining']:,}"]
     ]
-    
-    budget_table = Table(budget_data, colWidths=[2*inch, 4*inch])
-    budget_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    elements.append(budget_table)
-    elements.append(Spacer(1, 0.25*inch))
+    yield Table(budget_data, colWidths=[2*inch, 4*inch], style=HEADER_TABLE_STYLE)
+    yield Spacer(1, 0.25*inch)
     
     # Issues
-    elements.append(Paragraph("Current Issues", subtitle_style))
-    elements.append(Spacer(1, 0.1*inch))
-    
+    yield from _section("Current Issues")
     if project['issues']:
         issue_data = [["ID", "Description", "Status", "Date"]]
         for issue in project['issues']:
@@ -85,26 +143,14 @@ def generate_project_report(project, filename=None):
                 issue['status'],
                 issue['date']
             ])
-        
-        issue_table = Table(issue_data, colWidths=[0.7*inch, 3*inch, 1*inch, 1.3*inch])
-        issue_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        elements.append(issue_table)
+        yield LongTable(issue_data, colWidths=[0.7*inch, 3*inch, 1*inch, 1.3*inch],
+                        repeatRows=1, style=HEADER_TABLE_STYLE)
     else:
-        elements.append(Paragraph("No current issues for this project.", styles['Normal']))
-    
-    elements.append(Spacer(1, 0.25*inch))
+        yield Paragraph("No current issues for this project.", STYLES['Normal'])
+    yield Spacer(1, 0.25*inch)
     
     # Milestones
-    elements.append(Paragraph("Milestones", subtitle_style))
-    elements.append(Spacer(1, 0.1*inch))
-    
+    yield from _section("Milestones")
     milestone_data = [["Name", "Status", "Target Date"]]
     for milestone in project['milestones']:
         milestone_data.append([
@@ -112,46 +158,139 @@ def generate_project_report(project, filename=None):
             milestone['status'],
             milestone['date']
         ])
-    
-    milestone_table = Table(milestone_data, colWidths=[2.5*inch, 1.5*inch, 2*inch])
-    milestone_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    elements.append(milestone_table)
-    elements.append(Spacer(1, 0.25*inch))
+    yield LongTable(milestone_data, colWidths=[2.5*inch, 1.5*inch, 2*inch],
+                    repeatRows=1, style=HEADER_TABLE_STYLE)
+    yield Spacer(1, 0.25*inch)
     
     # Resources
-    elements.append(Paragraph("Resources", subtitle_style))
-    elements.append(Spacer(1, 0.1*inch))
-    
+    yield from _section("Resources")
     resources = project['resources']
     resources_data = [
         ["Workers", str(resources['workers'])],
         ["Equipment", ", ".join(resources['equipment'] if resources['equipment'] else ["None"])]
     ]
+    yield Table(resources_data, colWidths=[2*inch, 4*inch], style=LABEL_TABLE_STYLE)
+
+def build_project_report(project, filename):
+    """Render a project's PDF report to filename"""
     
-    resources_table = Table(resources_data, colWidths=[2*inch, 4*inch])
-    resources_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    elements.append(resources_table)
-    
-    # Footer
-    elements.append(Spacer(1, 0.5*inch))
-    footer_text = f"Report generated on {datetime.now().strftime('%Y-%m-%d at %H:%M:%S')}"
-    elements.append(Paragraph(footer_text, styles['Normal']))
+    doc = SimpleDocTemplate(filename, pagesize=letter)
+    elements = list(project_flowables(project))
+    elements.extend(_footer())
     
     # Build PDF
     doc.build(elements)
     
-    return filename
\ No newline at end of file
+    return filename
+
+def _portfolio_row(project_id, project):
+    """Summary table row for one project"""
+    budget = project['budget']
+    return [project_id, project['name'], project['status'], f"{project['completion']}%",
+            f"${budget['allocated']:,}", f"${budget['spent']:,}"]
+
+def build_portfolio_part(projects, filename):
+    """Render a chunk of project sections, one per page, to filename
+    
+    Runs in a worker process; only this chunk's flowables are held in memory.
+    """
+    elements = []
+    for position, (project_id, project) in enumerate(projects):
+        if position:
+            elements.append(PageBreak())
+        elements.extend(project_flowables(project))
+    SimpleDocTemplate(filename, pagesize=letter).build(elements)
+    return filename
+
+def build_portfolio_cover(rows, filename):
+    """Render the portfolio title page and project summary table"""
+    elements = [
+        Paragraph("Portfolio Report", STYLES['Heading1']),
+        Spacer(1, 0.25*inch),
+        Paragraph(f"{len(rows)} projects", STYLES['Normal']),
+        Spacer(1, 0.25*inch)
+    ]
+    summary_data = [["ID", "Project", "Status", "Completion", "Allocated", "Spent"]] + rows
+    elements.append(LongTable(summary_data, colWidths=[0.6*inch, 2.2*inch, 1*inch, 0.9*inch, 1*inch, 1*inch],
+                              repeatRows=1, style=HEADER_TABLE_STYLE))
+    elements.extend(_footer())
+    SimpleDocTemplate(filename, pagesize=letter).build(elements)
+    return filename
+
+def _chunks(projects, chunk_size):
+    """Split (project_id, project) pairs into lists without materializing them all"""
+    chunk = []
+    for item in projects:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def generate_portfolio_report(projects, output_dir='reports', executor=None, max_workers=None,
+                              chunk_size=PORTFOLIO_CHUNK_SIZE, cache_max_files=REPORT_CACHE_MAX_FILES):
+    """Generate one PDF covering many projects
+    
+    projects is an iterable of (project_id, project) pairs and is consumed
+    lazily. Chunks of projects are rendered to part files by worker processes
+    and merged behind a summary cover. Rendering memory is bounded, with only
+    a couple of chunks per worker in flight, but the merge holds every page
+    of the output until it is written, about 30 KB per project (roughly 45 MB
+    for 1600 projects). max_workers is the worker count of executor when one
+    is passed in.
+    """
+    from concurrent.futures import wait
+    from pypdf import PdfWriter
+    
+    if isinstance(projects, dict):
+        projects = projects.items()
+    
+    os.makedirs(output_dir, exist_ok=True)
+    run_id = uuid.uuid4().hex[:8]
+    filename = os.path.join(output_dir, f"Portfolio_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{run_id}.pdf")
+    tmp_prefix = os.path.join(output_dir, f".portfolio_{run_id}")
+    
+    own_executor = executor is None
+    if own_executor:
+        from app.utils.process_pool import new_process_pool
+        executor = new_process_pool(max_workers)
+    in_flight_limit = 2 * (max_workers or os.cpu_count() or 1)
+    
+    rows = []
+    parts = []
+    in_flight = deque()
+    try:
+        for index, chunk in enumerate(_chunks(projects, chunk_size)):
+            rows.extend(_portfolio_row(project_id, project) for project_id, project in chunk)
+            part = f"{tmp_prefix}_{index:05d}.pdf"
+            parts.append(part)
+            in_flight.append(executor.submit(build_portfolio_part, chunk, part))
+            # Wait for the oldest chunk before reading more projects
+            while len(in_flight) >= in_flight_limit:
+                in_flight.popleft().result()
+        while in_flight:
+            in_flight.popleft().result()
+        
+        cover = build_portfolio_cover(rows, f"{tmp_prefix}_cover.pdf")
+        writer = PdfWriter()
+        for path in [cover] + parts:
+            writer.append(path)
+        tmp_filename = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp_filename, 'wb') as f:
+            writer.write(f)
+        os.replace(tmp_filename, filename)
+    finally:
+        # Let chunks that already started finish before removing their parts
+        for future in in_flight:
+            future.cancel()
+        wait(in_flight)
+        if own_executor:
+            executor.shutdown(wait=True)
+        for path in parts + [f"{tmp_prefix}_cover.pdf", f"{filename}.{os.getpid()}.tmp"]:
+            if os.path.exists(path):
+                os.remove(path)
+    
+    prune_directory(output_dir, prefix='Portfolio_Report_', suffix='.pdf', max_files=cache_max_files)
+    
+    return filename
@@ -0,0 +1,42 @@
+import importlib
+import threading
+
+# Heavy libraries are imported lazily by the endpoints that need them. To keep
+# the first chart or report request fast on long-lived workers, they can be
+# imported in the background once the first response has been sent.
+
+HEAVY_MODULES = [
+    'numpy',
+    'matplotlib.figure',
+    'matplotlib.backends.backend_agg',
+    'reportlab.platypus',
+]
+
+_started = False
+_lock = threading.Lock()
+
+def warm_imports(modules=HEAVY_MODULES):
+    """Import modules, ignoring any that are not installed"""
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+def start_warmup(modules=HEAVY_MODULES):
+    """Warm imports in a daemon thread, at most once per process"""
+    global _started
+    with _lock:
+        if _started:
+            return False
+        _started = True
+    threading.Thread(target=warm_imports, args=(modules,), name='import-warmup', daemon=True).start()
+    return True
+
+def init_warmup(app):
+    """Start warming heavy imports after the app's first response"""
+    @app.after_request
+    def warm_after_first_response(response):
+        if not _started:
+            response.call_on_close(start_warmup)
+        return response
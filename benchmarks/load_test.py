@@ -0,0 +1,257 @@
+"""Load test that replays chat sessions the way chat.js drives the API
+
+    python -m benchmarks.load_test --users 8 --duration 30
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --users 50 --duration 60 --think 2
+
+Each virtual user runs sessions back to back: open the chat page, switch
+user, list projects, select a project, then send a mix of chat messages with
+fuse=true so reports, charts, weather and notes run in the same request.
+Queued reports are polled like chat.js does until they finish. At the end
+latency percentiles, throughput and errors are printed per endpoint.
+
+Without --url the app runs in this process through the Flask test client,
+with synthetic projects added (--projects). That measures the app's own cost
+but shares one GIL; for capacity planning start the app under gunicorn with
+its production worker count and point --url at it.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.run import BENCH_USER, CHAT_CORPUS, create_bench_app, summarize
+
+# Relative frequency of each intent in a session's chat messages
+MESSAGE_WEIGHTS = {
+    'status': 20,
+    'budget': 15,
+    'issue': 12,
+    'milestone': 12,
+    'resource': 8,
+    'help': 2,
+    'generate_report': 3,
+    'show_chart': 6,
+    'check_weather': 5,
+    'add_note': 5,
+    'view_notes': 5,
+    'portfolio': 4,
+    'select_project': 1,
+    'unknown': 2,
+}
+
+MESSAGES = dict(CHAT_CORPUS)
+
+class FlaskClientTransport:
+    """Requests through the Flask test client, one cookie jar per virtual user"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, json=None, headers=None):
+        response = self.client.open(path, method=method, json=json, headers=headers)
+        body = response.get_json(silent=True)
+        response.close()
+        return response.status_code, body, response.headers
+
+class HttpTransport:
+    """Requests to a running server, one connection pool per virtual user"""
+
+    def __init__(self, base_url, timeout=60):
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        self.timeout = timeout
+
+    def request(self, method, path, json=None, headers=None):
+        response = self.session.request(method, self.base_url + path, json=json, headers=headers,
+                                        timeout=self.timeout)
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        return response.status_code, body, response.headers
+
+class Recorder:
+    """Latencies and errors per endpoint, shared by all virtual users"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.times = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, label, seconds, ok):
+        with self._lock:
+            self.times[label].append(seconds)
+            if not ok:
+                self.errors[label] += 1
+
+def _failed(status, body):
+    if status >= 400:
+        return True
+    if isinstance(body, dict):
+        result = body.get('result')
+        return body.get('status') == 'error' or (isinstance(result, dict) and result.get('status') == 'error')
+    return False
+
+class VirtualUser:
+    """One browser tab running scripted chat sessions"""
+
+    def __init__(self, transport, recorder, user_ids, rng, think=0.0, poll_interval=1.0, messages=(4, 12)):
+        self.transport = transport
+        self.recorder = recorder
+        self.user_ids = user_ids
+        self.rng = rng
+        self.think = think
+        self.poll_interval = poll_interval
+        self.messages = messages
+        self.project_etags = {}
+
+    def call(self, label, method, path, json=None, headers=None):
+        start = time.perf_counter()
+        try:
+            status, body, response_headers = self.transport.request(method, path, json=json, headers=headers)
+        except Exception:
+            self.recorder.record(label, time.perf_counter() - start, False)
+            return None, {}
+        self.recorder.record(label, time.perf_counter() - start, not _failed(status, body))
+        return body, response_headers
+
+    def pause(self):
+        if self.think:
+            time.sleep(self.rng.expovariate(1 / self.think))
+
+    def select_project(self, project_id):
+        # chat.js revalidates projects it has already shown
+        headers = {}
+        if project_id in self.project_etags:
+            headers['If-None-Match'] = self.project_etags[project_id]
+        body, headers = self.call('POST /api/select_project', 'POST', '/api/select_project',
+                                  json={'project_id': project_id, 'fields': 'summary'}, headers=headers)
+        if headers.get('ETag'):
+            self.project_etags[project_id] = headers['ETag']
+
+    def wait_for_report(self, status_url, timeout=120):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            body, _ = self.call('GET /api/report_jobs/<id>', 'GET', status_url)
+            if not body or body.get('job_status') not in ('queued', 'running'):
+                return
+
+    def send_message(self, intent):
+        body, _ = self.call(f'POST /api/send_message ({intent})', 'POST', '/api/send_message',
+                            json={'message': MESSAGES[intent], 'fuse': True})
+        result = (body or {}).get('result') or {}
+        if result.get('status_url'):
+            self.wait_for_report(result['status_url'])
+
+    def run_session(self):
+        self.call('GET /chat', 'GET', '/chat')
+        self.call('POST /api/switch_user', 'POST', '/api/switch_user', json={'user_id': self.rng.choice(self.user_ids)})
+        self.pause()
+
+        projects, _ = self.call('GET /api/projects', 'GET', '/api/projects?fields=name,status')
+        if not projects:
+            return
+        self.select_project(self.rng.choice(sorted(projects)))
+        self.pause()
+
+        intents = list(MESSAGE_WEIGHTS)
+        weights = list(MESSAGE_WEIGHTS.values())
+        for _ in range(self.rng.randint(*self.messages)):
+            intent = self.rng.choices(intents, weights)[0]
+            if intent == 'select_project':
+                # The selector is shown and another project picked
+                self.call('GET /api/projects', 'GET', '/api/projects?fields=name,status')
+                self.select_project(self.rng.choice(sorted(projects)))
+            else:
+                self.send_message(intent)
+            self.pause()
+
+def run_load(make_transport, user_ids, users, duration, think=0.0, poll_interval=1.0, seed=0):
+    """Run users virtual users for duration seconds and return the recorder and wall time"""
+    recorder = Recorder()
+    deadline = time.monotonic() + duration
+
+    def worker(number):
+        user = VirtualUser(make_transport(), recorder, user_ids, random.Random(seed + number),
+                           think=think, poll_interval=poll_interval)
+        while time.monotonic() < deadline:
+            user.run_session()
+
+    threads = [threading.Thread(target=worker, args=(number,), name=f'virtual-user-{number}', daemon=True)
+               for number in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.perf_counter() - start
+
+def report(recorder, elapsed):
+    """Per-endpoint statistics, plus a total row"""
+    rows = {}
+    all_times = []
+    for label, times in recorder.times.items():
+        stats = summarize(times)
+        stats['errors'] = recorder.errors[label]
+        stats['throughput'] = round(len(times) / elapsed, 2)
+        rows[label] = stats
+        all_times.extend(times)
+    if all_times:
+        rows['TOTAL'] = dict(summarize(all_times), errors=sum(recorder.errors.values()),
+                             throughput=round(len(all_times) / elapsed, 2))
+    return rows
+
+def print_report(rows, elapsed, users):
+    print(f'\n{users} virtual users for {elapsed:.1f}s\n')
+    print(f"{'endpoint':<44} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for label in sorted(rows, key=lambda label: (label == 'TOTAL', label)):
+        row = rows[label]
+        print(f"{label:<44} {row['runs']:>9} {row['errors']:>7} {row['throughput']:>9.1f} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay chat.js sessions against the app')
+    parser.add_argument('--url', help='base URL of a running server; without it the test client is used')
+    parser.add_argument('--users', type=int, default=8, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run')
+    parser.add_argument('--think', type=float, default=0.0, help='mean pause between a user\'s actions, in seconds')
+    parser.add_argument('--poll', type=float, default=1.0, help='report job polling interval, in seconds')
+    parser.add_argument('--projects', type=int, default=1000, help='synthetic projects to add (test client only)')
+    parser.add_argument('--user-ids', default='admin1,admin2,admin3', help='comma-separated users to switch between')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    user_ids = [user_id.strip() for user_id in args.user_ids.split(',') if user_id.strip()]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.url:
+            make_transport = lambda: HttpTransport(args.url)
+        else:
+            app = create_bench_app(workdir, args.projects, notes=0, REPORT_ASYNC=True)
+            user_ids.append(BENCH_USER)
+            make_transport = lambda: FlaskClientTransport(app)
+
+        recorder, elapsed = run_load(make_transport, user_ids, args.users, args.duration,
+                                     think=args.think, poll_interval=args.poll, seed=args.seed)
+
+    rows = report(recorder, elapsed)
+    print_report(rows, elapsed, args.users)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'users': args.users, 'duration': elapsed, 'endpoints': rows}, f, indent=2, sort_keys=True)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
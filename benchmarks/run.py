@@ -0,0 +1,327 @@
+"""Benchmarks for the chat, report, chart, notes and project listing hot paths
+
+    python -m benchmarks.run                  # run everything, compare with baselines
+    python -m benchmarks.run --quick          # smaller data and shorter runs
+    python -m benchmarks.run --only chat,notes
+    python -m benchmarks.run --save           # record the results as the new baselines
+
+Each benchmark runs for a short time budget and reports the median and 95th
+percentile latency and throughput. With a baseline file present, a benchmark
+whose median is more than --tolerance slower than its baseline is reported as
+a regression and the exit status is 1. Baselines depend on the machine, so
+record them on the machine that runs the comparison.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_project, make_projects, add_user, fill_notes
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+# Data sizes and time spent per benchmark
+SCALES = {
+    'full': {'projects': 5000, 'notes': 20000, 'seconds': 1.0},
+    'quick': {'projects': 1000, 'notes': 2000, 'seconds': 0.25},
+}
+
+# A message for every intent, as typed in the chat box
+CHAT_CORPUS = [
+    ('status', 'What is the status of this project?'),
+    ('budget', 'How much of the budget is spent?'),
+    ('issue', 'Are there any open issues?'),
+    ('milestone', 'What are the upcoming milestones?'),
+    ('resource', 'How many workers are on site?'),
+    ('help', 'help'),
+    ('generate_report', 'Generate a project report'),
+    ('show_chart', 'Show me the budget chart'),
+    ('check_weather', 'What is the weather forecast?'),
+    ('add_note', 'Add a note saying crane inspected'),
+    ('view_notes', 'Show me all notes'),
+    ('portfolio', 'Which projects are over budget?'),
+    ('select_project', 'Select a project'),
+    ('unknown', 'Good morning'),
+]
+
+BENCH_USER = 'bench'
+LARGE_PROJECT = 'L00001'
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+def summarize(times):
+    """Latency statistics in milliseconds for a list of durations in seconds"""
+    times = sorted(times)
+    total = sum(times)
+    return {
+        'runs': len(times),
+        'mean_ms': round(total / len(times) * 1000, 4),
+        'p50_ms': round(percentile(times, 0.50) * 1000, 4),
+        'p95_ms': round(percentile(times, 0.95) * 1000, 4),
+        'p99_ms': round(percentile(times, 0.99) * 1000, 4),
+        'ops_per_sec': round(len(times) / total, 2) if total else None
+    }
+
+def measure(func, seconds, before=None, min_runs=3, max_runs=100000):
+    """Call func repeatedly for about seconds and summarize the durations
+
+    before() runs ahead of every call, outside the timing, to reset caches.
+    """
+    if before:
+        before()
+    func()  # Warm imports and first-call setup
+
+    times = []
+    deadline = time.perf_counter() + seconds
+    while len(times) < min_runs or (len(times) < max_runs and time.perf_counter() < deadline):
+        if before:
+            before()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return summarize(times)
+
+def create_bench_app(workdir, projects, notes, **settings):
+    """App with projects synthetic projects plus one large one, and a long notes history on P001
+
+    The bench user can access every project. settings override config values.
+    """
+    from app import create_app
+    from config import Config
+    from data.projects import project_data
+    from data.users import user_data
+    from app.services.auth_service import mark_access_changed
+    from app.services.project_service import mark_projects_changed
+    from app.utils import chart_generator
+
+    class BenchConfig(Config):
+        TESTING = True
+        WARM_IMPORTS = False
+        PROJECT_DB_PATH = None
+        REPORT_ASYNC = False
+        NOTES_DIR = os.path.join(workdir, 'notes')
+        REPORTS_DIR = os.path.join(workdir, 'reports')
+
+    for name, value in settings.items():
+        setattr(BenchConfig, name, value)
+
+    app = create_app(BenchConfig)
+
+    project_data.update(make_projects(projects))
+    project_data[LARGE_PROJECT] = make_project(0, 'large')
+    mark_projects_changed()
+    add_user(user_data, BENCH_USER, project_data)
+    mark_access_changed(BENCH_USER)
+
+    # Keep rendered PNGs out of the source tree
+    chart_generator.CHARTS_DIR = os.path.join(workdir, 'charts')
+
+    if notes:
+        fill_notes('P001', notes, app.config['NOTES_DIR'])
+    return app
+
+def bench_client(app, project_id='P001'):
+    """Test client logged in as the bench user with a project selected"""
+    client = app.test_client()
+    client.post('/api/switch_user', json={'user_id': BENCH_USER})
+    client.post('/api/select_project', json={'project_id': project_id})
+    return client
+
+def chat_benchmarks(app, scale):
+    from app.services.chat_service import process_message
+    from app.utils.nlp_utils import route_message
+
+    for intent, message in CHAT_CORPUS:
+        routed = route_message(message)[0]
+        if routed != intent:
+            raise RuntimeError(f'Corpus message {message!r} routes to {routed}, not {intent}')
+
+    def corpus(project_id):
+        def run():
+            for _, message in CHAT_CORPUS:
+                process_message(message, project_id, user_id=BENCH_USER)
+        return run
+
+    yield 'chat.corpus.small', corpus('P001'), None
+    yield 'chat.corpus.large', corpus(LARGE_PROJECT), None
+    for intent, message in CHAT_CORPUS:
+        for size, project_id in (('small', 'P001'), ('large', LARGE_PROJECT)):
+            yield (f'chat.{intent}.{size}',
+                   lambda message=message, project_id=project_id: process_message(
+                       message, project_id, user_id=BENCH_USER),
+                   None)
+
+def report_benchmarks(app, scale):
+    from app.services.project_service import get_project_by_id
+    from app.utils.report_generator import generate_project_report
+
+    reports_dir = app.config['REPORTS_DIR']
+    os.makedirs(reports_dir, exist_ok=True)
+    for size, project_id in (('small', 'P001'), ('large', LARGE_PROJECT)):
+        project = get_project_by_id(project_id)
+        filename = os.path.join(reports_dir, f'bench_{size}.pdf')
+        yield f'report.render.{size}', lambda project=project, filename=filename: generate_project_report(
+            project, filename=filename), None
+        yield f'report.cached.{size}', lambda project=project: generate_project_report(
+            project, output_dir=reports_dir), None
+
+def chart_benchmarks(app, scale):
+    from app.services.project_service import get_project_by_id
+    from app.utils import chart_generator
+
+    renderers = {
+        'budget': chart_generator.generate_budget_chart,
+        'progress': chart_generator.generate_progress_chart,
+        'timeline': chart_generator.generate_timeline_chart,
+    }
+    for size, project_id in (('small', 'P001'), ('large', LARGE_PROJECT)):
+        project = get_project_by_id(project_id)
+        for chart_type, render in renderers.items():
+            yield (f'chart.{chart_type}.{size}.png', lambda render=render, project=project: render(project),
+                   chart_generator.chart_cache.clear)
+            yield (f'chart.{chart_type}.{size}.cached', lambda render=render, project=project: render(project),
+                   None)
+            yield (f'chart.{chart_type}.{size}.data',
+                   lambda chart_type=chart_type, project=project: chart_generator.chart_data(chart_type, project),
+                   None)
+
+def notes_benchmarks(app, scale):
+    client = bench_client(app)
+    middle = max(scale['notes'] // 2, 1)
+    yield 'notes.read.latest', lambda: client.get('/api/notes?limit=50'), None
+    yield 'notes.read.middle', lambda: client.get(f'/api/notes?limit=50&before={middle}'), None
+    yield 'notes.write', lambda: client.post('/api/notes', json={'note': 'Concrete pour finished'}), None
+
+def projects_benchmarks(app, scale):
+    from app.services import listing_service
+
+    client = bench_client(app)
+    clear = listing_service._listings.clear
+
+    yield 'projects.list.full', lambda: client.get('/api/projects'), clear
+    yield 'projects.list.summary', lambda: client.get('/api/projects?fields=summary'), clear
+    yield 'projects.list.page', lambda: client.get(
+        '/api/projects?status=In Progress&has_open_issues=true&limit=50'), clear
+    yield 'projects.list.cached', lambda: client.get('/api/projects?fields=summary'), None
+
+    etag = client.get('/api/projects').headers['ETag'].strip('"')
+
+    def revalidate():
+        response = client.get('/api/projects', headers={'If-None-Match': f'"{etag}"'})
+        assert response.status_code == 304
+    yield 'projects.list.revalidate', revalidate, None
+
+GROUPS = {
+    'chat': chat_benchmarks,
+    'report': report_benchmarks,
+    'chart': chart_benchmarks,
+    'notes': notes_benchmarks,
+    'projects': projects_benchmarks,
+}
+
+def run_benchmarks(app, scale, only=None):
+    """Run every benchmark whose name starts with one of only, or all of them"""
+    results = {}
+    for group, benchmarks in GROUPS.items():
+        if only and not any(group.startswith(prefix) or prefix.startswith(group) for prefix in only):
+            continue
+        for name, func, before in benchmarks(app, scale):
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            results[name] = measure(func, scale['seconds'], before=before)
+            print(format_row(name, results[name]), flush=True)
+    return results
+
+def format_row(name, result, baseline=None):
+    row = f"{name:<32} {result['runs']:>7} {result['p50_ms']:>11.3f} {result['p95_ms']:>11.3f} {result['ops_per_sec']:>11.1f}"
+    if baseline:
+        change = (result['p50_ms'] - baseline['p50_ms']) / baseline['p50_ms'] * 100 if baseline['p50_ms'] else 0.0
+        row += f" {baseline['p50_ms']:>11.3f} {change:>+7.1f}%"
+    return row
+
+def load_baselines(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_baselines(path, baselines, scale_name, results):
+    section = baselines.setdefault(scale_name, {'results': {}})
+    section['results'].update(results)
+    section['meta'] = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'recorded': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    with open(path, 'w') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+def find_regressions(results, baseline_results, tolerance, floor_ms=0.05):
+    """Benchmarks whose median is more than tolerance (plus floor_ms of noise) over baseline"""
+    regressions = []
+    for name, result in results.items():
+        baseline = baseline_results.get(name)
+        if baseline and result['p50_ms'] > baseline['p50_ms'] * (1 + tolerance) + floor_ms:
+            regressions.append(name)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the chatbot hot paths')
+    parser.add_argument('--quick', action='store_true', help='smaller data and shorter runs')
+    parser.add_argument('--only', help='comma-separated benchmark name prefixes, e.g. chat,chart.budget')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline file to compare with and save to')
+    parser.add_argument('--save', action='store_true', help='store these results as the baselines')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='allowed slowdown of the median (0.3 = 30%%)')
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    scale_name = 'quick' if args.quick else 'full'
+    scale = SCALES[scale_name]
+    only = [prefix.strip() for prefix in args.only.split(',')] if args.only else None
+
+    print(f"{'benchmark':<32} {'runs':>7} {'p50 ms':>11} {'p95 ms':>11} {'ops/s':>11}")
+    with tempfile.TemporaryDirectory() as workdir:
+        app = create_bench_app(workdir, scale['projects'], scale['notes'])
+        results = run_benchmarks(app, scale, only)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'scale': scale_name, 'results': results}, f, indent=2, sort_keys=True)
+
+    baselines = load_baselines(args.baseline)
+    baseline_results = baselines.get(scale_name, {}).get('results', {})
+
+    if args.save:
+        save_baselines(args.baseline, baselines, scale_name, results)
+        print(f'Saved {len(results)} {scale_name} baselines to {args.baseline}')
+        return 0
+
+    if not baseline_results:
+        print(f'No {scale_name} baselines in {args.baseline}; run with --save to record them')
+        return 0
+
+    print(f"\n{'benchmark':<32} {'runs':>7} {'p50 ms':>11} {'p95 ms':>11} {'ops/s':>11} {'base p50':>11} {'change':>8}")
+    for name, result in results.items():
+        print(format_row(name, result, baseline_results.get(name)))
+
+    regressions = find_regressions(results, baseline_results, args.tolerance)
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) over {args.tolerance:.0%}: {", ".join(regressions)}')
+        return 1
+    print('\nNo regressions')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import random
+from datetime import date, timedelta
+
+# Synthetic project data
+#
+# Projects have the same shape as data/projects.py. "small" matches the mock
+# projects; "large" has the issue, milestone and equipment counts of a long
+# running site, which is what makes reports and list replies expensive.
+# Everything is seeded, so two runs build identical data.
+
+SIZES = {
+    'small': {'issues': 3, 'milestones': 4, 'equipment': 3},
+    'large': {'issues': 400, 'milestones': 150, 'equipment': 60},
+}
+
+STATUSES = ['Planning', 'In Progress', 'In Progress', 'On Hold', 'Completed']
+ISSUE_STATUSES = ['Open', 'In Progress', 'Resolved', 'Resolved']
+MILESTONE_STATUSES = ['Completed', 'In Progress', 'Not Started']
+
+CITIES = [
+    ('New York', 40.7128, -74.0060),
+    ('Chicago', 41.8781, -87.6298),
+    ('Los Angeles', 34.0522, -118.2437),
+    ('Seattle', 47.6062, -122.3321),
+    ('Miami', 25.7617, -80.1918),
+    ('Denver', 39.7392, -104.9903),
+    ('Austin', 30.2672, -97.7431),
+]
+
+NAME_WORDS = ['Harbor', 'Maple', 'Granite', 'Summit', 'Cedar', 'Lakeside', 'Union', 'Northgate', 'Willow', 'Canal']
+NAME_KINDS = ['Apartments', 'Office Tower', 'School', 'Warehouse', 'Clinic', 'Bridge', 'Library', 'Parking Garage']
+
+ISSUE_TEXT = ['Delayed material delivery', 'Permit approval pending', 'Crane inspection overdue',
+              'Drainage problem on the east side', 'Subcontractor shortage', 'Design change requested']
+MILESTONE_TEXT = ['Site Preparation', 'Foundation', 'Structural Framework', 'Roofing', 'Plumbing & Electrical',
+                  'Interior Finishing', 'Landscaping', 'Final Inspection']
+EQUIPMENT = ['Excavator', 'Crane', 'Concrete Mixer', 'Bulldozer', 'Scaffolding', 'Forklift', 'Generator', 'Loader']
+
+def project_name(number):
+    """Unique, pronounceable project name"""
+    word = NAME_WORDS[number % len(NAME_WORDS)]
+    kind = NAME_KINDS[(number // len(NAME_WORDS)) % len(NAME_KINDS)]
+    return f'{word} {kind} {number}'
+
+def make_project(number, size='small', rng=None):
+    """One synthetic project"""
+    rng = rng or random.Random(number)
+    counts = SIZES[size]
+    start = date(2025, 1, 1) + timedelta(days=rng.randrange(0, 365))
+    end = start + timedelta(days=rng.randrange(120, 900))
+    allocated = rng.randrange(500, 50000) * 1000
+    spent = int(allocated * rng.uniform(0.0, 1.2))
+    city, lat, lon = rng.choice(CITIES)
+
+    milestone_days = sorted(rng.randrange(0, (end - start).days) for _ in range(counts['milestones']))
+    return {
+        'name': project_name(number),
+        'status': rng.choice(STATUSES),
+        'completion': rng.randrange(0, 101),
+        'timeline': f"{start.strftime('%B %Y')} - {end.strftime('%B %Y')}",
+        'location': {'city': city, 'lat': lat, 'lon': lon},
+        'budget': {'allocated': allocated, 'spent': spent, 'remaining': allocated - spent},
+        'issues': [
+            {
+                'id': f'I{index + 1:04d}',
+                'description': rng.choice(ISSUE_TEXT),
+                'status': rng.choice(ISSUE_STATUSES),
+                'date': (start + timedelta(days=rng.randrange(0, 120))).strftime('%Y-%m-%d')
+            }
+            for index in range(counts['issues'])
+        ],
+        'resources': {
+            'workers': rng.randrange(0, 200),
+            'equipment': [rng.choice(EQUIPMENT) for _ in range(counts['equipment'])]
+        },
+        'milestones': [
+            {
+                'name': f'{MILESTONE_TEXT[index % len(MILESTONE_TEXT)]} {index // len(MILESTONE_TEXT) + 1}',
+                'status': rng.choice(MILESTONE_STATUSES),
+                'date': (start + timedelta(days=days)).strftime('%Y-%m-%d')
+            }
+            for index, days in enumerate(milestone_days)
+        ]
+    }
+
+def make_projects(count, size='small', seed=0, prefix='S'):
+    """count synthetic projects keyed by id, e.g. S00001"""
+    rng = random.Random(seed)
+    return {f'{prefix}{number:05d}': make_project(number, size, rng) for number in range(1, count + 1)}
+
+def add_user(user_data, user_id, project_ids, role='Project Manager'):
+    """Add a user with access to project_ids to a user_data dict"""
+    user_data[user_id] = {'name': f'Benchmark {user_id}', 'role': role, 'project_access': list(project_ids)}
+
+def fill_notes(project_id, count, notes_dir):
+    """Append count notes to a project's history"""
+    from app.services.notes_service import add_note
+    for number in range(1, count + 1):
+        add_note(project_id, f'Site walk {number}: all crews on schedule', 'bench', notes_dir=notes_dir)
@@ -6,4 +6,66 @@ load_dotenv(os.path.join(basedir, '.env'))
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-for-poc'
-    DEBUG = os.environ.get('FLASK_DEBUG') or True
\ No newline at end of file
+    DEBUG = os.environ.get('FLASK_DEBUG') or True
+    
+    # Cold start: heavy libraries load on demand, optionally warmed after the
+    # first response; create_app() must finish within the budget
+    WARM_IMPORTS = os.environ.get('WARM_IMPORTS', 'true').lower() == 'true'
+    COLD_START_BUDGET_MS = int(os.environ.get('COLD_START_BUDGET_MS') or 1000)
+    
+    # Logging level for the app's own loggers; DEBUG shows per-request detail
+    LOG_LEVEL = (os.environ.get('LOG_LEVEL') or 'WARNING').upper()
+    
+    # Serve Prometheus metrics at /metrics; off by default since they expose
+    # endpoint names and traffic. With METRICS_TOKEN set, scrapers must send
+    # it as a bearer token
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() == 'true'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # Per-request cProfile dumps; requests are profiled when they send the
+    # header with PROFILE_TOKEN (ignored while no token is set) or are sampled
+    PROFILE_ENABLED = os.environ.get('PROFILE_ENABLED', 'false').lower() == 'true'
+    PROFILE_HEADER = os.environ.get('PROFILE_HEADER') or 'X-Profile'
+    PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE') or 0.0)
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(basedir, 'profiles')
+    PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES') or 100)
+    
+    # Project data; set to a SQLite file to use it instead of the mock data
+    PROJECT_DB_PATH = os.environ.get('PROJECT_DB_PATH')
+    
+    # Largest page of /api/projects when a limit is given
+    PROJECTS_MAX_PAGE_SIZE = int(os.environ.get('PROJECTS_MAX_PAGE_SIZE') or 500)
+    
+    # Most messages accepted by one /api/send_messages call
+    SEND_MESSAGES_MAX_BATCH = int(os.environ.get('SEND_MESSAGES_MAX_BATCH') or 100)
+    
+    # Notes storage
+    NOTES_DIR = os.environ.get('NOTES_DIR') or 'data/notes'
+    NOTES_PAGE_SIZE = int(os.environ.get('NOTES_PAGE_SIZE') or 50)
+    NOTES_MAX_PAGE_SIZE = int(os.environ.get('NOTES_MAX_PAGE_SIZE') or 500)
+    
+    # Report generation
+    REPORTS_DIR = os.environ.get('REPORTS_DIR') or os.path.join(basedir, 'reports')
+    REPORT_ASYNC = os.environ.get('REPORT_ASYNC', 'true').lower() == 'true'
+    REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS') or 2)
+    # Portfolio reports render in their own pool so they cannot starve single reports
+    REPORT_PORTFOLIO_WORKERS = int(os.environ.get('REPORT_PORTFOLIO_WORKERS') or 1)
+    REPORT_QUEUE_LIMIT = int(os.environ.get('REPORT_QUEUE_LIMIT') or 8)
+    REPORT_CACHE_MAX_FILES = int(os.environ.get('REPORT_CACHE_MAX_FILES') or 200)
+    REPORT_CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_BYTES') or 200 * 1024 * 1024)
+    REPORT_JOBS_MAX_FILES = int(os.environ.get('REPORT_JOBS_MAX_FILES') or 500)
+    
+    # Weather forecasts ('stub' works offline; 'openweathermap' needs an API key)
+    WEATHER_PROVIDER = os.environ.get('WEATHER_PROVIDER') or 'stub'
+    WEATHER_API_KEY = os.environ.get('WEATHER_API_KEY')
+    WEATHER_CACHE_TTL = int(os.environ.get('WEATHER_CACHE_TTL') or 3600)
+    WEATHER_STALE_TTL = int(os.environ.get('WEATHER_STALE_TTL') or 6 * 3600)
+    WEATHER_TIMEOUT = float(os.environ.get('WEATHER_TIMEOUT') or 3.0)
+    WEATHER_POOL_SIZE = int(os.environ.get('WEATHER_POOL_SIZE') or 10)
+    WEATHER_GRID_SIZE = float(os.environ.get('WEATHER_GRID_SIZE') or 0.1)
+    # Background refresh of every site's forecast; off by default and never run
+    # under TESTING. Forecast caches are per process, so every gunicorn worker
+    # runs its own prefetcher and provider calls scale with the worker count
+    WEATHER_PREFETCH_ENABLED = os.environ.get('WEATHER_PREFETCH_ENABLED', 'false').lower() == 'true'
+    WEATHER_PREFETCH_INTERVAL = int(os.environ.get('WEATHER_PREFETCH_INTERVAL') or 1800)
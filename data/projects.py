@@ -5,6 +5,7 @@ project_data = {
         "status": "In Progress",
         "completion": 65,
         "timeline": "March 2025 - October 2025",
+        "location": {"city": "New York", "lat": 40.7128, "lon": -74.0060},
         "budget": {
             "allocated": 3500000,
             "spent": 2275000,
@@ -27,9 +28,11 @@ project_data = {
     },
     "P002": {
         "name": "Downtown Office Complex",
+        "aliases": ["Downtown Office"],
         "status": "Planning",
         "completion": 10,
         "timeline": "May 2025 - December 2025",
+        "location": {"city": "Chicago", "lat": 41.8781, "lon": -87.6298},
         "budget": {
             "allocated": 5800000,
             "spent": 580000,
@@ -51,9 +54,11 @@ project_data = {
     },
     "P003": {
         "name": "Community Center Renovation",
+        "aliases": ["Community Center"],
         "status": "Completed",
         "completion": 100,
         "timeline": "September 2024 - February 2025",
+        "location": {"city": "Los Angeles", "lat": 34.0522, "lon": -118.2437},
         "budget": {
             "allocated": 1200000,
             "spent": 1150000,
@@ -77,6 +82,7 @@ project_data = {
         "status": "In Progress",
         "completion": 45,
         "timeline": "January 2025 - July 2025",
+        "location": {"city": "Seattle", "lat": 47.6062, "lon": -122.3321},
         "budget": {
             "allocated": 2500000,
             "spent": 1125000,
@@ -102,6 +108,7 @@ project_data = {
         "status": "Planning",
         "completion": 5,
         "timeline": "April 2025 - August 2026",
+        "location": {"city": "Miami", "lat": 25.7617, "lon": -80.1918},
         "budget": {
             "allocated": 12000000,
             "spent": 600000,
@@ -15,4 +15,10 @@ user_data = {
         "role": "Financial Analyst",
         "project_access": ["P001", "P002", "P003", "P004", "P005"]
     }
-}
\ No newline at end of file
+}
+
+# Projects granted to everyone with a role, on top of their own project_access
+role_project_access = {
+    "Site Supervisor": ["P001", "P004"],
+    "Financial Analyst": ["P001", "P002", "P003", "P004", "P005"]
+}
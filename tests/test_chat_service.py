@@ -0,0 +1,129 @@
+from app.services.chat_service import process_message
+from app.utils.keyword_matcher import KeywordMatcher
+from app.utils.nlp_utils import detect_intent, route_message
+
+
+def test_keyword_matcher_finds_overlapping_keywords():
+    matcher = KeywordMatcher(['he', 'she', 'his', 'hers'])
+    found = [(start, keyword) for start, _, keyword, _ in matcher.find_all('ushers')]
+    assert sorted(found) == [(1, 'she'), (2, 'he'), (2, 'hers')]
+
+
+def test_keyword_matcher_rebuilds_after_late_adds():
+    matcher = KeywordMatcher(['he', 'she'])
+    assert len(matcher.find_all('she')) == 2
+    matcher.add('hers')
+    found = [(start, keyword) for start, _, keyword, _ in matcher.find_all('ushers')]
+    assert sorted(found) == [(1, 'she'), (2, 'he'), (2, 'hers')]
+
+
+def test_route_message_action_intents():
+    assert route_message('Please generate a project report') == ('generate_report', {})
+    assert route_message('Show me the budget chart') == ('show_chart', {})
+    assert route_message('Check the weather forecast for the site') == ('check_weather', {})
+    assert route_message('Show me all notes') == ('view_notes', {})
+    assert route_message('Add a note saying pour scheduled') == ('add_note', {'note': 'pour scheduled'})
+    assert route_message('Add a note') == ('add_note', {'note': None})
+
+
+def test_route_message_requires_verb_before_noun():
+    assert route_message('report the budget')[0] == 'budget'
+
+
+def test_detect_intent_shares_router():
+    assert detect_intent('Can I pick a project?') == 'select_project'
+    assert detect_intent('What is the progress?') == 'milestone'
+    assert detect_intent('hello there') == 'unknown'
+
+
+def test_process_message_uses_router():
+    assert process_message('select project', None) == 'SHOW_PROJECT_SELECTOR'
+    assert process_message('generate report', 'P001') == 'GENERATE_REPORT'
+    assert process_message('add a note: check rebar', 'P001') == 'ADD_NOTE:check rebar'
+    assert process_message('status please', 'P001').startswith('Project "Riverside Apartments" is currently')
+
+
+def test_project_name_index_finds_every_mention():
+    from app.utils.project_index import ProjectNameIndex
+    projects = {
+        'A': {'name': 'Harbor Bridge'},
+        'B': {'name': 'Harbor Bridge Annex', 'aliases': ['The Annex']},
+        'C': {'name': 'Mill Street Lofts'},
+    }
+    index = ProjectNameIndex(projects)
+    assert index.find_all('Compare mill-street lofts with the harbor bridge annex') == ['C', 'B', 'A']
+    assert index.find_first('how is the annex going?') == 'B'
+    assert index.find_first('nothing here') is None
+
+
+def test_extract_project_reference_after_data_change():
+    from app.services.project_service import mark_projects_changed
+    from app.utils.nlp_utils import extract_project_reference
+    projects = {'A': {'name': 'Harbor Bridge'}}
+    assert extract_project_reference('harbor bridge status', projects) == 'A'
+    projects['B'] = {'name': 'Quarry Road'}
+    mark_projects_changed()
+    assert extract_project_reference('what about quarry road?', projects) == 'B'
+
+
+def test_process_message_mentions_project_without_selection():
+    response = process_message('How is the downtown office doing?', None)
+    assert response.startswith('I found the Downtown Office Complex.')
+
+
+def test_fuzzy_search_ranks_misspelled_names():
+    from app.utils.project_index import ProjectNameIndex
+    from data.projects import project_data
+    index = ProjectNameIndex(project_data)
+    assert index.search('riverside apts')[0][0] == 'P001'
+    assert index.search('status of downtwn office')[0][0] == 'P002'
+    assert index.search('select project') == []
+
+
+def test_fuzzy_search_keeps_best_score_per_project():
+    from app.utils.project_index import ProjectNameIndex
+    index = ProjectNameIndex({
+        'A': {'name': 'Harbor Point', 'aliases': ['Harbor Bridge']},
+        'B': {'name': 'Harbor Bridges'},
+        'C': {'name': 'Harbour Bridge Road'},
+    })
+    results = index.search('harbor bridge', limit=2)
+    assert [project_id for project_id, _ in results] == ['A', 'B']
+    assert results[0][1] == 1.0
+
+
+def test_name_index_is_reused_without_a_version():
+    from app.utils.project_index import get_project_name_index, invalidate_project_index
+    from data.projects import project_data
+    index = get_project_name_index(project_data)
+    assert get_project_name_index(project_data) is index
+    assert get_project_name_index(dict(project_data)) is not index
+    invalidate_project_index()
+    assert get_project_name_index(project_data) is not index
+
+
+def test_extract_project_reference_tolerates_typos():
+    from app.utils.nlp_utils import extract_project_reference
+    from data.projects import project_data
+    assert extract_project_reference('comunity center budget', project_data) == 'P003'
+    assert extract_project_reference('comunity center budget', project_data, fuzzy=False) is None
+
+
+def test_process_message_offers_did_you_mean():
+    response = process_message('how is seaside resrt going?', None)
+    assert response.startswith('Did you mean Seaside Resort?')
+
+
+def test_portfolio_needs_explicit_wording_with_active_project():
+    assert route_message('Which projects are over budget?') == ('portfolio', {'metric': 'over_budget'})
+    assert route_message('Is this project over budget?') == ('budget', {'portfolio_metric': 'over_budget'})
+    assert route_message('What milestones are due this quarter?') == ('milestone', {'portfolio_metric': 'quarter_spend'})
+
+    assert process_message('Is this project over budget?', 'P001').startswith('Budget for Riverside Apartments')
+    assert process_message('What milestones are due this quarter?', 'P001').startswith('Milestones for Riverside')
+    assert process_message('Is anything over budget?', None, user_id='admin2') == 'None of your 2 projects are over budget.'
+
+
+def test_portfolio_requires_a_user():
+    assert process_message('Which projects are over budget?', None) == 'Please select a user first.'
+    assert process_message('Is anything over budget?', None) == 'Please select a user first.'
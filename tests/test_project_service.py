@@ -0,0 +1,238 @@
+import pytest
+
+from app.services import project_service
+from app.services.project_repository import load_project_data
+from data.projects import project_data
+
+
+@pytest.fixture
+def sqlite_repository(tmp_path):
+    db_path = str(tmp_path / 'projects.db')
+    load_project_data(db_path, project_data)
+    yield project_service.configure_repository(db_path)
+    project_service.configure_repository()
+
+
+def test_sqlite_repository_round_trips_projects(sqlite_repository):
+    assert project_service.get_project_by_id('P002') == project_data['P002']
+    assert project_service.get_all_projects() == project_data
+    assert project_service.get_project_by_id('P999') is None
+
+
+def test_sqlite_repository_keeps_service_signatures(sqlite_repository):
+    assert project_service.get_project_milestones('P001') == project_data['P001']['milestones']
+    assert project_service.get_project_issues('P003') == []
+    assert project_service.get_project_budget('P005') == project_data['P005']['budget']
+    assert project_service.calculate_budget_metrics('P001')['percentage_spent'] == 65.0
+
+
+def test_sqlite_repository_save_refreshes_names(sqlite_repository):
+    from app.services.chat_service import process_message
+    project = dict(project_data['P004'], name='Harbor Bridge')
+    project_service.save_project('P004', project)
+    assert project_service.get_project_names()['P004']['name'] == 'Harbor Bridge'
+    assert process_message('how is harbor bridge?', None).startswith('I found the Harbor Bridge.')
+
+
+def test_name_index_follows_writes_from_other_processes(sqlite_repository):
+    from app.services.chat_service import process_message
+    from app.services.project_repository import SQLiteProjectRepository
+
+    assert not process_message('how is quarry road?', None).startswith('I found')
+    # Another worker process renames a project through its own connection
+    other = SQLiteProjectRepository(sqlite_repository.db_path)
+    other.save('P005', dict(project_data['P005'], name='Quarry Road'))
+    assert process_message('how is quarry road?', None).startswith('I found the Quarry Road.')
+
+
+def test_sqlite_repository_indexes_timeline_dates(sqlite_repository):
+    connection = sqlite_repository._connection()
+    row = connection.execute("SELECT start_date, end_date FROM projects WHERE id = 'P001'").fetchone()
+    assert tuple(row) == ('2025-03-01', '2025-10-31')
+    plan = connection.execute('EXPLAIN QUERY PLAN SELECT id FROM projects WHERE status = ?', ('Planning',)).fetchall()
+    assert 'idx_projects_status' in str([tuple(step) for step in plan])
+
+
+def test_sqlite_repository_reads_summaries_from_columns(sqlite_repository):
+    summaries = sqlite_repository.get_summaries(['P003', 'P001', 'P999'])
+    assert list(summaries) == ['P003', 'P001']
+    assert summaries['P001'] == {
+        'name': 'Riverside Apartments', 'status': 'In Progress', 'completion': 65,
+        'timeline': project_data['P001']['timeline']}
+
+
+FILTER_CASES = [
+    ({'status': ('In Progress',), 'completion_max': 50}, ['P004']),
+    ({'completion_min': 10, 'completion_max': 65}, ['P001', 'P002', 'P004']),
+    ({'due_from': '2025-06-01', 'due_to': '2025-06-20'}, ['P002', 'P004']),
+    ({'has_open_issues': False}, ['P003']),
+    ({'status': ('Planning',), 'has_open_issues': True}, ['P002', 'P005']),
+]
+
+
+def test_repositories_filter_through_indexes(sqlite_repository):
+    from app.services.project_repository import DictProjectRepository
+
+    dict_repository = DictProjectRepository(project_data)
+    for filters, expected in FILTER_CASES:
+        assert list(dict_repository.iter_project_ids(filters)) == expected
+        assert list(sqlite_repository.iter_project_ids(filters)) == expected
+
+    assert list(dict_repository.iter_project_ids({}, after='P003')) == ['P004', 'P005']
+    assert list(sqlite_repository.iter_project_ids({}, after='P003')) == ['P004', 'P005']
+
+
+def test_report_cache_reuses_unchanged_projects(tmp_path):
+    import os
+    from app.utils.report_generator import generate_project_report
+
+    project = project_data['P001']
+    first = generate_project_report(project, output_dir=str(tmp_path))
+    mtime = os.path.getmtime(first)
+    assert generate_project_report(project, output_dir=str(tmp_path)) == first
+    assert os.path.getmtime(first) >= mtime
+
+    changed = dict(project, completion=70)
+    assert generate_project_report(changed, output_dir=str(tmp_path)) != first
+
+
+def test_report_cache_evicts_least_recently_used(tmp_path):
+    import os
+    from app.utils.report_generator import generate_project_report
+
+    paths = []
+    for number, project_id in enumerate(['P001', 'P002', 'P003']):
+        path = generate_project_report(project_data[project_id], output_dir=str(tmp_path), cache_max_files=2)
+        os.utime(path, (1000 + number, 1000 + number))
+        paths.append(path)
+
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in paths[1:])
+
+
+def test_charts_render_once_and_reuse_bytes(tmp_path, monkeypatch):
+    import base64
+    from concurrent.futures import ThreadPoolExecutor
+    from app.utils import chart_generator
+
+    monkeypatch.setattr(chart_generator, 'CHARTS_DIR', str(tmp_path))
+    chart_generator.chart_cache.clear()
+    renders = []
+    get_data, draw, size = chart_generator.CHART_TYPES['progress']
+    monkeypatch.setitem(chart_generator.CHART_TYPES, 'progress',
+                        (get_data, lambda fig, data: renders.append(1) or draw(fig, data), size))
+
+    first = chart_generator.generate_progress_chart(project_data['P001'])
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(chart_generator.generate_progress_chart, [project_data['P001']] * 4))
+
+    assert len(renders) == 1
+    assert all(result == first for result in results)
+    saved = (tmp_path / first['filename'].split('/')[-1]).read_bytes()
+    assert base64.b64decode(first['image_base64']) == saved
+
+
+def test_each_chart_type_renders(tmp_path, monkeypatch):
+    from app.utils import chart_generator
+
+    monkeypatch.setattr(chart_generator, 'CHARTS_DIR', str(tmp_path))
+    for generate in (chart_generator.generate_budget_chart, chart_generator.generate_timeline_chart):
+        result = generate(project_data['P002'])
+        assert result['filename'].startswith('charts/Downtown_Office_Complex_')
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_portfolio_summary_aggregates_columns():
+    from datetime import date
+    from app.services.portfolio_service import portfolio_summary
+
+    summary = portfolio_summary(['P001', 'P003'], today=date(2025, 5, 15))
+    assert summary['project_count'] == 2
+    assert summary['total_allocated'] == 4700000
+    assert summary['total_spent'] == 3425000
+    assert summary['status_counts'] == {'In Progress': 1, 'Completed': 1}
+    assert summary['average_completion'] == 82.5
+    assert summary['quarter'] == 'Q2 2025'
+    # P001 ran 76 days by May 15 and 45 of them fall in Q2; P003 ended in February
+    assert summary['estimated_quarter_spend'] == round(2275000 / 76 * 45, 2)
+
+
+def test_portfolio_refreshes_changed_projects_only():
+    from app.services.portfolio_service import get_portfolio_frame, portfolio_summary
+
+    frame = get_portfolio_frame()
+    original = project_data['P002']
+    project = dict(original, budget={'allocated': 500000, 'spent': 580000, 'remaining': -80000})
+    project_service.save_project('P002', project)
+    try:
+        summary = portfolio_summary()
+        assert get_portfolio_frame() is frame
+        assert [p['id'] for p in summary['over_budget']] == ['P002']
+        assert summary['over_budget'][0]['over_by'] == 80000
+    finally:
+        project_service.save_project('P002', original)
+
+
+def test_portfolio_report_merges_chunks(tmp_path):
+    import os
+    from pypdf import PdfReader
+    from app.utils.report_generator import generate_portfolio_report
+
+    projects = (
+        (f'S{n:03d}', dict(project_data['P001'], name=f'Site {n}'))
+        for n in range(30)
+    )
+    path = generate_portfolio_report(projects, output_dir=str(tmp_path), max_workers=2, chunk_size=8)
+
+    reader = PdfReader(path)
+    # Cover plus at least one page per project
+    assert len(reader.pages) >= 31
+    assert 'Site 0' in reader.pages[0].extract_text()
+    assert 'Project Report: Site 29' in ''.join(page.extract_text() for page in reader.pages[-2:])
+    assert [p.name for p in tmp_path.iterdir()] == [os.path.basename(path)]
+
+
+def test_portfolio_report_keeps_every_chunk_page(tmp_path):
+    from pypdf import PdfReader
+    from app.utils.report_generator import (
+        _portfolio_row, build_portfolio_cover, build_portfolio_part, generate_portfolio_report)
+
+    projects = [(f'S{n:03d}', dict(project_data['P002'], name=f'Site {n}')) for n in range(20)]
+    path = generate_portfolio_report(projects, output_dir=str(tmp_path / 'out'), max_workers=2, chunk_size=6)
+
+    # The merged file has the cover's pages plus every chunk's pages
+    expected = len(PdfReader(build_portfolio_cover([_portfolio_row(*item) for item in projects], str(tmp_path / 'cover.pdf'))).pages)
+    for start in range(0, 20, 6):
+        part = build_portfolio_part(projects[start:start + 6], str(tmp_path / f'part{start}.pdf'))
+        expected += len(PdfReader(part).pages)
+    assert len(PdfReader(path).pages) == expected
+
+
+def test_portfolio_rebuilds_after_writes_from_other_processes(tmp_path):
+    from app.services.portfolio_service import portfolio_summary
+    from app.services.project_repository import SQLiteProjectRepository
+
+    db_path = str(tmp_path / 'projects.db')
+    project_service.configure_repository(db_path)
+    try:
+        project_service.get_repository().save_many(project_data)
+        assert portfolio_summary()['over_budget'] == []
+
+        # Another worker process writes through its own connection
+        other = SQLiteProjectRepository(db_path)
+        other.save('P002', dict(project_data['P002'], budget={'allocated': 500000, 'spent': 580000, 'remaining': -80000}))
+        assert [p['id'] for p in portfolio_summary()['over_budget']] == ['P002']
+    finally:
+        project_service.configure_repository(None)
+
+
+def test_chart_sizes_are_saved_to_separate_files(tmp_path, monkeypatch):
+    import base64
+    from app.utils import chart_generator
+
+    monkeypatch.setattr(chart_generator, 'CHARTS_DIR', str(tmp_path))
+    small = chart_generator.render_chart('budget', project_data['P001'], size=(4, 3))
+    large = chart_generator.render_chart('budget', project_data['P001'], size=(8, 6))
+    assert small['filename'] != large['filename']
+    for chart in (small, large):
+        saved = (tmp_path / chart['filename'].split('/')[-1]).read_bytes()
+        assert base64.b64decode(chart['image_base64']) == saved
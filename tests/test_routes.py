@@ -0,0 +1,651 @@
+import pytest
+
+from app import create_app
+from config import Config
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        TESTING = True
+        NOTES_DIR = str(tmp_path / 'notes')
+        REPORTS_DIR = str(tmp_path / 'reports')
+        REPORT_WORKERS = 1
+
+    return create_app(TestConfig)
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post('/api/switch_user', json={'user_id': 'admin1'})
+    client.post('/api/select_project', json={'project_id': 'P001'})
+    return client
+
+
+def test_notes_are_paginated_newest_page_first(client):
+    for number in range(1, 8):
+        client.post('/api/notes', json={'note': f'note {number}'})
+
+    page = client.get('/api/notes?limit=3').get_json()
+    assert [note['id'] for note in page['notes']] == [5, 6, 7]
+    assert page['next_before'] == 5
+
+    page = client.get(f"/api/notes?limit=3&before={page['next_before']}").get_json()
+    assert [note['text'] for note in page['notes']] == ['note 2', 'note 3', 'note 4']
+
+    page = client.get('/api/notes?limit=3&before=2').get_json()
+    assert [note['id'] for note in page['notes']] == [1]
+    assert page['next_before'] is None
+
+
+def test_concurrent_note_writers_get_unique_ids(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    from app.services.notes_service import add_note, get_notes
+
+    notes_dir = str(tmp_path / 'notes')
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda n: add_note('P001', f'note {n}', 'admin1', notes_dir=notes_dir), range(40)))
+
+    notes, _ = get_notes('P001', 100, notes_dir=notes_dir)
+    assert [note['id'] for note in notes] == list(range(1, 41))
+    assert len({note['text'] for note in notes}) == 40
+
+
+def test_notes_index_is_repaired_after_a_crash(tmp_path):
+    import json
+    from app.services.notes_service import RECORD_SIZE, add_note, get_notes
+
+    notes_dir = tmp_path / 'notes'
+    for number in range(1, 4):
+        add_note('P001', f'note {number}', 'admin1', notes_dir=str(notes_dir))
+    log_path, index_path = notes_dir / 'P001_notes.jsonl', notes_dir / 'P001_notes.idx'
+
+    # Crash after note 4 reached the log, halfway through its index record,
+    # and again partway through the line for note 5
+    with open(log_path, 'ab') as f:
+        f.write((json.dumps({'id': 4, 'text': 'note 4', 'date': '', 'user': 'admin1'}) + '\n').encode())
+        f.write(b'{"id": 5, "te')
+    with open(index_path, 'ab') as f:
+        f.write(b'\0' * (RECORD_SIZE // 2))
+
+    add_note('P001', 'note 5', 'admin1', notes_dir=str(notes_dir))
+    notes, _ = get_notes('P001', 10, notes_dir=str(notes_dir))
+    assert [(note['id'], note['text']) for note in notes] == [(number, f'note {number}') for number in range(1, 6)]
+    assert index_path.stat().st_size == 5 * RECORD_SIZE
+
+
+def test_legacy_notes_file_is_migrated(tmp_path):
+    import json
+    from app.services.notes_service import add_note, get_notes
+
+    notes_dir = tmp_path / 'notes'
+    notes_dir.mkdir()
+    legacy = [{'id': 1, 'text': 'old', 'date': '2025-03-01 08:00:00', 'user': 'admin2'}]
+    (notes_dir / 'P002_notes.json').write_text(json.dumps(legacy))
+
+    add_note('P002', 'new', 'admin1', notes_dir=str(notes_dir))
+    notes, _ = get_notes('P002', 10, notes_dir=str(notes_dir))
+    assert [(note['id'], note['text']) for note in notes] == [(1, 'old'), (2, 'new')]
+
+
+def test_report_job_is_rendered_in_background(client):
+    import time
+    response = client.post('/api/generate_report', json={'async': True})
+    assert response.status_code == 202
+    status_url = response.get_json()['status_url']
+
+    deadline = time.time() + 60
+    while True:
+        job = client.get(status_url).get_json()
+        if job['job_status'] not in ('queued', 'running') or time.time() > deadline:
+            break
+        time.sleep(0.1)
+
+    assert job['job_status'] == 'done'
+    assert client.get(job['download_url']).status_code == 200
+
+
+def test_portfolio_report_job_covers_accessible_projects(client):
+    import time
+    response = client.post('/api/generate_portfolio_report', json={})
+    assert response.status_code == 202
+    status_url = response.get_json()['status_url']
+
+    deadline = time.time() + 60
+    while True:
+        job = client.get(status_url).get_json()
+        if job['job_status'] not in ('queued', 'running') or time.time() > deadline:
+            break
+        time.sleep(0.1)
+
+    assert job['job_status'] == 'done'
+    assert client.get(job['download_url']).status_code == 200
+
+
+def read_events(response):
+    import json
+    events = []
+    for block in response.get_data(as_text=True).strip().split('\n\n'):
+        event, data = block.split('\n')
+        events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+    return events
+
+
+def test_stream_message_yields_list_lines(client):
+    response = client.get('/api/stream_message', query_string={'message': 'What are the milestones?'})
+    assert response.mimetype == 'text/event-stream'
+    events = read_events(response)
+    replies = [data['text'] for event, data in events if event == 'reply']
+    assert replies[0] == 'Milestones for Riverside Apartments:'
+    assert len(replies) == 5
+    assert events[-1] == ('done', {})
+
+
+def test_stream_message_hands_report_job_to_client(client):
+    import time
+    events = read_events(client.post('/api/stream_message', json={'message': 'Generate a project report'}))
+    progress = [data for event, data in events if event == 'progress']
+    assert progress[0]['stage'] == 'started'
+    assert progress[-1]['stage'] == 'queued'
+    result = [data for event, data in events if event == 'result'][0]
+    assert result['action'] == 'report'
+    assert events[-1] == ('done', {})
+
+    deadline = time.time() + 60
+    while True:
+        job = client.get(progress[-1]['status_url']).get_json()
+        if job['job_status'] not in ('queued', 'running') or time.time() > deadline:
+            break
+        time.sleep(0.1)
+    assert client.get(job['download_url']).status_code == 200
+
+
+def test_stream_message_get_has_no_side_effects(client):
+    for message in ('Generate a project report', 'Add a note saying crane inspected'):
+        events = read_events(client.get('/api/stream_message', query_string={'message': message}))
+        assert [event for event, _ in events] == ['error', 'done']
+    assert client.get('/api/notes').get_json()['notes'] == []
+
+
+def test_send_message_fuses_actions(client):
+    response = client.post('/api/send_message', json={'message': 'Add a note saying crane inspected', 'fuse': True})
+    data = response.get_json()
+    assert data['message'] == 'ADD_NOTE'
+    assert data['action'] == 'add_note'
+    assert data['result']['note']['text'] == 'crane inspected'
+
+    data = client.post('/api/send_message', json={'message': 'Show me the budget chart', 'fuse': True}).get_json()
+    assert data['action'] == 'chart'
+    assert data['result']['chart']['values'] == [3500000, 2275000, 1225000]
+
+    # Without the flag the client is still asked to make the second call
+    data = client.post('/api/send_message', json={'message': 'Show me all notes'}).get_json()
+    assert data == {'status': 'success', 'message': 'VIEW_NOTES'}
+
+
+def test_send_messages_answers_batch_in_order(client, monkeypatch):
+    from app.services import chat_service
+    loads = []
+    get_project = chat_service.get_project_by_id
+    monkeypatch.setattr(chat_service, 'get_project_by_id', lambda pid: loads.append(pid) or get_project(pid))
+
+    client.post('/api/switch_user', json={'user_id': 'admin2'})
+    response = client.post('/api/send_messages', json={'messages': [
+        {'message': 'What is the status?', 'project_id': 'P001'},
+        ['Show me the budget', 'P004'],
+        {'message': 'Any issues?', 'project_id': 'P001'},
+        {'message': 'What is the status?', 'project_id': 'P002'},
+        {'message': ''}
+    ]}).get_json()
+
+    results = response['results']
+    assert results[0]['message'].startswith('Project "Riverside Apartments" is currently')
+    assert results[1]['message'].startswith('Budget for')
+    assert results[2]['message'].startswith('Issues for Riverside Apartments:')
+    assert results[3] == {'status': 'error', 'message': 'Access denied'}
+    assert results[4] == {'status': 'error', 'message': 'Message text is required'}
+    assert sorted(loads) == ['P001', 'P004']
+
+
+def test_project_listing_revalidates_with_etag(client, monkeypatch):
+    from app.services import auth_service, project_service, listing_service
+
+    first = client.get('/api/projects')
+    etag = first.headers['ETag']
+    assert set(first.get_json()) == {'P001', 'P002', 'P003', 'P004', 'P005'}
+
+    # A repeat load is answered from the listing cache without serializing
+    monkeypatch.setattr(listing_service, 'get_project_by_id', None)
+    assert client.get('/api/projects', headers={'If-None-Match': etag}).status_code == 304
+    monkeypatch.undo()
+
+    original = project_service.get_project_by_id('P002')
+    project_service.save_project('P002', dict(original, completion=99))
+    try:
+        changed = client.get('/api/projects', headers={'If-None-Match': etag})
+        assert changed.status_code == 200
+        assert changed.get_json()['P002']['completion'] == 99
+        etag = changed.headers['ETag']
+    finally:
+        project_service.save_project('P002', original)
+
+    access = auth_service.get_user_projects('admin1')
+    auth_service.set_user_project_access('admin1', ['P001'])
+    try:
+        narrowed = client.get('/api/projects', headers={'If-None-Match': etag})
+        assert list(narrowed.get_json()) == ['P001']
+    finally:
+        auth_service.set_user_project_access('admin1', access)
+
+
+def test_project_etag_skips_unchanged_body(client):
+    response = client.get('/api/projects/P001')
+    etag = response.headers['ETag']
+    assert response.get_json()['name'] == 'Riverside Apartments'
+    assert client.get('/api/projects/P001', headers={'If-None-Match': etag}).status_code == 304
+
+    selected = client.post('/api/select_project', json={'project_id': 'P001'}, headers={'If-None-Match': etag})
+    assert selected.get_json() == {'status': 'success', 'project_id': 'P001', 'not_modified': True}
+
+    client.post('/api/switch_user', json={'user_id': 'admin2'})
+    assert client.get('/api/projects/P002').status_code == 403
+
+
+def test_project_fields_are_projected(client):
+    listing = client.get('/api/projects?fields=name,status').get_json()
+    assert listing['P001'] == {'name': 'Riverside Apartments', 'status': 'In Progress'}
+
+    summary = client.get('/api/projects/P003?fields=summary').get_json()
+    assert set(summary) == {'id', 'name', 'status', 'completion', 'timeline'}
+    assert summary['id'] == 'P003'
+
+    selected = client.post('/api/select_project', json={'project_id': 'P001', 'fields': 'name,budget'}).get_json()
+    assert selected['project'] == {'name': 'Riverside Apartments', 'budget': {
+        'allocated': 3500000, 'spent': 2275000, 'remaining': 1225000}}
+
+    # JSON bodies may list the fields
+    selected = client.post('/api/select_project', json={'project_id': 'P001', 'fields': ['name']}).get_json()
+    assert selected['project'] == {'name': 'Riverside Apartments'}
+    response = client.post('/api/select_project', json={'project_id': 'P001', 'fields': {'name': True}})
+    assert response.status_code == 400
+
+
+def test_project_listing_filters_and_pages(client):
+    first = client.get('/api/projects?fields=summary&status=In Progress,Planning&limit=2')
+    assert list(first.get_json()) == ['P001', 'P002']
+    cursor = first.headers['X-Next-Cursor']
+
+    second = client.get(f'/api/projects?fields=summary&status=In Progress,Planning&limit=2&cursor={cursor}')
+    assert list(second.get_json()) == ['P004', 'P005']
+    assert 'X-Next-Cursor' not in second.headers
+
+    # Only projects the user can see are listed
+    client.post('/api/switch_user', json={'user_id': 'admin2'})
+    assert list(client.get('/api/projects?has_open_issues=true').get_json()) == ['P001', 'P004']
+    assert client.get('/api/projects?completion_max=abc').status_code == 400
+    conflicting = client.get('/api/projects?milestone_due_days=30&milestone_due_from=2025-06-01')
+    assert conflicting.status_code == 400
+
+
+def test_role_grants_are_expanded_and_invalidated(client):
+    from data.users import role_project_access
+    from app.services import auth_service
+
+    client.post('/api/switch_user', json={'user_id': 'admin2'})
+    assert list(client.get('/api/projects').get_json()) == ['P001', 'P004']
+    assert auth_service.get_accessible_projects('admin2', ['P005', 'P004', 'P001']) == ['P004', 'P001']
+
+    original = role_project_access['Site Supervisor']
+    auth_service.set_role_project_access('Site Supervisor', ['P002'])
+    try:
+        assert auth_service.user_has_project_access('admin2', 'P002')
+        assert sorted(client.get('/api/projects').get_json()) == ['P001', 'P002', 'P004']
+        assert client.post('/api/select_project', json={'project_id': 'P002'}).get_json()['status'] == 'success'
+    finally:
+        auth_service.set_role_project_access('Site Supervisor', original)
+    assert not auth_service.user_has_project_access('admin2', 'P002')
+
+
+def test_report_queue_rejects_bursts(client, monkeypatch):
+    from app.services import report_jobs
+    monkeypatch.setattr(report_jobs, '_pending', report_jobs._settings['queue_limit'])
+    response = client.post('/api/generate_report', json={'async': True})
+    assert response.status_code == 429
+    assert response.get_json()['status'] == 'error'
+
+
+def test_report_jobs_survive_broken_pool_and_are_pruned(client, monkeypatch):
+    import os
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+    from app.services import report_jobs
+
+    # A worker process that dies breaks the pool for every later submit
+    broken = ProcessPoolExecutor(max_workers=1)
+    broken.submit(os._exit, 1)
+    while not broken._broken:
+        time.sleep(0.01)
+    monkeypatch.setitem(report_jobs._executors, 'report', broken)
+    monkeypatch.setitem(report_jobs._settings, 'jobs_max_files', 2)
+
+    statuses = [client.post('/api/generate_report', json={'async': True}).status_code for _ in range(3)]
+    assert statuses == [202, 202, 202]
+    assert report_jobs._executors['report'] is not broken
+    assert len(os.listdir(os.path.join(report_jobs._settings['reports_dir'], 'jobs'))) <= 2
+
+
+def test_portfolio_reports_use_their_own_unforked_pool(monkeypatch):
+    from app.services import report_jobs
+
+    monkeypatch.setattr(report_jobs, '_executors', {})
+    report_pool = report_jobs._get_executor()
+    portfolio_pool = report_jobs._get_executor('portfolio')
+    try:
+        assert portfolio_pool is not report_pool
+        assert portfolio_pool._max_workers == report_jobs._settings['portfolio_workers']
+        assert report_pool._mp_context.get_start_method() in ('forkserver', 'spawn')
+    finally:
+        report_pool.shutdown()
+        portfolio_pool.shutdown()
+
+
+def test_unknown_report_job_is_404(client):
+    assert client.get('/api/report_jobs/' + '0' * 32).status_code == 404
+    assert client.get('/api/report_jobs/../../etc').status_code == 404
+
+
+def test_chart_data_mode_returns_series(client):
+    response = client.post('/api/generate_budget_chart', json={'format': 'data'}).get_json()
+    assert response['status'] == 'success'
+    assert response['chart'] == {
+        'type': 'budget',
+        'project': 'Riverside Apartments',
+        'labels': ['Allocated', 'Spent', 'Remaining'],
+        'values': [3500000, 2275000, 1225000]
+    }
+    assert 'image_data' not in response
+
+    timeline = client.post('/api/chart/timeline', json={'format': 'data'}).get_json()['chart']
+    assert timeline['start'][0] == '2025-03-16'
+    assert timeline['end'][0] == '2025-04-15'
+
+
+def test_chart_svg_mode(client):
+    response = client.post('/api/chart/progress', json={'format': 'svg'}).get_json()
+    assert response['svg'].lstrip().startswith('<?xml')
+    assert client.post('/api/chart/pie', json={}).status_code == 404
+
+
+def test_metrics_endpoint_is_off_by_default(client):
+    assert client.get('/metrics').status_code == 404
+
+
+def test_metrics_endpoint_requires_configured_token(tmp_path):
+    class MetricsConfig(Config):
+        TESTING = True
+        NOTES_DIR = str(tmp_path / 'notes')
+        REPORTS_DIR = str(tmp_path / 'reports')
+        METRICS_ENABLED = True
+        METRICS_TOKEN = 'scrape-secret'
+
+    client = create_app(MetricsConfig).test_client()
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
+
+
+def test_metrics_endpoint_reports_latency_and_caches(tmp_path):
+    from app.utils.metrics import CHART_RENDERS, CHART_CACHE_HITS
+
+    class MetricsConfig(Config):
+        TESTING = True
+        NOTES_DIR = str(tmp_path / 'notes')
+        REPORTS_DIR = str(tmp_path / 'reports')
+        METRICS_ENABLED = True
+
+    client = create_app(MetricsConfig).test_client()
+    client.post('/api/switch_user', json={'user_id': 'admin1'})
+    client.post('/api/select_project', json={'project_id': 'P001'})
+    client.post('/api/send_message', json={'message': 'What is the budget?'})
+    renders = CHART_RENDERS.value('progress', 'svg')
+    hits = CHART_CACHE_HITS.value('progress', 'svg')
+    client.post('/api/chart/progress', json={'format': 'svg'})
+    client.post('/api/chart/progress', json={'format': 'svg'})
+    assert CHART_RENDERS.value('progress', 'svg') - renders <= 1
+    assert CHART_CACHE_HITS.value('progress', 'svg') - hits >= 1
+
+    response = client.get('/metrics')
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'http_request_duration_seconds_bucket{endpoint="main.send_message",method="POST",status="200",le="0.001"}' in text
+    assert 'chat_intent_duration_seconds_count{intent="budget"}' in text
+    assert 'chart_cache_hits_total{type="progress",format="svg"}' in text
+    assert 'weather_cache_hits_total' in text
+
+
+def test_weather_prefetcher_only_starts_when_enabled(tmp_path, monkeypatch):
+    from app.services import weather_service
+
+    started = []
+    monkeypatch.setattr(weather_service, 'start_weather_prefetcher', lambda *args: started.append(args))
+
+    class ProductionConfig(Config):
+        NOTES_DIR = str(tmp_path / 'notes')
+        REPORTS_DIR = str(tmp_path / 'reports')
+        WARM_IMPORTS = False
+
+    create_app(ProductionConfig)
+    assert started == []
+
+    ProductionConfig.WEATHER_PREFETCH_ENABLED = True
+    create_app(ProductionConfig)
+    assert len(started) == 1
+
+
+def test_profiling_writes_labelled_profiles(tmp_path):
+    import pstats
+
+    class ProfileConfig(Config):
+        TESTING = True
+        NOTES_DIR = str(tmp_path / 'notes')
+        PROFILE_ENABLED = True
+        PROFILE_TOKEN = 'secret'
+        PROFILE_DIR = str(tmp_path / 'profiles')
+        PROFILE_MAX_FILES = 2
+
+    client = create_app(ProfileConfig).test_client()
+    client.post('/api/switch_user', json={'user_id': 'admin1'})
+    client.post('/api/select_project', json={'project_id': 'P001'})
+    assert not (tmp_path / 'profiles').exists()
+
+    # A wrong token is ignored
+    client.post('/api/send_message', json={'message': 'What is the budget?'}, headers={'X-Profile': 'guess'})
+    assert not (tmp_path / 'profiles').exists()
+
+    response = client.post('/api/send_message', json={'message': 'What is the budget?'}, headers={'X-Profile': 'secret'})
+    profile_id = response.headers['X-Profile-Id']
+    [path] = (tmp_path / 'profiles').iterdir()
+    assert path.name.startswith('profile_')
+    assert '_main.send-message_budget_P001_' in path.name
+    assert path.name.endswith(f'_{profile_id}.prof')
+    assert pstats.Stats(str(path)).total_calls > 0
+
+    for _ in range(3):
+        client.get('/api/projects', headers={'X-Profile': 'secret'})
+    assert len(list((tmp_path / 'profiles').iterdir())) == 2
+
+
+def test_profiling_needs_token_and_skips_overlapping_requests(tmp_path):
+    from app.utils import profiling
+
+    class ProfileConfig(Config):
+        TESTING = True
+        NOTES_DIR = str(tmp_path / 'notes')
+        PROFILE_ENABLED = True
+        PROFILE_DIR = str(tmp_path / 'profiles')
+
+    client = create_app(ProfileConfig).test_client()
+    # Without a token the header does nothing
+    response = client.get('/api/projects', headers={'X-Profile': 'anything'})
+    assert 'X-Profile-Id' not in response.headers
+    assert not (tmp_path / 'profiles').exists()
+
+    ProfileConfig.PROFILE_SAMPLE_RATE = 1.0
+    client = create_app(ProfileConfig).test_client()
+    # A request arriving while another is profiled runs unprofiled
+    with profiling._active:
+        response = client.get('/api/projects')
+    assert response.status_code == 200
+    assert 'X-Profile-Id' not in response.headers
+    assert 'X-Profile-Id' in client.get('/api/projects').headers
+
+
+COLD_START_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+create_app()
+elapsed_ms = (time.perf_counter() - start) * 1000
+heavy = [name for name in ('requests', 'numpy', 'pandas', 'matplotlib', 'reportlab') if name in sys.modules]
+print(json.dumps({'elapsed_ms': elapsed_ms, 'heavy': heavy}))
+'''
+
+
+def test_cold_start_within_budget():
+    import json
+    import os
+    import subprocess
+    import sys
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT], cwd=root,
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+
+    assert result['heavy'] == []
+    assert result['elapsed_ms'] < Config.COLD_START_BUDGET_MS
+
+
+def test_heavy_imports_warm_after_first_response(app, monkeypatch):
+    from app.utils import warmup
+    started = []
+    monkeypatch.setattr(warmup, '_started', False)
+    monkeypatch.setattr(warmup, 'start_warmup', lambda: started.append(True))
+
+    app.test_client().get('/').close()
+    assert started == [True]
+
+
+class CountingProvider:
+    def __init__(self, delay=0.0, fail=False):
+        import threading
+        self.calls = 0
+        self.delay = delay
+        self.fail = fail
+        self.lock = threading.Lock()
+
+    def fetch(self, location):
+        import time
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise TimeoutError('upstream timed out')
+        return {'city': {'name': location['city']}, 'list': []}
+
+
+SITE = {'city': 'Chicago', 'lat': 41.8781, 'lon': -87.6298}
+
+
+def test_weather_requests_are_coalesced():
+    from concurrent.futures import ThreadPoolExecutor
+    from app.services.weather_service import WeatherService
+
+    provider = CountingProvider(delay=0.2)
+    service = WeatherService(provider)
+    with ThreadPoolExecutor(max_workers=50) as pool:
+        results = list(pool.map(lambda _: service.get_forecast(SITE), range(50)))
+
+    assert provider.calls == 1
+    assert all(result['city']['name'] == 'Chicago' for result in results)
+
+
+def test_weather_serves_stale_forecast_when_upstream_fails():
+    from app.services.weather_service import WeatherService, WeatherUnavailable
+
+    provider = CountingProvider()
+    service = WeatherService(provider, ttl=0, stale_ttl=3600)
+    first = service.get_forecast(SITE)
+
+    provider.fail = True
+    assert service.get_forecast(SITE) is first
+
+    expired = WeatherService(CountingProvider(fail=True), ttl=0, stale_ttl=0)
+    with pytest.raises(WeatherUnavailable):
+        expired.get_forecast(SITE)
+
+
+def test_weather_prefetcher_follows_reconfigured_service():
+    from app.services.weather_service import WeatherPrefetcher, configure_weather, get_weather_service
+
+    prefetcher = WeatherPrefetcher(get_weather_service, lambda: {'P001': SITE}, interval=3600)
+    configure_weather()
+    service = configure_weather()
+    prefetcher.run_once()
+    assert service.upstream_calls == 1
+
+
+def test_weather_endpoint_uses_stub_provider(client):
+    response = client.post('/api/get_weather', json={}).get_json()
+    assert response['status'] == 'success'
+    assert 'Weather Forecast for New York' in response['html']
+
+
+def test_weather_prefetch_groups_sites_by_grid_cell():
+    from app.services.weather_service import WeatherService
+
+    provider = CountingProvider()
+    service = WeatherService(provider)
+    nearby = {'city': 'Chicago', 'lat': 41.8801, 'lon': -87.6302}
+    far = {'city': 'Seattle', 'lat': 47.6062, 'lon': -122.3321}
+
+    assert service.prefetch([SITE, nearby, far]) == 2
+    assert provider.calls == 2
+
+    service.get_forecast(nearby)
+    assert provider.calls == 2
+    assert service.hits == 1
+
+
+def test_project_locations_come_from_project_data():
+    from app.services.project_service import get_project_locations
+    locations = get_project_locations()
+    assert locations['P004']['city'] == 'Seattle'
+    assert len(locations) == 5
+
+
+def test_portfolio_endpoint_and_chat_intent(client):
+    portfolio = client.get('/api/portfolio').get_json()['portfolio']
+    assert portfolio['project_count'] == 5
+    assert portfolio['total_allocated'] == 25000000
+
+    reply = client.post('/api/send_message', json={'message': 'Which projects are over budget?'}).get_json()
+    assert reply['message'] == 'None of your 5 projects are over budget.'
+
+
+def test_send_messages_isolates_failing_actions(client, monkeypatch):
+    import app.routes as routes
+
+    def run_action(action, args, project_id, user_id=None):
+        if action == 'chart':
+            raise RuntimeError('chart backend down')
+        return {'status': 'success'}
+    monkeypatch.setattr(routes, 'run_action', run_action)
+
+    results = client.post('/api/send_messages', json={'fuse': True, 'messages': [
+        {'message': 'Show me the budget chart', 'project_id': 'P001'},
+        {'message': 'What is the status?', 'project_id': 'P001'},
+    ]}).get_json()['results']
+    assert results[0] == {'status': 'error', 'message': 'Error processing message: chart backend down'}
+    assert results[1]['message'].startswith('Project "Riverside Apartments" is currently')